@@ -1,9 +1,17 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict, Any
+from fastapi.responses import StreamingResponse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional
 from datetime import datetime
+import asyncio
+import json
+import logging
+import time
 
-from ceo_agent import CEOAgent
+from live_state import LiveState
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="VHQ_LAG CEO Agent API",
@@ -20,73 +28,195 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Instancia global del CEO Agent
-ceo_agent = CEOAgent()
+# Snapshot vivo que el CEO Agent actualiza de forma incremental
+live_state = LiveState(limits={'tasks': 5000})
+STREAM_SECTIONS = ("agents", "tasks", "resources")
+HEARTBEAT_SECONDS = 15
+
+# El CEO Agent (scheduler, sampler, modelos) se construye en segundo plano
+# para que la API arranque sin esperar a los backends pesados
+ceo_agent = None
+ceo_agent_error: Optional[str] = None
+_startup_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="CEOStartup")
+
+
+def _start_ceo_agent():
+    global ceo_agent, ceo_agent_error
+    try:
+        from ceo_agent import CEOAgent
+        ceo_agent = CEOAgent(live_state=live_state)
+    except Exception as e:
+        # Sin esto la API respondería "starting" para siempre
+        logger.exception("Error starting CEO Agent")
+        ceo_agent_error = f"{type(e).__name__}: {e}"
+
+
+@app.on_event("startup")
+async def start_ceo_agent():
+    _startup_pool.submit(_start_ceo_agent)
+
+
+@app.on_event("shutdown")
+def stop_ceo_agent():
+    # Los checkpoints con escritura diferida se vuelcan antes de salir
+    if ceo_agent is not None:
+        ceo_agent.state_manager.close()
+
+
+def _require_agent():
+    if ceo_agent_error is not None:
+        raise HTTPException(status_code=500, detail=f"CEO Agent failed to start: {ceo_agent_error}")
+    if ceo_agent is None:
+        raise HTTPException(status_code=503, detail="CEO Agent is starting")
+    return ceo_agent
+
+
+def _paginated(request: Request, response: Response, section: str, offset: int, limit: int,
+               where: Optional[Dict[str, Any]] = None):
+    """Una página de una sección del snapshot con ETag basado en su versión"""
+    version = live_state.section_version(section)
+    etag = f'W/"{section}-{version}-{offset}-{limit}-{sorted((where or {}).items())}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    version, items, total = live_state.page(section, offset, limit, where)
+    response.headers["ETag"] = etag
+    return {"items": items, "total": total, "offset": offset, "limit": limit, "version": version}
+
 
 @app.get("/")
 async def root():
     return {"message": "VHQ_LAG CEO Agent API"}
 
 @app.get("/health")
-async def health_check():
+async def health_check(response: Response):
+    if ceo_agent_error is not None:
+        response.status_code = 503
     return {
-        "status": "healthy",
+        "status": "unhealthy" if ceo_agent_error is not None else "healthy",
+        "agent_ready": ceo_agent is not None,
+        "agent_error": ceo_agent_error,
         "timestamp": datetime.now().isoformat(),
         "version": "1.0.0"
     }
 
 @app.get("/system/status")
-async def get_system_status():
-    return ceo_agent.get_system_status()
+def get_system_status():
+    return _require_agent().get_system_status()
 
 @app.get("/agents")
-async def get_agents():
-    return [
-        {
-            "id": "07_MEDIA_LAG",
-            "name": "Media Librarian",
-            "status": "active",
-            "health": "good",
-            "last_activity": datetime.now().isoformat(),
-            "uptime": "2h 30m",
-            "tasks_completed": 100,
-            "success_rate": 0.95
-        },
-        {
-            "id": "00_CEO_LAG",
-            "name": "CEO Agent",
-            "status": "active",
-            "health": "good",
-            "last_activity": datetime.now().isoformat(),
-            "uptime": "2h 30m",
-            "tasks_completed": 50,
-            "success_rate": 0.90
-        }
-    ]
+def get_agents(request: Request, response: Response,
+               offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=500),
+               status: Optional[str] = None):
+    return _paginated(request, response, "agents", offset, limit, {"status": status} if status else None)
 
 @app.get("/tasks")
-async def get_tasks():
-    return {
-        "pending": [t.__dict__ for t in ceo_agent.task_queue if t.status == "pending"],
-        "completed": [t.__dict__ for t in ceo_agent.task_queue if t.status == "completed"]
-    }
+def get_tasks(request: Request, response: Response,
+              offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=500),
+              status: Optional[str] = None, agent: Optional[str] = None):
+    where = {key: value for key, value in (("status", status), ("target_agent", agent)) if value}
+    return _paginated(request, response, "tasks", offset, limit, where)
+
+@app.get("/resources")
+def get_resources():
+    return live_state.get("resources", "system") or {}
 
 @app.get("/metrics")
-async def get_metrics():
+def get_metrics(minutes: int = Query(60, ge=1, le=1440)):
+    samples = _require_agent().resource_manager.sampler.recent()
+    since = time.time() - minutes * 60
+    _, completed, _ = live_state.page("tasks", 0, 5000, {"status": "completed"})
+    throughput: Dict[int, int] = {}
+    for task in completed:
+        if task["updated_at"] >= since:
+            minute = int(task["updated_at"] // 60 * 60)
+            throughput[minute] = throughput.get(minute, 0) + 1
     return {
         "system_load": [
-            {"timestamp": datetime.now().isoformat(), "value": 0.45},
-            {"timestamp": datetime.now().isoformat(), "value": 0.48},
-            {"timestamp": datetime.now().isoformat(), "value": 0.52}
+            {"timestamp": datetime.fromtimestamp(s.timestamp).isoformat(), "value": s.cpu_percent / 100}
+            for s in samples if s.timestamp >= since
         ],
         "memory_usage": [
-            {"timestamp": datetime.now().isoformat(), "value": 0.65},
-            {"timestamp": datetime.now().isoformat(), "value": 0.67},
-            {"timestamp": datetime.now().isoformat(), "value": 0.70}
+            {"timestamp": datetime.fromtimestamp(s.timestamp).isoformat(), "value": s.ram_percent / 100}
+            for s in samples if s.timestamp >= since
         ],
         "task_throughput": [
-            {"timestamp": datetime.now().isoformat(), "value": 10},
-            {"timestamp": datetime.now().isoformat(), "value": 12},
-            {"timestamp": datetime.now().isoformat(), "value": 15}
+            {"timestamp": datetime.fromtimestamp(minute).isoformat(), "value": count}
+            for minute, count in sorted(throughput.items())
         ]
-    } 
\ No newline at end of file
+    }
+
+
+async def _state_changes(sections: List[str], min_interval: float) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    """Snapshot completo y después diffs coalescidos, como mucho uno cada `min_interval`.
+
+    Un cliente lento no acumula mensajes: mientras se le envía, los cambios
+    se agrupan por entrada y sólo se manda el valor más reciente de cada una.
+    None indica un heartbeat.
+    """
+    loop = asyncio.get_running_loop()
+    changed = asyncio.Event()
+
+    def wake():
+        try:
+            loop.call_soon_threadsafe(changed.set)
+        except RuntimeError:
+            pass  # Bucle cerrado: el cliente ya se desconectó
+
+    subscription = live_state.subscribe(sections, wake)
+    try:
+        version, state = live_state.snapshot(sections)
+        yield {"type": "snapshot", "version": version, "data": state}
+        while True:
+            try:
+                await asyncio.wait_for(changed.wait(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            changed.clear()
+            version, changes = live_state.drain(subscription)
+            if changes:
+                yield {"type": "diff", "version": version, "data": changes}
+            await asyncio.sleep(min_interval)
+    finally:
+        live_state.unsubscribe(subscription)
+
+
+def _stream_sections(sections: str) -> List[str]:
+    names = [name for name in sections.split(",") if name in STREAM_SECTIONS]
+    if not names:
+        raise HTTPException(status_code=400, detail=f"sections must be any of {', '.join(STREAM_SECTIONS)}")
+    return names
+
+@app.get("/stream")
+async def stream_state(request: Request, sections: str = ",".join(STREAM_SECTIONS),
+                       min_interval_ms: int = Query(250, ge=50, le=10000)):
+    changes = _state_changes(_stream_sections(sections), min_interval_ms / 1000)
+
+    async def events():
+        try:
+            async for message in changes:
+                if await request.is_disconnected():
+                    break
+                if message is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"id: {message['version']}\nevent: {message['type']}\ndata: {json.dumps(message['data'])}\n\n"
+        finally:
+            await changes.aclose()
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/ws")
+async def websocket_state(websocket: WebSocket, sections: str = ",".join(STREAM_SECTIONS),
+                          min_interval_ms: int = 250):
+    await websocket.accept()
+    names = [name for name in sections.split(",") if name in STREAM_SECTIONS] or list(STREAM_SECTIONS)
+    changes = _state_changes(names, max(0.05, min_interval_ms / 1000))
+    try:
+        async for message in changes:
+            await websocket.send_json(message or {"type": "heartbeat"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await changes.aclose()
@@ -0,0 +1,937 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the CEO agent scheduling components.
+Usage: python benchmarks.py [dispatcher|dag|task_store|importtime|deadlines|checkpoints|checkpoint_startup|hibernation|models|schedule|control_loop|metrics] [args...]
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import heapq
+import random
+import tempfile
+import threading
+import subprocess
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, fields
+
+from task_dispatcher import TaskDispatcher
+from dag_scheduler import DAGScheduler
+from task_store import TaskStore
+from lazy_imports import HEAVY_MODULES
+from deadline_scheduler import DeadlinePolicy, PRIORITY_LEVELS, priority_level
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts_implementacion'))
+from agent_state_manager import AgentStateManager, TaskCheckpoint, checkpoint_status
+from checkpoint_log import CheckpointLog, msgpack
+from checkpoint_index import CheckpointIndex, iso_to_timestamp
+from agent_supervisor import AgentSupervisor
+from model_residency import ModelResidencyManager, GB
+from schedule_index import ScheduleIndex
+import control_loop
+from control_loop import AdaptiveControlLoop
+from resource_sampler import ResourceSnapshot
+from metrics_store import MetricsStore
+
+AGENTS = [
+    "01_SEO_LAG", "02_CM_LAG", "03_PSICO_LAG", "04_CLIP_LAG", "05_MEDIA_LAG",
+    "06_TALENT_LAG", "07_CASH_LAG", "08_LAW_LAG", "09_IT_LAG", "10_DJ_LAG",
+    "11_WPM_LAG", "12_DEV_LAG", "13_ADS_LAG", "14_DONNA_LAG"
+]
+
+
+def _make_tasks(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    return [
+        SimpleNamespace(
+            task_id=f"task_{i}",
+            target_agent=rng.choice(AGENTS),
+            priority=rng.randint(1, 10),
+            resource_requirements={}
+        )
+        for i in range(count)
+    ]
+
+
+def bench_dispatcher(count: int = 10000):
+    """Queue `count` tasks with half of the agents blocked, then release them by events"""
+    blocked = set(AGENTS[::2])
+    executed = []
+    dispatcher = TaskDispatcher(
+        ensure_agent_ready=lambda agent_id: agent_id not in blocked,
+        allocate=lambda task: True,
+        execute=executed.append
+    )
+    tasks = _make_tasks(count)
+
+    start = time.perf_counter()
+    for task in tasks:
+        dispatcher.submit(task)
+    submit_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    first_pass = dispatcher.dispatch_pending()
+    # Blocked agents are parked: a second pass without events must do no work
+    idle_pass = dispatcher.dispatch_pending()
+    for agent_id in list(blocked):
+        blocked.discard(agent_id)
+        dispatcher.notify_agent_activated(agent_id)
+    second_pass = dispatcher.dispatch_pending()
+    dispatch_elapsed = time.perf_counter() - start
+
+    assert len(executed) == count, f"dispatched {len(executed)} of {count}"
+    print(f"Tasks: {count}")
+    print(f"Submit: {submit_elapsed * 1000:.1f} ms ({count / submit_elapsed:,.0f} tasks/s)")
+    print(f"Dispatch: {dispatch_elapsed * 1000:.1f} ms ({count / dispatch_elapsed:,.0f} tasks/s)")
+    print(f"Passes: ready={first_pass} idle={idle_pass} after_activation={second_pass}")
+    print(f"Stats: {dispatcher.stats}")
+
+
+def bench_dag(pipelines: int = 4, step_ms: int = 100):
+    """Run MEDIA -> CLIP -> (SEO || PSICO) -> DONNA pipelines through dispatcher + DAG"""
+    pool = ThreadPoolExecutor(max_workers=8)
+    dag = None
+
+    def run(task):
+        dag.mark_started(task.task_id)
+        time.sleep(step_ms / 1000)
+        dag.mark_finished(task.task_id)
+
+    dispatcher = TaskDispatcher(lambda agent_id: True, lambda task: True, lambda task: pool.submit(run, task))
+    dag = DAGScheduler(release=dispatcher.submit)
+    dispatcher.start()
+
+    stages = [("media", "05_MEDIA_LAG", []), ("clip", "04_CLIP_LAG", ["media"]),
+              ("seo", "01_SEO_LAG", ["clip"]), ("psico", "03_PSICO_LAG", ["clip"]),
+              ("donna", "14_DONNA_LAG", ["seo", "psico"])]
+    start = time.perf_counter()
+    for p in range(pipelines):
+        for name, agent_id, deps in stages:
+            dag.add(SimpleNamespace(
+                task_id=f"{name}_{p}", target_agent=agent_id, priority=5,
+                dependencies=[f"{dep}_{p}" for dep in deps], estimated_duration=f"{step_ms / 1000}s"
+            ))
+    # Planned critical path, from the estimates of the (still live) tasks
+    report = dag.critical_path()
+    while dispatcher.stats['dispatched'] < pipelines * len(stages) or dag.waiting_tasks():
+        time.sleep(0.005)
+    pool.shutdown(wait=True)
+    elapsed = time.perf_counter() - start
+    dispatcher.stop()
+
+    serial = pipelines * len(stages) * step_ms / 1000
+    print(f"Pipelines: {pipelines} x {len(stages)} steps of {step_ms} ms")
+    print(f"Serial execution: {serial:.2f} s | DAG execution: {elapsed:.2f} s")
+    print(f"Critical path: {report['length_seconds']:.2f} s via {' -> '.join(report['path'])}")
+    stats = dag.stats()
+    print(f"Graph after completion: {stats['live']} live tasks, {stats['remembered_outcomes']} remembered outcomes")
+
+    # A long pending chain: the critical path is iterative, so depth is not limited by recursion
+    chain = DAGScheduler(release=lambda task: None)
+    depth = 20000
+    for i in range(depth):
+        chain.add(SimpleNamespace(task_id=f"step_{i}", dependencies=[f"step_{i - 1}"] if i else [],
+                                  estimated_duration="1s"))
+    start = time.perf_counter()
+    length = chain.critical_path()['length_seconds']
+    print(f"Chain of {depth}: critical path {length:.0f} s computed in {(time.perf_counter() - start) * 1000:.0f} ms")
+    try:
+        chain.add(SimpleNamespace(task_id="orphan", dependencies=["never_submitted"]))
+        print("FAIL: unknown dependency accepted")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"Unknown dependency rejected: {e}")
+    if stats['live']:
+        print("FAIL: finished tasks were not evicted")
+        sys.exit(1)
+
+
+def bench_task_store(count: int = 10000):
+    """Enqueue, lease and ack `count` tasks through the SQLite WAL store, then replay after a 'crash'"""
+    tasks = [(task.task_id, vars(task), task.priority) for task in _make_tasks(count)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "tasks.db")
+        store = TaskStore(path)
+
+        start = time.perf_counter()
+        for task_id, payload, priority in tasks[:count // 2]:
+            store.enqueue(task_id, payload, priority)
+        single_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store.enqueue_many(tasks[count // 2:])
+        batch_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for index, (task_id, _, _) in enumerate(tasks[:count // 2]):
+            store.lease(task_id)
+            # Every 100th task fails: its row must survive the restart as 'failed'
+            store.ack(task_id, success=index % 100 != 0, error="benchmark failure")
+        lease_elapsed = time.perf_counter() - start
+
+        # Lease the rest and drop the store without acking: a restart must replay them
+        for task_id, _, _ in tasks[count // 2:]:
+            store.lease(task_id)
+        store.close()
+        start = time.perf_counter()
+        reopened = TaskStore(path)
+        replayed = reopened.replay()
+        replay_elapsed = time.perf_counter() - start
+        failed = reopened.failed_task_ids()
+        released = reopened.lease(tasks[0][0])
+        # Only failures a pending task depends on are looked up at startup
+        dependencies = failed[:1] + [task_id for task_id, _, _ in tasks[count // 2:count // 2 + 10]]
+        start = time.perf_counter()
+        failed_dependencies = reopened.failed_task_ids(dependencies)
+        lookup_elapsed = time.perf_counter() - start
+        # Past their retention, failures are dropped unless a pending task still depends on them
+        kept_by_retention = reopened.prune(keep=dependencies)
+        start = time.perf_counter()
+        pruned = reopened.prune(0, keep=dependencies)
+        prune_elapsed = time.perf_counter() - start
+        left = reopened.failed_task_ids()
+        reopened.close()
+
+    half = count // 2
+    assert len(replayed) == count - half, f"replayed {len(replayed)} of {count - half}"
+    assert len(failed) == (half + 99) // 100, f"{len(failed)} failed tasks kept, expected {(half + 99) // 100}"
+    assert not released, "a failed task could be leased again"
+    assert failed_dependencies == failed[:1], f"failed dependencies {failed_dependencies}, expected {failed[:1]}"
+    assert kept_by_retention == 0, f"{kept_by_retention} failures pruned before their retention"
+    assert pruned == len(failed) - 1 and left == failed[:1], f"pruned {pruned}, left {left}"
+    print(f"Tasks: {count}")
+    print(f"Enqueue (1 commit/task): {half / single_elapsed:,.0f} tasks/s")
+    print(f"Enqueue (batched): {(count - half) / batch_elapsed:,.0f} tasks/s")
+    print(f"Lease + ack: {half / lease_elapsed:,.0f} tasks/s")
+    print(f"Replay of {len(replayed)} unacked tasks: {replay_elapsed * 1000:.1f} ms")
+    print(f"Failed outcomes kept across restart: {len(failed)} | "
+          f"failed dependencies of {len(dependencies)} ids: {lookup_elapsed * 1000:.2f} ms")
+    print(f"Retention prune: {pruned} expired failures dropped in {prune_elapsed * 1000:.1f} ms, "
+          f"{len(left)} kept for a pending dependent")
+
+
+def _import_profile(module: str):
+    """Run `python -X importtime -c 'import module'`; ({direct import: cumulative us}, every module it loaded)"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "cumulative" not in line:
+            _, cumulative, name = line.split("|")
+            entries.append((len(name) - len(name.lstrip()), name.strip(), int(cumulative)))
+    # Children are printed right before their parent, more indented: walk back from `module`
+    index = max(i for i, (_, name, _) in enumerate(entries) if name == module)
+    depth = entries[index][0]
+    direct, loaded = {}, set()
+    for indent, name, cumulative in reversed(entries[:index]):
+        if indent <= depth:
+            break
+        loaded.add(name)
+        if indent == depth + 2:
+            direct[name] = cumulative
+    return direct, loaded
+
+
+def _import_wall_ms(module: str, runs: int = 5, preload: tuple = ()) -> float:
+    """Best-of-`runs` wall-clock import time in a fresh interpreter (-X importtime inflates it).
+
+    Modules in `preload` are imported before the clock starts, so their cost is left out.
+    """
+    setup = "".join(f"import {name}; " for name in preload)
+    code = f"{setup}import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    return min(float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                    cwd=cwd, check=True).stdout) for _ in range(runs)) * 1000
+
+
+# api builds its FastAPI app at module level (uvicorn loads api:app), so the
+# framework cannot be deferred; its budget covers only what api adds on top
+API_FRAMEWORK = ("fastapi", "fastapi.middleware.cors", "fastapi.responses")
+
+
+def bench_importtime(ceo_budget_ms: int = 300, api_budget_ms: int = 150):
+    """Import budget for ceo_agent and for api on top of FastAPI; exits non-zero when over budget or a heavy backend loads"""
+    failures = []
+    framework_ms = _import_wall_ms("fastapi")
+    for module, budget_ms, preload in (("ceo_agent", ceo_budget_ms, ()), ("api", api_budget_ms, API_FRAMEWORK)):
+        direct, loaded = _import_profile(module)
+        elapsed_ms = _import_wall_ms(module, preload=preload)
+        heavy = [name for name in HEAVY_MODULES if name in loaded]
+        slowest = sorted(((us, name) for name, us in direct.items()), reverse=True)[:5]
+        excluded = f", excluding {framework_ms:.0f} ms of FastAPI" if preload else ""
+        print(f"{module}: {elapsed_ms:.0f} ms (budget {budget_ms} ms{excluded})")
+        print(f"  slowest: {', '.join(f'{name} {us / 1000:.0f} ms' for us, name in slowest)}")
+        if elapsed_ms > budget_ms:
+            failures.append(f"{module} import took {elapsed_ms:.0f} ms > {budget_ms} ms")
+        if heavy:
+            failures.append(f"{module} imports heavy backends at load time: {', '.join(heavy)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+def _bucket_key(task, enqueued_at):
+    """Previous ordering: coarse level fixed at enqueue time, then raw priority"""
+    level = priority_level(task.priority)
+    if task.deadline_at is not None:
+        remaining = task.deadline_at - enqueued_at
+        if remaining < 300:
+            level = 'critical'
+        elif remaining < 900:
+            level = 'high'
+    return (PRIORITY_LEVELS.index(level), -task.priority)
+
+
+def _simulate(tasks, workers, key, policy=None, resume_overhead=5.0):
+    """Discrete-event run of `tasks` on `workers` slots; preempts through `policy` when given"""
+    events = [(task.arrival, 0, "arrive", task) for task in tasks]
+    heapq.heapify(events)
+    queue, running, seq = [], {}, 0
+    finished, preemptions = {}, 0
+    starts = {}
+
+    def start(task, now):
+        nonlocal seq
+        seq += 1
+        running[task.task_id] = (task, now, seq)
+        starts.setdefault(task.task_id, now)
+        heapq.heappush(events, (now + task.remaining, seq, "finish", task))
+
+    while events:
+        now, token, kind, task = heapq.heappop(events)
+        if kind == "finish":
+            if task.task_id not in running or running[task.task_id][2] != token:
+                continue  # Stale completion of a preempted run
+            del running[task.task_id]
+            finished[task.task_id] = now
+        else:
+            heapq.heappush(queue, (key(task, task.arrival), task.arrival, task.task_id, task))
+            if policy and len(running) >= workers:
+                head = queue[0][-1]
+                candidates = [(t, t.arrival, t.preemptions) for t, _, _ in running.values()]
+                victim = policy.choose_victim(head, head.arrival, candidates, now=now)
+                if victim:
+                    _, started, _ = running.pop(victim.task_id)
+                    victim.remaining -= now - started
+                    victim.remaining += resume_overhead
+                    victim.preemptions += 1
+                    preemptions += 1
+                    heapq.heappush(queue, (key(victim, victim.arrival), victim.arrival, victim.task_id, victim))
+        while queue and len(running) < workers:
+            start(heapq.heappop(queue)[-1], now)
+
+    with_deadline = [task for task in tasks if task.deadline_at is not None]
+    missed = sum(1 for task in with_deadline if finished[task.task_id] > task.deadline_at)
+    low_waits = sorted(starts[task.task_id] - task.arrival for task in tasks if task.priority < 4)
+    return {
+        "miss_rate": missed / len(with_deadline) if with_deadline else 0.0,
+        "mean_wait": sum(starts[t.task_id] - t.arrival for t in tasks) / len(tasks),
+        "low_priority_p95_wait": low_waits[int(len(low_waits) * 0.95)] if low_waits else 0.0,
+        "preemptions": preemptions
+    }
+
+
+def bench_deadlines(count: int = 2000, workers: int = 4, load_percent: int = 90, seed: int = 7):
+    """Deadline-miss simulator: static buckets vs EDF + aging vs EDF + aging + preemption"""
+    rng = random.Random(seed)
+
+    def make_tasks():
+        rng.seed(seed)
+        # Absolute clock so virtual deadlines and ISO deadlines share one epoch
+        tasks, arrival = [], time.time()
+        for i in range(count):
+            # Mostly short tasks plus occasional long MEDIA-style conversions
+            duration = rng.uniform(600, 1800) if rng.random() < 0.1 else rng.uniform(30, 180)
+            mean_duration = 0.1 * 1200 + 0.9 * 105
+            arrival += rng.expovariate(workers * load_percent / 100 / mean_duration)
+            deadline_at = arrival + duration + rng.uniform(60, 1800) if rng.random() < 0.4 else None
+            tasks.append(SimpleNamespace(
+                task_id=f"task_{i}", priority=rng.randint(1, 10), arrival=arrival,
+                remaining=duration, preemptions=0, deadline_at=deadline_at,
+                deadline=datetime.fromtimestamp(deadline_at).isoformat() if deadline_at else None,
+                estimated_duration=f"{duration:.0f}s"
+            ))
+        return tasks
+
+    policy = DeadlinePolicy()
+    runs = {
+        "buckets (previous)": _simulate(make_tasks(), workers, _bucket_key),
+        "edf + aging": _simulate(make_tasks(), workers, policy.key),
+        "edf + aging + preemption": _simulate(make_tasks(), workers, policy.key, policy),
+    }
+    print(f"Tasks: {count} on {workers} workers at {load_percent}% load (40% with deadlines, 10% long conversions)")
+    for name, result in runs.items():
+        print(f"{name:26} miss rate {result['miss_rate'] * 100:5.1f}% | mean wait {result['mean_wait']:7.0f} s | "
+              f"low-priority p95 wait {result['low_priority_p95_wait']:7.0f} s | preemptions {result['preemptions']}")
+
+    # Slack regression: deadline - 2 * duration < now < deadline - duration leaves
+    # duration - (deadline - now) seconds to spare, so the task is not urgent yet
+    now, duration = time.time(), 600
+    task = SimpleNamespace(task_id="slack_check", priority=5, estimated_duration=f"{duration}s",
+                           deadline=datetime.fromtimestamp(now + 1.5 * duration).isoformat())
+    slack = policy.slack(task, now, now)
+    victim = policy.choose_victim(task, now, [(SimpleNamespace(
+        task_id="background", priority=1, estimated_duration="60s", deadline=None), now, 0)], now)
+    print(f"Slack with the deadline 1.5x the duration away: {slack:.0f} s (expected {0.5 * duration:.0f} s)")
+    if abs(slack - 0.5 * duration) > 1 or victim is not None:
+        print("FAIL: slack subtracts the estimated duration twice and preempts too early")
+        sys.exit(1)
+
+
+def bench_checkpoints(steps: int = 5000):
+    """Bytes written to checkpoint a `steps`-step job: full pretty JSON per update vs delta log"""
+    checkpoint = TaskCheckpoint(
+        task_id="media_job", agent_name="05_MEDIA_LAG", task_type="transcode",
+        start_time=datetime.now().isoformat(), last_update=datetime.now().isoformat(),
+        progress_percentage=0.0, current_step="", completed_steps=[], pending_steps=[],
+        data_processed=0, total_data=steps, error_count=0, last_error=None,
+        estimated_completion=None, custom_data={"source": "/media/raw/session_01", "outputs": 0}
+    )
+
+    def progress(i):
+        checkpoint.completed_steps.append(f"clip_{i:06d}.mp4 -> proxy_{i:06d}.mp4")
+        checkpoint.current_step = f"clip_{i + 1:06d}.mp4"
+        checkpoint.data_processed = i + 1
+        checkpoint.progress_percentage = (i + 1) / steps * 100
+        checkpoint.last_update = datetime.now().isoformat()
+        checkpoint.custom_data["outputs"] = i + 1
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, "media_job.json")
+        json_bytes = 0
+        start = time.perf_counter()
+        for i in range(steps):
+            progress(i)
+            with open(json_path, "w") as f:
+                json_bytes += f.write(json.dumps(asdict(checkpoint), indent=2))
+        json_elapsed = time.perf_counter() - start
+
+        checkpoint.completed_steps.clear()
+        log = CheckpointLog(os.path.join(directory, "log"))
+        start = time.perf_counter()
+        for i in range(steps):
+            progress(i)
+            log.write("media_job", {field.name: getattr(checkpoint, field.name) for field in fields(checkpoint)})
+        log_elapsed = time.perf_counter() - start
+        log_size = os.path.getsize(log.path("media_job"))
+
+        start = time.perf_counter()
+        restored = CheckpointLog(log.directory).load("media_job")
+        load_elapsed = time.perf_counter() - start
+
+    assert restored == asdict(checkpoint), "restored checkpoint differs"
+    final_size = len(json.dumps(asdict(checkpoint), separators=(",", ":")))
+    print(f"Steps: {steps} | final checkpoint: {final_size / 1024:.0f} KiB | encoding: {'msgpack' if msgpack else 'json'}")
+    print(f"Full JSON rewrite: {json_bytes / 2**20:8.1f} MiB written | amplification {json_bytes / final_size:7.1f}x | "
+          f"{json_elapsed / steps * 1e6:6.0f} us/update")
+    print(f"Delta log:         {log.bytes_written / 2**20:8.1f} MiB written | amplification {log.bytes_written / final_size:7.1f}x | "
+          f"{log_elapsed / steps * 1e6:6.0f} us/update")
+    print(f"Log on disk: {log_size / 1024:.0f} KiB | recovery: {load_elapsed * 1000:.1f} ms")
+
+
+def bench_checkpoint_startup(count: int = 100000, seed: int = 3):
+    """Startup, lookup and 30-day retention over `count` checkpoints: JSON glob vs index"""
+    rng = random.Random(seed)
+    now = time.time()
+    checkpoints = []
+    for i in range(count):
+        progress = rng.choice([100.0, 100.0, 100.0, 40.0])
+        checkpoints.append(TaskCheckpoint(
+            task_id=f"task_{i:06d}", agent_name=rng.choice(AGENTS), task_type="processing",
+            start_time=datetime.fromtimestamp(now - 90 * 86400).isoformat(),
+            last_update=datetime.fromtimestamp(now - rng.uniform(0, 90 * 86400)).isoformat(),
+            progress_percentage=progress, current_step="Tarea completada exitosamente" if progress >= 100 else "step",
+            completed_steps=[f"step_{j}" for j in range(rng.randint(1, 20))], pending_steps=[],
+            data_processed=0, total_data=0, error_count=0, last_error=None, estimated_completion=None,
+            custom_data={}
+        ))
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_path = os.path.join(directory, "legacy")
+        os.makedirs(legacy_path)
+        for checkpoint in checkpoints:
+            with open(os.path.join(legacy_path, f"{checkpoint.task_id}.json"), "w") as f:
+                json.dump(asdict(checkpoint), f, indent=2)
+
+        # Previous startup: glob + json.load of every checkpoint
+        start = time.perf_counter()
+        loaded = {}
+        for checkpoint_file in Path(legacy_path).glob("*.json"):
+            with open(checkpoint_file, "r") as f:
+                checkpoint = TaskCheckpoint(**json.load(f))
+            loaded[checkpoint.task_id] = checkpoint
+        legacy_elapsed = time.perf_counter() - start
+        assert len(loaded) == count
+        del loaded
+
+        checkpoints_path = os.path.join(directory, "shared_resources", "state", "checkpoints")
+        log = CheckpointLog(checkpoints_path)
+        index = CheckpointIndex(os.path.join(checkpoints_path, "index.db"))
+        rows = []
+        for checkpoint in checkpoints:
+            log.compact(checkpoint.task_id, asdict(checkpoint))
+            rows.append((checkpoint.task_id, checkpoint.agent_name, checkpoint_status(checkpoint),
+                         iso_to_timestamp(checkpoint.last_update), log.size(checkpoint.task_id)))
+            log.forget(checkpoint.task_id)
+        index.upsert_many(rows)
+        index.set_meta("built", datetime.now().isoformat())
+        index.close()
+
+        os.chdir(directory)
+        try:
+            start = time.perf_counter()
+            manager = AgentStateManager(durability="immediate")
+            startup_elapsed = time.perf_counter() - start
+
+            sample = rng.sample(checkpoints, 1000)
+            start = time.perf_counter()
+            for checkpoint in sample:
+                assert manager.task_checkpoints[checkpoint.task_id].agent_name == checkpoint.agent_name
+            lookup_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            cleaned = manager.cleanup_old_checkpoints(30)
+            cleanup_elapsed = time.perf_counter() - start
+            manager.close()
+
+            # Crash after a log write but before its index upsert: the next startup must pick it up
+            crashed = asdict(checkpoints[0])
+            crashed["task_id"] = "task_crashed"
+            CheckpointLog(checkpoints_path).compact("task_crashed", crashed)
+            index = CheckpointIndex(os.path.join(checkpoints_path, "index.db"))
+            index.set_meta("open", "1")
+            index.close()
+            start = time.perf_counter()
+            manager = AgentStateManager(durability="immediate")
+            recovery_elapsed = time.perf_counter() - start
+            recovered = "task_crashed" in manager.task_checkpoints
+            manager.close()
+        finally:
+            os.chdir(cwd)
+
+    print(f"Checkpoints: {count}")
+    print(f"Startup, glob + parse every JSON: {legacy_elapsed * 1000:9.1f} ms")
+    print(f"Startup, index:                   {startup_elapsed * 1000:9.1f} ms")
+    print(f"Lazy lookup (index + log load):   {lookup_elapsed / len(sample) * 1e6:9.1f} us/checkpoint")
+    print(f"Retention (30 days): {cleaned} removed in {cleanup_elapsed * 1000:.1f} ms without opening checkpoints")
+    print(f"Startup after a crash (reconcile logs with the index): {recovery_elapsed * 1000:.1f} ms")
+    if not recovered:
+        print("FAIL: a checkpoint written just before a crash was not indexed on restart")
+        sys.exit(1)
+
+
+def _wait_rss(supervisor, agent_name, min_bytes, timeout=30.0):
+    deadline = time.perf_counter() + timeout
+    while supervisor.memory_bytes(agent_name) < min_bytes:
+        if time.perf_counter() > deadline:
+            raise RuntimeError(f"{agent_name} did not reach {min_bytes / 2**20:.0f} MiB RSS")
+        time.sleep(0.01)
+
+
+def bench_hibernation(alloc_mb: int = 512, rounds: int = 5):
+    """Hibernate/resume a child agent holding `alloc_mb` MiB: suspend vs exit + restart from checkpoint"""
+    model = "llama3.1:8b"
+    ollama = _SimulatedOllama(seconds_per_gb=2.5)
+    models = ModelResidencyManager(12, client=ollama, size_hints_gb=MODEL_SIZES_GB)
+    supervisor = AgentSupervisor(models=models)
+    agent_code = (f"import time; data = bytearray({alloc_mb} * 2**20)\n"
+                  "for i in range(0, len(data), 4096): data[i] = 1\n"
+                  "while True: time.sleep(1)")
+    supervisor.register("bench_agent", command=[sys.executable, "-c", agent_code], cwd=Path.cwd(), model=model)
+    models.acquire(model, "bench_agent")
+    ready_bytes = alloc_mb * 2**20
+    results = {}
+    try:
+        supervisor.start("bench_agent")
+        _wait_rss(supervisor, "bench_agent", ready_bytes)
+        for mode in ("suspend", "exit"):
+            hibernate_ms, resume_ms, ready_ms, reclaimed, unloaded = [], [], [], [], []
+            load_seconds = ollama.load_seconds
+            for _ in range(rounds):
+                stats = supervisor.hibernate("bench_agent", mode)
+                hibernate_ms.append(stats["latency_ms"])
+                reclaimed.append(stats["rss_reclaimed_mb"])
+                unloaded.append(stats["model_unloaded_mb"] if model not in ollama.loaded else 0.0)
+                start = time.perf_counter()
+                resume_ms.append(supervisor.resume("bench_agent", {"progress": "50%"})["latency_ms"])
+                _wait_rss(supervisor, "bench_agent", ready_bytes)
+                ready_ms.append((time.perf_counter() - start) * 1000)
+            results[mode] = (hibernate_ms, resume_ms, ready_ms, reclaimed, unloaded,
+                             ollama.load_seconds - load_seconds)
+    finally:
+        supervisor.shutdown()
+
+    print(f"Agent holding {alloc_mb} MiB and model {model} ({MODEL_SIZES_GB[model]} GB, simulated Ollama), "
+          f"{rounds} rounds per mode")
+    for mode, (hibernate_ms, resume_ms, ready_ms, reclaimed, unloaded, load_seconds) in results.items():
+        print(f"{mode:8} hibernate {sum(hibernate_ms) / rounds:7.1f} ms | resume {sum(resume_ms) / rounds:7.1f} ms | "
+              f"back to working set {sum(ready_ms) / rounds:7.1f} ms | RSS reclaimed {sum(reclaimed) / rounds:6.0f} MiB | "
+              f"model unloaded {sum(unloaded) / rounds:6.0f} MiB (reload {load_seconds / rounds:.1f} s simulated)")
+    if any(min(unloaded) <= 0 for *_, unloaded, _ in results.values()):
+        print("FAIL: hibernating left the agent's Ollama model resident")
+        sys.exit(1)
+
+
+AGENT_MODELS = {
+    "00_CEO_LAG": ("llama3.1:7b-instruct-q4_0", 2), "01_SEO_LAG": ("llama3.1:7b-instruct-q4_0", 3),
+    "02_CM_LAG": ("llama3.1:7b-instruct-q4_0", 3), "07_CASH_LAG": ("llama3.1:7b-instruct-q4_0", 3),
+    "14_DONNA_LAG": ("llama3.1:7b-instruct-q4_0", 3), "15_GHOST_LAG": ("codellama:7b-instruct-q4_0", 3),
+    "05_MEDIA_LAG": ("llama3.1:8b", 1), "09_IT_LAG": ("codellama:7b-instruct-q4_0", 4),
+    "12_DEV_LAG": ("codellama:7b-instruct-q4_0", 4),
+}
+MODEL_SIZES_GB = {"llama3.1:7b-instruct-q4_0": 4.1, "codellama:7b-instruct-q4_0": 3.8, "llama3.1:8b": 4.9}
+
+
+class _SimulatedOllama:
+    """Ollama stand-in whose loads take `seconds_per_gb` of simulated time (and `sleep_per_gb` of real time)"""
+
+    def __init__(self, seconds_per_gb: float, sleep_per_gb: float = 0.0, unload_sleep: float = 0.0):
+        self.seconds_per_gb = seconds_per_gb
+        self.sleep_per_gb = sleep_per_gb
+        self.unload_sleep = unload_sleep
+        self.loaded = {}
+        self.load_seconds = 0.0
+        self.loads = 0
+
+    def running(self):
+        return {name: (size, 0) for name, size in self.loaded.items()}
+
+    def load(self, model, keep_alive=-1):
+        time.sleep(MODEL_SIZES_GB[model] * self.sleep_per_gb)
+        self.loads += 1
+        self.loaded[model] = int(MODEL_SIZES_GB[model] * GB)
+        self.load_seconds += MODEL_SIZES_GB[model] * self.seconds_per_gb
+
+    def unload(self, model):
+        time.sleep(self.unload_sleep)
+        self.loaded.pop(model, None)
+
+
+def bench_models(switches: int = 500, ram_budget_gb: int = 12, seed: int = 11):
+    """Agent switches with unload-on-pause vs the residency manager (simulated model loads)"""
+    rng = random.Random(seed)
+    agents = [name for name in AGENT_MODELS if name != "00_CEO_LAG"]
+    sequence = [rng.choice(agents) for _ in range(switches)]
+
+    # Before: every pause unloaded the model and every resume loaded it again
+    before = _SimulatedOllama(seconds_per_gb=2.5)
+    previous = None
+    for agent in sequence:
+        if previous:
+            before.unload(AGENT_MODELS[previous][0])
+        before.load(AGENT_MODELS[agent][0])
+        previous = agent
+
+    after = _SimulatedOllama(seconds_per_gb=2.5)
+    manager = ModelResidencyManager(ram_budget_gb, client=after, size_hints_gb=MODEL_SIZES_GB)
+    for model, priority in set(AGENT_MODELS.values()):
+        manager.configure(model, priority=priority)
+    manager.configure(AGENT_MODELS["00_CEO_LAG"][0], pinned=True)
+    manager.acquire(AGENT_MODELS["00_CEO_LAG"][0], "00_CEO_LAG")
+    previous = None
+    for agent in sequence:
+        if previous:
+            manager.release(AGENT_MODELS[previous][0], previous)
+        manager.acquire(AGENT_MODELS[agent][0], agent)
+        previous = agent
+    stats = manager.stats()
+
+    print(f"Agent switches: {switches} | model budget {ram_budget_gb} GB | load cost 2.5 s/GB (simulated)")
+    print(f"Unload on pause:   {before.load_seconds / 60:7.1f} min loading models")
+    print(f"Residency manager: {after.load_seconds / 60:7.1f} min loading models | hit rate {stats['hit_rate'] * 100:.0f}% | "
+          f"evictions {stats['evictions']} | resident {stats['ram_used_gb']:.1f} GB")
+
+    # A slow load runs outside the manager's lock: a resident model is still served at once
+    # and a second user of the loading model waits for that load instead of starting another
+    slow = _SimulatedOllama(seconds_per_gb=2.5, sleep_per_gb=0.1)
+    manager = ModelResidencyManager(ram_budget_gb, client=slow, size_hints_gb=MODEL_SIZES_GB)
+    warm, cold = "llama3.1:7b-instruct-q4_0", "llama3.1:8b"
+    manager.acquire(warm, "00_CEO_LAG")
+    loaders = [threading.Thread(target=manager.acquire, args=(cold, f"user_{i}")) for i in range(2)]
+    for loader in loaders:
+        loader.start()
+    time.sleep(0.05)
+    start = time.perf_counter()
+    manager.acquire(warm, "01_SEO_LAG")
+    blocked_ms = (time.perf_counter() - start) * 1000
+    for loader in loaders:
+        loader.join()
+    print(f"Hit during a {MODEL_SIZES_GB[cold] * slow.sleep_per_gb * 1000:.0f} ms load: {blocked_ms:.1f} ms | "
+          f"loads for 2 concurrent users: {slow.loads - 1}")
+    if blocked_ms > 100 or slow.loads != 2 or manager.stats()["models"][cold]["users"] != ["user_0", "user_1"]:
+        print("FAIL: model loads block the residency manager or are duplicated")
+        sys.exit(1)
+
+    # Unloads run outside the lock too: while one is in flight the manager keeps answering,
+    # and a new user of the model being unloaded reloads it once the unload finishes
+    slow.unload_sleep = 0.5
+    for user in ("user_0", "user_1"):
+        manager.release(cold, user)
+    evicting = threading.Thread(target=manager.release, args=(cold, "user_1", True))
+    evicting.start()
+    time.sleep(0.05)
+    start = time.perf_counter()
+    manager.stats()
+    manager.acquire(warm, "02_CM_LAG")
+    unload_blocked_ms = (time.perf_counter() - start) * 1000
+    reloaded = manager.acquire(cold, "user_2")
+    evicting.join()
+    print(f"Hit and stats during a {slow.unload_sleep * 1000:.0f} ms unload: {unload_blocked_ms:.1f} ms | "
+          f"reload after it: {'resident' if reloaded and cold in slow.loaded else 'missing'}")
+    if unload_blocked_ms > 100 or not reloaded or cold not in slow.loaded:
+        print("FAIL: model unloads block the residency manager or race a reload")
+        sys.exit(1)
+
+
+SCHEDULES = {
+    "01_SEO_LAG": "08:00-12:00", "15_GHOST_LAG": "14:00-16:00", "02_CM_LAG": "12:00-14:00,18:00-20:00",
+    "07_CASH_LAG": "06:00-08:00", "14_DONNA_LAG": "16:00-18:00",
+}
+
+
+def _parse_in_schedule(schedule, at):
+    """Previous check: parse the schedule string on every call"""
+    current_time = at.time()
+    for sched in schedule.split(','):
+        if '-' in sched:
+            start_str, end_str = sched.split('-')
+            if datetime.strptime(start_str, "%H:%M").time() <= current_time <= datetime.strptime(end_str, "%H:%M").time():
+                return True
+    return False
+
+
+def bench_schedule(days: int = 30, interval_s: int = 60, process_start_s: int = 3, seed: int = 5):
+    """Schedule lookups per tick and time-to-first-task at each window opening (simulated loads)"""
+    index = ScheduleIndex({name: {"schedule": schedule} for name, schedule in SCHEDULES.items()})
+    rng = random.Random(seed)
+    instants = [datetime(2026, 1, 1) + timedelta(seconds=rng.randrange(86400)) for _ in range(2000)]
+
+    start = time.perf_counter()
+    for at in instants:
+        [name for name, schedule in SCHEDULES.items() if _parse_in_schedule(schedule, at)]
+    parse_us = (time.perf_counter() - start) / len(instants) * 1e6
+    start = time.perf_counter()
+    for at in instants:
+        index.active_agents(at)
+    index_us = (time.perf_counter() - start) / len(instants) * 1e6
+    mismatches = sum(index.is_active(name, at) != _parse_in_schedule(schedule, at)
+                     for at in instants for name, schedule in SCHEDULES.items())
+    # A prewarmed process is stopped when its window closes: window_end must be the last active instant
+    ends = [(name, index.window_end(name, opening)) for opening, name in index.upcoming(datetime(2026, 1, 1), timedelta(days=2))]
+    mismatches += sum(not index.is_active(name, end) or index.is_active(name, end + timedelta(seconds=1))
+                      for name, end in ends)
+
+    # Each opening: the fixed tick lands up to `interval_s` late, then the model
+    # (2.5 s/GB) and the agent process load unless they were prewarmed
+    openings = index.upcoming(datetime(2026, 1, 1), timedelta(days=days))
+    model_s = {name: MODEL_SIZES_GB[AGENT_MODELS[name][0]] * 2.5 for name in SCHEDULES}
+    cold = [rng.uniform(0, interval_s) + model_s[name] + process_start_s for _, name in openings]
+
+    # Prewarmed: woken at the opening with the model resident, so only the real thaw of
+    # the frozen agent process remains
+    with tempfile.TemporaryDirectory() as tmp:
+        supervisor = AgentSupervisor(agents_root=Path(tmp))
+        supervisor.register("agent", command=[sys.executable, "-c", "import time; time.sleep(600)"], cwd=Path(tmp))
+        supervisor.prewarm("agent", warmup_seconds=0.2)
+        time.sleep(0.5)
+        prewarmed = []
+        for _ in openings:
+            prewarmed.append(supervisor.resume("agent")["latency_ms"] / 1000)
+            supervisor.hibernate("agent", mode="suspend")
+        supervisor.shutdown()
+
+    def summary(values):
+        values = sorted(values)
+        return f"mean {sum(values) / len(values):7.3f} s | p95 {values[int(len(values) * 0.95)]:7.3f} s"
+
+    print(f"Schedule lookup per tick ({len(SCHEDULES)} agents): parse {parse_us:.1f} us | index {index_us:.1f} us | "
+          f"mismatches {mismatches}")
+    print(f"Window openings: {len(openings)} over {days} days | tick {interval_s} s | process start {process_start_s} s (simulated)")
+    print(f"Activate at tick, cold load:       {summary(cold)} time to first task")
+    print(f"Prewarm before opening, wake on it: {summary(prewarmed)} time to first task")
+
+
+def _ram_trace(seconds, spikes, ramp_s, rng):
+    """Per-second RAM %: idle noise around 55% plus `spikes` ramps to 96% (video conversions)"""
+    trace = [55 + rng.uniform(-3, 3) for _ in range(seconds)]
+    for start in rng.sample(range(0, seconds - ramp_s - 60, ramp_s + 60), spikes):
+        for offset in range(ramp_s + 60):
+            trace[start + offset] = 60 + 36 * min(offset / ramp_s, 1.0) + rng.uniform(-1, 1)
+    return trace
+
+
+def bench_control_loop(hours: int = 24, spikes: int = 20, ramp_s: int = 20, seed: int = 9):
+    """Detection delay of RAM spikes and steps taken: fixed 60 s loop vs adaptive loop (1 s snapshots)"""
+    rng = random.Random(seed)
+    critical = 90
+    trace = _ram_trace(hours * 3600, spikes, ramp_s, rng)
+    crossings = [t for t in range(1, len(trace)) if trace[t] > critical >= trace[t - 1]]
+
+    def detection_delays(step_times):
+        delays = []
+        for crossing in crossings:
+            step = next((t for t in step_times if t >= crossing and trace[t] > critical), None)
+            delays.append((step if step is not None else len(trace)) - crossing)
+        return delays
+
+    fixed_steps = list(range(rng.randrange(60), len(trace), 60))
+
+    # Adaptive: the real loop thread, fed one snapshot per simulated second by a fake sampler
+    clock = [0.0]
+    adaptive_steps, stepped = [], threading.Semaphore(0)
+
+    def step():
+        adaptive_steps.append(int(clock[0]))
+        stepped.release()
+
+    sampler = SimpleNamespace(callbacks=[])
+    sampler.subscribe, sampler.unsubscribe = sampler.callbacks.append, sampler.callbacks.remove
+    real_time = control_loop.time
+    control_loop.time = SimpleNamespace(monotonic=lambda: clock[0], time=time.time)
+    try:
+        loop = AdaptiveControlLoop(step=step, proximity=lambda snapshot: snapshot.ram_percent / critical,
+                                   min_interval=1, max_interval=60, sampler=sampler, psi=False)
+        wakes = []
+        loop_wake = loop.wake
+        loop.wake = lambda reason, at=None: (wakes.append(reason), loop_wake(reason, at))
+        thread = threading.Thread(target=loop.run, daemon=True)
+        thread.start()
+        while not sampler.callbacks:
+            time.sleep(0.001)
+        snapshot = ResourceSnapshot(*([0.0] * len(fields(ResourceSnapshot))))
+        snapshot_s = 0.0
+        start = time.perf_counter()
+        for t, ram in enumerate(trace):
+            clock[0] = float(t)
+            snapshot.ram_percent, snapshot.timestamp = ram, time.time()
+            requested = len(wakes)
+            snapshot_start = time.perf_counter()
+            for callback in list(sampler.callbacks):
+                callback(snapshot)
+            snapshot_s += time.perf_counter() - snapshot_start
+            if len(wakes) > requested and not stepped.acquire(timeout=5):
+                print(f"FAIL: the loop was woken at {t} s but never ran its step")
+                sys.exit(1)
+        elapsed = time.perf_counter() - start
+        loop.stop()
+        thread.join(5)
+    finally:
+        control_loop.time = real_time
+    stats = loop.stats()
+
+    for name, steps in (("Fixed 60 s loop", fixed_steps), ("Adaptive loop", adaptive_steps)):
+        delays = sorted(detection_delays(steps))
+        print(f"{name:16s}: {len(steps):6d} steps in {hours} h | spike detection mean {sum(delays) / len(delays):5.1f} s, "
+              f"max {delays[-1]:3d} s")
+    print(f"Spikes: {len(crossings)} crossings of {critical}% RAM | snapshot resolution 1 s (simulated trace, "
+          f"simulated clock) | wakeups {stats['wakeups']}")
+    print(f"Adaptive loop: {snapshot_s / len(trace) * 1e6:.1f} us per snapshot callback | "
+          f"wake-to-step {stats['mean_reaction_ms'] or 0:.2f} ms mean | {elapsed:.1f} s to replay the trace")
+    if stats["steps"] != len(adaptive_steps) or max(detection_delays(adaptive_steps)) > 1:
+        print("FAIL: the adaptive loop missed a spike or its step count does not match its stats")
+        sys.exit(1)
+
+
+def bench_metrics(hours: int = 24, seed: int = 13):
+    """`hours` of 1 s resource samples: whole-history JSON rewrite vs the SQLite time-series store"""
+    rng = random.Random(seed)
+    start_ts = 1_750_000_000
+    samples = [(start_ts + t, {"cpu_percent": rng.uniform(5, 95), "ram_percent": 50 + 20 * math.sin(t / 3600),
+                               "ram_available_gb": rng.uniform(4, 20), "swap_percent": 0.0, "disk_free_gb": 80.0})
+               for t in range(hours * 3600)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Before: the history list dumped as indented JSON (here once, at the end of the period)
+        records = [{"timestamp": datetime.fromtimestamp(ts).isoformat(), "cpu": {"cpu_percent": v["cpu_percent"]},
+                    "memory": {"ram_percent": v["ram_percent"], "ram_available_gb": v["ram_available_gb"],
+                               "swap_percent": v["swap_percent"]}} for ts, v in samples]
+        json_path = Path(tmp) / "metrics_history.json"
+        start = time.perf_counter()
+        with open(json_path, "w") as f:
+            json.dump(records, f, indent=2)
+        json_save = time.perf_counter() - start
+        start = time.perf_counter()
+        with open(json_path) as f:
+            json.load(f)
+        json_load = time.perf_counter() - start
+        json_bytes = json_path.stat().st_size
+
+        store = MetricsStore(Path(tmp) / "metrics.db")
+        start = time.perf_counter()
+        for ts, values in samples:
+            store.append(ts, values)
+        store.flush()
+        append_us = (time.perf_counter() - start) / len(samples) * 1e6
+        end_ts = start_ts + len(samples)
+        start = time.perf_counter()
+        raw = store.query(["cpu_percent", "ram_percent"], end_ts - 86400, end_ts, resolution="raw")
+        raw_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        minutes = store.query(["cpu_percent", "ram_percent"], start_ts, end_ts, resolution="1m", aggregate="max")
+        minutes_ms = (time.perf_counter() - start) * 1000
+        store.close()
+        db_bytes = sum(path.stat().st_size for path in Path(tmp).glob("metrics.db*"))
+        reopened = MetricsStore(Path(tmp) / "metrics.db")
+        closed_minutes = reopened.count("1m")
+        reopened.close()
+
+        # Migrating an unsorted history must roll up from its earliest record
+        shuffled = records[:600]
+        rng.shuffle(shuffled)
+        with open(json_path, "w") as f:
+            json.dump(shuffled, f)
+        imported = MetricsStore(Path(tmp) / "imported.db")
+        imported.import_json_history(json_path)
+        imported_minutes = imported.count("1m")
+        imported.close()
+
+    print(f"Samples: {len(samples)} ({hours} h at 1 s)")
+    print(f"JSON history:  rewrite {json_save * 1000:7.0f} ms per save | load {json_load * 1000:6.0f} ms | "
+          f"{json_bytes / 1024 ** 2:.1f} MiB")
+    print(f"Metrics store: append {append_us:5.1f} us/sample (no rewrite) | {db_bytes / 1024 ** 2:.1f} MiB with 1m/1h rollups")
+    print(f"Queries: last 24 h raw {len(raw['timestamp'])} points in {raw_ms:.0f} ms | "
+          f"whole period per-minute max {len(minutes['timestamp'])} points in {minutes_ms:.1f} ms")
+    expected_minutes = len({ts // 60 for ts, _ in samples})
+    expected_imported = len({ts // 60 for ts, _ in samples[:600]})
+    print(f"Per-minute rollups after close: {closed_minutes}/{expected_minutes} | "
+          f"after unsorted import: {imported_minutes}/{expected_imported}")
+    if closed_minutes != expected_minutes or imported_minutes != expected_imported:
+        print("FAIL: the open minute or part of an imported history was never rolled up")
+        sys.exit(1)
+
+
+BENCHMARKS = {
+    "dispatcher": bench_dispatcher,
+    "dag": bench_dag,
+    "task_store": bench_task_store,
+    "importtime": bench_importtime,
+    "deadlines": bench_deadlines,
+    "checkpoints": bench_checkpoints,
+    "checkpoint_startup": bench_checkpoint_startup,
+    "hibernation": bench_hibernation,
+    "models": bench_models,
+    "schedule": bench_schedule,
+    "control_loop": bench_control_loop,
+    "metrics": bench_metrics,
+}
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(f"Usage: python benchmarks.py [{'|'.join(BENCHMARKS)}] [args...]")
+        return
+    args = [int(arg) for arg in sys.argv[2:]]
+    BENCHMARKS[sys.argv[1]](*args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,32 @@
 import sys
 import os
+import shutil
 import psutil
-import GPUtil
-import numpy as np
-import torch
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
-from dataclasses import dataclass
-from queue import PriorityQueue
+from dataclasses import dataclass, asdict
 import threading
 import time
 import json
 import concurrent.futures
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
+from task_dispatcher import TaskDispatcher
+from dag_scheduler import DAGScheduler, parse_duration
+from deadline_scheduler import DeadlinePolicy, TaskPreempted, iso_timestamp
+from task_batcher import TaskBatcher
+from resource_ledger import ResourceLedger
+from task_store import TaskStore
+from live_state import LiveState
+from lazy_imports import lazy_import
+
+# Imported on the first GPU task, never at startup
+torch = lazy_import('torch')
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts_implementacion'))
+from resource_sampler import get_shared_sampler
+from agent_state_manager import AgentStateManager
+
 @dataclass
 class SystemResources:
     """Current system resource state"""
@@ -48,9 +61,20 @@ class Task:
 class ResourceOptimizer:
     def __init__(self, config: Dict):
         self.config = config
-        self.gpu_available = torch.cuda.is_available()
+        # Cheap hint until a GPU task actually needs torch; CPU-only boxes never import it
+        self.gpu_available = shutil.which('nvidia-smi') is not None and torch.available()
         self.current_power_profile = "balanced"
-        self._setup_gpu()
+        self._gpu_ready = False
+        self._gpu_lock = threading.Lock()
+
+    def ensure_gpu_backend(self) -> bool:
+        """Import torch and configure CUDA on first use; False if no usable GPU"""
+        with self._gpu_lock:
+            if not self._gpu_ready and self.gpu_available:
+                self.gpu_available = torch.cuda.is_available()
+                self._setup_gpu()
+                self._gpu_ready = True
+            return self.gpu_available
         
     def _setup_gpu(self):
         """Initialize GPU settings and CUDA capabilities"""
@@ -146,59 +170,61 @@ class ResourceOptimizer:
 class ResourceManager:
     def __init__(self, config: Dict):
         self.config = config
-        self.resource_locks = {
-            'gpu': threading.Lock(),
-            'cpu': threading.Lock(),
-            'ram': threading.Lock()
-        }
+        hardware = self.config['hardware_resources']
+        self.ledger = ResourceLedger(
+            capacity={
+                'ram_gb': hardware['ram']['total_gb'],
+                'gpu_vram_gb': hardware['gpu']['vram_gb'],
+                'cpu_threads': hardware['cpu']['threads']
+            },
+            headroom={
+                'ram_gb': hardware['ram']['reserved_gb'],
+                'gpu_vram_gb': hardware['gpu']['reserved_vram_gb'],
+                'cpu_threads': hardware['cpu']['reserved_threads']
+            }
+        )
+        self.on_resources_changed = None
         self.active_tasks = {}
-        self.resource_state = self._get_current_resources()
+        self.resource_state = None
         self.optimizer = ResourceOptimizer(config)
-        self.thread_pool = ThreadPoolExecutor(max_workers=self.config['hardware_resources']['cpu']['max_concurrent_cpu_tasks'])
-        self.process_pool = ProcessPoolExecutor(max_workers=self.config['hardware_resources']['cpu']['cores'])
+        self.thread_pool = ThreadPoolExecutor(max_workers=hardware['cpu']['max_concurrent_cpu_tasks'])
+        self.process_pool = ProcessPoolExecutor(max_workers=hardware['cpu']['cores'])
+        # One shared sampler feeds every consumer; subscribing replays the latest snapshot
+        self.sampler = get_shared_sampler(self.config['resource_monitoring'].get('sample_interval_seconds', 2))
+        self.sampler.subscribe(self._on_snapshot)
+
+    def _on_snapshot(self, snapshot):
+        """Turn a sampler snapshot into the cached resource state"""
+        self._update_resource_state(self._resources_from_snapshot(snapshot))
+
+    def _update_resource_state(self, resources: Optional[SystemResources]):
+        """Publish a new resource sample to the cache and the reservation ledger"""
+        if not resources:
+            return
+        self.resource_state = resources
+        grew = self.ledger.refresh({
+            'ram_gb': resources.available_ram_gb,
+            'gpu_vram_gb': resources.available_gpu_vram_gb
+        })
+        if grew and self.on_resources_changed:
+            self.on_resources_changed()
         
-    def _get_current_resources(self) -> SystemResources:
-        """Get detailed current system resource state"""
+    def _resources_from_snapshot(self, snapshot) -> Optional[SystemResources]:
+        """Build the detailed resource state from a sampler snapshot"""
         try:
-            # Get CPU and RAM info
-            cpu_percent = psutil.cpu_percent(interval=1)
-            ram = psutil.virtual_memory()
-            available_ram_gb = ram.available / (1024 ** 3)
-            memory_pressure = (ram.total - ram.available) / ram.total * 100
-            
-            # Get CPU temperature if available
-            cpu_temp = None
-            try:
-                temps = psutil.sensors_temperatures()
-                if 'coretemp' in temps:
-                    cpu_temp = max(temp.current for temp in temps['coretemp'])
-            except:
-                pass
-            
-            # Get GPU info
-            gpus = GPUtil.getGPUs()
-            if gpus:
-                gpu = gpus[0]  # Using first GPU
-                gpu_vram = gpu.memoryFree / 1024  # Convert to GB
-                gpu_temp = gpu.temperature
-                gpu_usage = gpu.load * 100
-                gpu_power = gpu.powerUsage if hasattr(gpu, 'powerUsage') else None
-            else:
-                gpu_vram = 0
-                gpu_temp = 0
-                gpu_usage = 0
-                gpu_power = None
+            def known(value, default=None):
+                return default if value is None or value != value else value
 
             return SystemResources(
-                available_ram_gb=available_ram_gb,
+                available_ram_gb=snapshot.ram_available_gb,
                 available_cpu_threads=psutil.cpu_count() - psutil.cpu_count(logical=False),
-                available_gpu_vram_gb=gpu_vram,
-                cpu_usage_percent=cpu_percent,
-                gpu_usage_percent=gpu_usage,
-                gpu_temp=gpu_temp,
-                cpu_temp=cpu_temp,
-                gpu_power_usage=gpu_power,
-                memory_pressure=memory_pressure
+                available_gpu_vram_gb=known(snapshot.gpu_vram_free_gb, 0),
+                cpu_usage_percent=snapshot.cpu_percent,
+                gpu_usage_percent=known(snapshot.gpu_percent, 0),
+                gpu_temp=known(snapshot.gpu_temp, 0),
+                cpu_temp=known(snapshot.cpu_temp),
+                gpu_power_usage=known(snapshot.gpu_power_w),
+                memory_pressure=(snapshot.ram_total_gb - snapshot.ram_available_gb) / snapshot.ram_total_gb * 100
             )
         except Exception as e:
             print(f"Error getting resource state: {e}")
@@ -209,11 +235,11 @@ class ResourceManager:
         results = []
         
         # Check if tasks can be GPU-accelerated
-        resources = self._get_current_resources()
+        resources = self.resource_state
         use_gpu = any(self.optimizer.can_offload_to_gpu(task.task_type, resources) for task in tasks)
         
         try:
-            if use_gpu:
+            if use_gpu and self.optimizer.ensure_gpu_backend():
                 # Use GPU processing
                 with torch.cuda.device(0):
                     for task in tasks:
@@ -266,65 +292,33 @@ class ResourceManager:
 
     def can_allocate_resources(self, task: Task) -> bool:
         """Check if required resources are available"""
-        resources = self._get_current_resources()
-        if not resources:
-            return False
-
-        requirements = task.resource_requirements
-        return (
-            resources.available_ram_gb >= requirements.get('ram_gb', 0) and
-            resources.available_cpu_threads >= requirements.get('cpu_threads', 0) and
-            resources.available_gpu_vram_gb >= requirements.get('gpu_vram_gb', 0)
-        )
+        return self.ledger.can_reserve(task.resource_requirements)
 
     def allocate_resources(self, task: Task) -> bool:
-        """Attempt to allocate resources for a task"""
-        if not self.can_allocate_resources(task):
-            return False
-
-        # Acquire all needed locks
-        acquired_locks = []
-        try:
-            for resource in ['ram', 'cpu', 'gpu']:
-                if task.resource_requirements.get(f'{resource}_gb', 0) > 0:
-                    self.resource_locks[resource].acquire()
-                    acquired_locks.append(resource)
-            
-            # If we got here, we have all needed locks
-            self.active_tasks[task.task_id] = task
-            return True
-
-        except Exception as e:
-            print(f"Error allocating resources: {e}")
-            # Release any acquired locks
-            for resource in acquired_locks:
-                self.resource_locks[resource].release()
+        """Attempt to reserve resources for a task"""
+        if not self.ledger.try_reserve(task.task_id, task.resource_requirements):
             return False
+        self.active_tasks[task.task_id] = task
+        return True
 
     def release_resources(self, task_id: str):
         """Release resources held by a task"""
-        if task_id in self.active_tasks:
-            task = self.active_tasks[task_id]
-            for resource in ['ram', 'cpu', 'gpu']:
-                if task.resource_requirements.get(f'{resource}_gb', 0) > 0:
-                    self.resource_locks[resource].release()
-            del self.active_tasks[task_id]
+        self.ledger.release(task_id)
+        self.active_tasks.pop(task_id, None)
 
 class CEOAgent:
-    def __init__(self):
+    BATCH_TASK_TYPES = ['image_processing', 'text_analysis', 'data_processing']
+
+    def __init__(self, live_state: Optional[LiveState] = None):
         self.config = self._load_config()
+        self.live_state = live_state or LiveState(limits={'tasks': 5000})
+        checkpoints = self.config['task_queues'].get('checkpoints', {})
+        self.state_manager = AgentStateManager(
+            durability=checkpoints.get('durability', 'deferred'),
+            flush_interval=checkpoints.get('flush_interval_seconds', 1.0)
+        )
+        self.state_manager.add_checkpoint_listener(self._publish_checkpoint)
         self.resource_manager = ResourceManager(self.config)
-        self.task_queues = {
-            'critical': PriorityQueue(),
-            'high': PriorityQueue(),
-            'medium': PriorityQueue(),
-            'low': PriorityQueue()
-        }
-        self.batch_queues = {
-            'image_processing': [],
-            'text_analysis': [],
-            'data_processing': []
-        }
         self.active_agents = {
             "00_CEO_LAG": {"status": "active", "last_check": None},
             "01_SEO_LAG": {"status": "inactive", "last_check": None},
@@ -343,6 +337,48 @@ class CEOAgent:
             "14_DONNA_LAG": {"status": "active", "last_check": None}
         }
         self.activation_groups = self.config['agent_activation_rules']['activation_groups']
+        preemption = self.config['task_queues'].get('preemption', {})
+        self.deadline_policy = DeadlinePolicy(
+            max_wait_seconds={level: info['max_wait_time']
+                              for level, info in self.config['task_queues']['priority_levels'].items()},
+            aging_factor=preemption.get('aging_factor', 2.0),
+            preempt_slack_seconds=preemption.get('slack_seconds', 60),
+            min_preempt_gain_seconds=preemption.get('min_gain_seconds', 300),
+            max_preemptions=preemption.get('max_preemptions_per_task', 2)
+        )
+        self.preemption_enabled = preemption.get('enabled', True)
+        self._enqueued_at: Dict[str, float] = {}
+        self._preemptions: Dict[str, int] = {}
+        self.running_tasks: Dict[str, Tuple[Task, threading.Event]] = {}
+        for agent_id, info in self.active_agents.items():
+            self.live_state.update('agents', agent_id, info)
+        self.dispatcher = TaskDispatcher(
+            ensure_agent_ready=self._ensure_agent_ready,
+            allocate=self.resource_manager.allocate_resources,
+            execute=self._submit_for_execution,
+            priority_key=self._task_sort_key,
+            on_blocked=self._on_task_blocked
+        )
+        self.dispatcher.start()
+        self.resource_manager.on_resources_changed = self.dispatcher.notify_resources_released
+        self.dag = DAGScheduler(release=self._enqueue_ready_task, cancel=self._cancel_task)
+        batch_config = self.config['resource_optimization']['task_optimization']['batch_processing']
+        self.batcher = TaskBatcher(
+            task_types=self.BATCH_TASK_TYPES if batch_config['enabled'] else [],
+            max_batch_size=batch_config['max_batch_size'],
+            max_linger_seconds=batch_config.get('max_wait_ms', 500) / 1000,
+            flush=self._execute_batch
+        )
+        self.batcher.start()
+        persistence = self.config['task_queues'].get('persistence', {})
+        self.task_store = TaskStore(
+            persistence.get('path', 'shared_resources/state/ceo_tasks.db'),
+            visibility_timeout=persistence.get('visibility_timeout_seconds', 600),
+            max_attempts=self.config['task_processing']['retry_attempts'],
+            failed_retention_days=persistence.get('failed_retention_days', 7)
+        )
+        self._replay_persisted_tasks()
+        self.resource_manager.sampler.subscribe(self._publish_resources)
         
         # Start monitoring threads
         self._start_monitoring_threads()
@@ -351,8 +387,8 @@ class CEOAgent:
         """Start all monitoring and optimization threads"""
         threads = [
             threading.Thread(target=self._monitor_resources, daemon=True),
-            threading.Thread(target=self._process_batch_queues, daemon=True),
-            threading.Thread(target=self._optimize_power_profile, daemon=True)
+            threading.Thread(target=self._optimize_power_profile, daemon=True),
+            threading.Thread(target=self._reclaim_expired_tasks, daemon=True)
         ]
         
         for thread in threads:
@@ -362,7 +398,7 @@ class CEOAgent:
         """Continuously optimize power profile"""
         while True:
             try:
-                resources = self.resource_manager._get_current_resources()
+                resources = self.resource_manager.resource_state
                 if resources:
                     self.resource_manager.optimizer.adjust_power_profile(resources)
                 time.sleep(5)
@@ -370,71 +406,205 @@ class CEOAgent:
                 print(f"Error in power optimization: {e}")
                 time.sleep(5)
 
-    def _process_batch_queues(self):
-        """Process tasks in batch queues"""
+    def _execute_batch(self, batch: List[Task]):
+        """Execute a flushed batch and report each task to the dependency graph"""
+        for task in batch:
+            self.task_store.lease(task.task_id, self._lease_timeout(task))
+            self.dag.mark_started(task.task_id)
+            task.status = "running"
+            self._publish_task(task)
+        results = self.resource_manager.execute_task_batch(batch)
+        for task, result in zip(batch, results):
+            task.status = "error" if "error" in result else "completed"
+            task.error_message = result.get("error")
+            self.task_store.ack(task.task_id, success=task.status == "completed", error=task.error_message)
+            self._enqueued_at.pop(task.task_id, None)
+            self._publish_task(task)
+            self.dag.mark_finished(task.task_id, success=task.status == "completed")
+
+    def add_task(self, task: Task):
+        """Persist the task, then hold it back until its dependencies have completed"""
+        self.task_store.enqueue(task.task_id, asdict(task), task.priority)
+        self._publish_task(task)
+        try:
+            self.dag.add(task)
+        except ValueError as e:
+            # Unknown dependency or cycle: the task could never run, fail it now
+            task.status = "error"
+            task.error_message = str(e)
+            self.task_store.ack(task.task_id, success=False, error=task.error_message)
+            self._publish_task(task)
+            raise
+
+    def _publish_task(self, task: Task):
+        """Push a task's current state to the live snapshot served by the API"""
+        self.live_state.update('tasks', task.task_id, {
+            'task_id': task.task_id,
+            'target_agent': task.target_agent,
+            'task_type': task.task_type,
+            'priority': task.priority,
+            'status': task.status,
+            'deadline': task.deadline,
+            'error_message': task.error_message
+        })
+
+    def _publish_checkpoint(self, checkpoint):
+        """Merge a TaskCheckpoint's progress into the task's live entry"""
+        self.live_state.update('tasks', checkpoint.task_id, {
+            'task_id': checkpoint.task_id,
+            'target_agent': checkpoint.agent_name,
+            'task_type': checkpoint.task_type,
+            'progress_percentage': checkpoint.progress_percentage,
+            'current_step': checkpoint.current_step,
+            'estimated_completion': checkpoint.estimated_completion
+        })
+
+    def _publish_resources(self, snapshot):
+        """Push a sampler snapshot to the live snapshot (NaN -> None for JSON)"""
+        self.live_state.update('resources', 'system', {
+            key: None if value != value else value for key, value in snapshot.to_dict().items()
+        })
+
+    def _replay_persisted_tasks(self):
+        """Re-schedule tasks that were queued or running when the process last stopped"""
+        payloads = self.task_store.replay()
+        pending = {payload['task_id'] for payload in payloads}
+        dependencies = {dep for payload in payloads for dep in payload.get('dependencies') or []}
+        # Old failures nothing waits on are dropped; the rest tell their dependents they failed
+        pruned = self.task_store.prune(keep=dependencies)
+        failed = set(self.task_store.failed_task_ids(dependencies - pending))
+        for task_id in failed:
+            self.dag.mark_finished(task_id, success=False)
+        for payload in payloads:
+            task = Task(**payload)
+            for dep in task.dependencies or []:
+                # Only successful acks delete a row, so a dependency that is
+                # neither pending nor failed completed in an earlier run
+                if dep not in pending and dep not in failed:
+                    self.dag.mark_finished(dep, success=True)
+            self._publish_task(task)
+            self.dag.add(task)
+        if payloads or pruned:
+            print(f"Replayed {len(payloads)} persisted tasks ({len(failed)} failed or dead dependencies, "
+                  f"{pruned} expired failures pruned)")
+
+    def _lease_timeout(self, task: Task) -> Optional[float]:
+        """Visibility timeout: twice the estimated duration, else the configured default"""
+        estimate = parse_duration(task.estimated_duration)
+        return estimate * 2 if estimate else None
+
+    def _reclaim_expired_tasks(self):
+        """Redeliver tasks whose lease expired without an acknowledgement"""
+        interval = self.config['task_queues'].get('persistence', {}).get('reclaim_interval_seconds', 30)
         while True:
             try:
-                for queue_type, queue in self.batch_queues.items():
-                    if len(queue) >= self.config['resource_optimization']['task_optimization']['batch_processing']['max_batch_size']:
-                        batch = queue[:self.config['resource_optimization']['task_optimization']['batch_processing']['max_batch_size']]
-                        self.batch_queues[queue_type] = queue[self.config['resource_optimization']['task_optimization']['batch_processing']['max_batch_size']:]
-                        self.resource_manager.execute_task_batch(batch)
-                time.sleep(0.1)
+                for payload in self.task_store.reclaim_expired():
+                    print(f"Lease expired for task {payload['task_id']}, redelivering")
+                    self._enqueue_ready_task(Task(**payload))
             except Exception as e:
-                print(f"Error processing batch queues: {e}")
-                time.sleep(1)
+                print(f"Error reclaiming expired tasks: {e}")
+            time.sleep(interval)
+
+    def _enqueue_ready_task(self, task: Task):
+        """Add a task whose dependencies are satisfied to the appropriate queue"""
+        if not self.batcher.add(task):
+            self.dispatcher.submit(task)
+
+    def _cancel_task(self, task: Task, reason: str):
+        """Mark a task that can no longer run because a dependency failed"""
+        task.status = "cancelled"
+        task.error_message = reason
+        self.task_store.ack(task.task_id, success=False, error=reason)
+        self._enqueued_at.pop(task.task_id, None)
+        self._publish_task(task)
+
+    def get_batching_report(self) -> Dict[str, Any]:
+        """Pending batch sizes plus fill-ratio and linger-time histograms per task type"""
+        return {
+            "pending": self.batcher.pending_counts(),
+            "stats": self.batcher.stats()
+        }
 
-    def add_task(self, task: Task):
-        """Add task to appropriate queue"""
-        if task.task_type in self.batch_queues:
-            self.batch_queues[task.task_type].append(task)
-        else:
-            priority_queue = self._get_priority_queue(task)
-            priority_queue.put((task.priority, task))
-            self._process_queues()
-
-    def _get_priority_queue(self, task: Task) -> PriorityQueue:
-        """Determine which queue to use based on task properties"""
-        if task.deadline:
-            deadline_delta = datetime.fromisoformat(task.deadline) - datetime.now()
-            if deadline_delta.total_seconds() < 300:
-                return self.task_queues['critical']
-            elif deadline_delta.total_seconds() < 900:
-                return self.task_queues['high']
-        
-        # Default based on task priority
-        if task.priority >= 8:
-            return self.task_queues['critical']
-        elif task.priority >= 6:
-            return self.task_queues['high']
-        elif task.priority >= 4:
-            return self.task_queues['medium']
-        else:
-            return self.task_queues['low']
-
-    def _process_queues(self):
-        """Process tasks from queues based on resource availability"""
-        for queue_name in ['critical', 'high', 'medium', 'low']:
-            queue = self.task_queues[queue_name]
-            while not queue.empty():
-                _, task = queue.get()
-                
-                # Check if target agent is active
-                if self.active_agents[task.target_agent]['status'] != 'active':
-                    if not self._can_activate_agent(task.target_agent):
-                        queue.put((task.priority, task))
-                        continue
-                    self.activate_agent(task.target_agent)
-                
-                # Try to allocate resources
-                if self.resource_manager.can_allocate_resources(task):
-                    if self.resource_manager.allocate_resources(task):
-                        self.execute_task(task)
-                    else:
-                        queue.put((task.priority, task))
-                else:
-                    queue.put((task.priority, task))
-                    break
+    def get_pipeline_report(self) -> Dict[str, Any]:
+        """Blocked tasks and critical-path length of the dependency graph"""
+        return {
+            "waiting_on_dependencies": self.dag.waiting_tasks(),
+            "critical_path": self.dag.critical_path()
+        }
+
+    def get_system_status(self) -> Dict[str, Any]:
+        """Scheduler, reservation and persistence overview for the API"""
+        return {
+            "active_agents": [agent_id for agent_id, info in self.active_agents.items() if info['status'] == 'active'],
+            "queue_depths": self.dispatcher.queue_depths(),
+            "dispatcher": dict(self.dispatcher.stats),
+            "resources": self.resource_manager.ledger.snapshot(),
+            "persisted_tasks": self.task_store.counts(),
+            "pipeline": self.get_pipeline_report(),
+            "batching": self.get_batching_report()
+        }
+
+    def _task_sort_key(self, task: Task) -> Tuple[float, int]:
+        """Dispatch order: earliest virtual deadline (real deadline or aged max wait) first"""
+        # Age from the task's creation time so waiting survives restarts and preemptions
+        enqueued_at = self._enqueued_at.setdefault(task.task_id, iso_timestamp(task.timestamp) or time.time())
+        return self.deadline_policy.key(task, enqueued_at)
+
+    def _on_task_blocked(self, task: Task, reason: str):
+        """An agent's most urgent task cannot start: preempt a less urgent running task if it is due"""
+        if not self.preemption_enabled:
+            return
+        running = [
+            (running_task, self._enqueued_at.get(task_id, time.time()), self._preemptions.get(task_id, 0))
+            for task_id, (running_task, preempt) in list(self.running_tasks.items())
+            if not preempt.is_set() and self._frees_blocker(running_task, task, reason)
+        ]
+        victim = self.deadline_policy.choose_victim(task, self._enqueued_at[task.task_id], running)
+        if victim:
+            print(f"Preempting task {victim.task_id} for {task.task_id} (blocked on {reason})")
+            self.running_tasks[victim.task_id][1].set()
+
+    def _frees_blocker(self, candidate: Task, task: Task, reason: str) -> bool:
+        """Whether preempting `candidate` can unblock `task`: same agent or activation group
+        when blocked on activation, a reservation of a short resource when blocked on resources"""
+        if reason == 'agent_activation':
+            if candidate.target_agent == task.target_agent:
+                return True
+            return any(task.target_agent in group['agents'] and candidate.target_agent in group['agents']
+                       for group in self.activation_groups.values())
+        if reason == 'resources':
+            ledger = self.resource_manager.ledger
+            held = ledger.reservation(candidate.task_id)
+            return any(held.get(key, 0) > 0 for key in ledger.shortfall(task.resource_requirements))
+        return False
+
+    def check_preemption(self, task_id: str):
+        """Called by task execution between steps; raises TaskPreempted if the task must yield"""
+        # Preemption is cooperative: a flagged task only yields when its code
+        # reaches this call, so work that never checks runs to completion
+        entry = self.running_tasks.get(task_id)
+        if entry and entry[1].is_set():
+            raise TaskPreempted(task_id)
+
+    def _checkpoint_preempted(self, task: Task):
+        """Record the preemption so the task resumes from its checkpoint when re-dispatched"""
+        if task.task_id not in self.state_manager.task_checkpoints:
+            self.state_manager.create_task_checkpoint(task.task_id, task.target_agent, task.task_type)
+        self.state_manager.update_task_checkpoint(task.task_id, current_step="Preempted by a more urgent task")
+        self._preemptions[task.task_id] = self._preemptions.get(task.task_id, 0) + 1
+
+    def _ensure_agent_ready(self, agent_id: str) -> bool:
+        """Make sure the target agent is active, activating it if its group allows"""
+        if self.active_agents[agent_id]['status'] == 'active':
+            return True
+        if not self._can_activate_agent(agent_id):
+            return False
+        self.activate_agent(agent_id)
+        return True
+
+    def _submit_for_execution(self, task: Task):
+        """Run a dispatched task off the dispatcher thread"""
+        self.resource_manager.thread_pool.submit(self.execute_task, task)
 
     def _can_activate_agent(self, agent_id: str) -> bool:
         """Check if an agent can be activated based on resource constraints"""
@@ -454,24 +624,52 @@ class CEOAgent:
         if agent_id in self.active_agents:
             self.active_agents[agent_id]['status'] = 'active'
             self.active_agents[agent_id]['last_check'] = datetime.now().isoformat()
+            self.live_state.update('agents', agent_id, self.active_agents[agent_id])
+            self.dispatcher.notify_agent_activated(agent_id)
 
     def deactivate_agent(self, agent_id: str):
         """Deactivate an agent"""
         if agent_id in self.active_agents:
             self.active_agents[agent_id]['status'] = 'inactive'
             self.active_agents[agent_id]['last_check'] = datetime.now().isoformat()
+            self.live_state.update('agents', agent_id, self.active_agents[agent_id])
+            self.dispatcher.notify_agent_deactivated(agent_id)
 
     def execute_task(self, task: Task):
         """Execute a task"""
+        self.task_store.lease(task.task_id, self._lease_timeout(task))
+        self.dag.mark_started(task.task_id)
+        self.running_tasks[task.task_id] = (task, threading.Event())
+        task.status = "running"
+        self._publish_task(task)
         try:
-            # Actual task execution logic here
+            # Actual task execution logic here. This placeholder has a single
+            # checkpoint before any work starts, so a task can only be
+            # preempted until then; long-running work must call
+            # self.check_preemption(task.task_id) between checkpointed steps
+            self.check_preemption(task.task_id)
             task.status = "completed"
             task.result = {"completion_time": datetime.now().isoformat()}
+        except TaskPreempted:
+            task.status = "preempted"
+            self._checkpoint_preempted(task)
         except Exception as e:
             task.status = "error"
             task.error_message = str(e)
         finally:
+            self.running_tasks.pop(task.task_id, None)
             self.resource_manager.release_resources(task.task_id)
+            self._publish_task(task)
+            if task.status == "preempted":
+                # Back in line with its original virtual deadline; still persisted
+                self.task_store.requeue(task.task_id)
+                self.dispatcher.submit(task)
+            else:
+                self.task_store.ack(task.task_id, success=task.status == "completed", error=task.error_message)
+                self._enqueued_at.pop(task.task_id, None)
+                self._preemptions.pop(task.task_id, None)
+                self.dag.mark_finished(task.task_id, success=task.status == "completed")
+            self.dispatcher.notify_resources_released()
 
     def _load_config(self) -> Dict:
         """Load configuration from file"""
@@ -486,7 +684,7 @@ class CEOAgent:
         """Continuously monitor system resources"""
         while True:
             try:
-                resources = self.resource_manager._get_current_resources()
+                resources = self.resource_manager.resource_state
                 if resources:
                     # Check against thresholds
                     if (resources.available_ram_gb < self.config['resource_monitoring']['thresholds']['ram_critical'] or
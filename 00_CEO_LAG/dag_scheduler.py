@@ -0,0 +1,235 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set
+
+
+def parse_duration(value: Optional[str]) -> float:
+    """Parse Task.estimated_duration ("90", "45s", "15m", "2h", "01:30:00") into seconds"""
+    if not value:
+        return 0.0
+    value = str(value).strip().lower()
+    if ':' in value:
+        seconds = 0.0
+        for part in value.split(':'):
+            seconds = seconds * 60 + float(part)
+        return seconds
+    match = re.fullmatch(r'([\d.]+)\s*(s|sec|m|min|h|hr|hours?)?', value)
+    if not match:
+        return 0.0
+    amount, unit = float(match.group(1)), (match.group(2) or 's')[0]
+    return amount * {'s': 1, 'm': 60, 'h': 3600}[unit]
+
+
+class DAGScheduler:
+    """Dependency tracking for Task.dependencies.
+
+    A task is handed to `release` only when every task it depends on has
+    finished successfully, so independent branches of a pipeline are released
+    together and run in parallel. If a dependency fails, every task
+    downstream of it is cancelled through `cancel`.
+
+    Only live tasks are kept: a finished task is dropped as soon as every
+    task that depends on it has finished too. Its outcome is remembered
+    (the last `history` ones) so that tasks added later can still depend on
+    it; a dependency that is neither live nor remembered is rejected.
+    """
+
+    def __init__(self, release: Callable[[Any], None], cancel: Optional[Callable[[Any, str], None]] = None,
+                 history: int = 10000):
+        self._release = release
+        self._cancel = cancel
+        self._history = history
+        self._lock = threading.Lock()
+        self._tasks: Dict[str, Any] = {}
+        self._missing: Dict[str, Set[str]] = {}
+        self._dependents: Dict[str, List[str]] = {}
+        self._children: Dict[str, Set[str]] = {}
+        self._started: Dict[str, float] = {}
+        self._finished: Dict[str, Dict[str, Any]] = {}
+        self._outcomes: "OrderedDict[str, bool]" = OrderedDict()
+
+    def add(self, task: Any):
+        """Register a task; release it at once if its dependencies are already done"""
+        dependencies = list(task.dependencies or [])
+        with self._lock:
+            # Dependencies must already be known, so only a re-added task id can close a cycle
+            if task.task_id in dependencies or (task.task_id in self._tasks
+                                                and self._reaches(dependencies, task.task_id)):
+                raise ValueError(f"Dependency cycle detected for task {task.task_id}")
+            unknown = [dep for dep in dependencies if dep not in self._tasks and dep not in self._outcomes]
+            if unknown:
+                raise ValueError(f"Task {task.task_id} depends on unknown task(s) {', '.join(unknown)}")
+
+            self._tasks[task.task_id] = task
+            for dep in dependencies:
+                if dep in self._tasks:
+                    self._children.setdefault(dep, set()).add(task.task_id)
+            failed = [dep for dep in dependencies if self._outcome(dep) is False]
+            missing = {dep for dep in dependencies if self._outcome(dep) is None}
+            if not failed and missing:
+                self._missing[task.task_id] = missing
+                for dep in missing:
+                    self._dependents.setdefault(dep, []).append(task.task_id)
+                return
+
+        if failed:
+            self._cancel_downstream(task.task_id, f"dependency {failed[0]} failed")
+        else:
+            self._release(task)
+
+    def _outcome(self, task_id: str) -> Optional[bool]:
+        """True/False once finished, None while pending"""
+        if task_id in self._finished:
+            return self._finished[task_id]['success']
+        return self._outcomes.get(task_id)
+
+    def mark_started(self, task_id: str):
+        """Record the start of a task's execution for the measured critical path"""
+        with self._lock:
+            if task_id in self._tasks:
+                self._started.setdefault(task_id, time.monotonic())
+
+    def mark_finished(self, task_id: str, success: bool = True):
+        """Record a finished task and release (or cancel) whatever was waiting on it"""
+        ready = []
+        with self._lock:
+            now = time.monotonic()
+            self._record_finished(task_id, success, self._started.pop(task_id, now), now)
+            dependents = self._dependents.pop(task_id, [])
+            if success:
+                for dependent_id in dependents:
+                    missing = self._missing.get(dependent_id)
+                    if missing is None:
+                        continue
+                    missing.discard(task_id)
+                    if not missing:
+                        del self._missing[dependent_id]
+                        ready.append(self._tasks[dependent_id])
+
+        if not success:
+            for dependent_id in dependents:
+                self._cancel_downstream(dependent_id, f"dependency {task_id} failed")
+        for task in ready:
+            self._release(task)
+
+    def _record_finished(self, task_id: str, success: bool, started: float, finished: float):
+        """Store the outcome and drop whatever no live task needs any more (lock held)"""
+        task = self._tasks.get(task_id)
+        if task is None:
+            # Finished outside the graph (e.g. replayed as dead): only the outcome matters
+            self._remember(task_id, success)
+            return
+        self._finished[task_id] = {'success': success, 'started': started, 'finished': finished}
+        for dep in task.dependencies or []:
+            children = self._children.get(dep)
+            if children is not None:
+                children.discard(task_id)
+                if not children and dep in self._finished:
+                    self._evict(dep)
+        if not self._children.get(task_id):
+            self._evict(task_id)
+
+    def _evict(self, task_id: str):
+        self._children.pop(task_id, None)
+        self._tasks.pop(task_id, None)
+        self._started.pop(task_id, None)
+        self._remember(task_id, self._finished.pop(task_id)['success'])
+
+    def _remember(self, task_id: str, success: bool):
+        self._outcomes[task_id] = success
+        self._outcomes.move_to_end(task_id)
+        while len(self._outcomes) > self._history:
+            self._outcomes.popitem(last=False)
+
+    def waiting_tasks(self) -> Dict[str, List[str]]:
+        """Blocked task ids and the dependencies they are still waiting for"""
+        with self._lock:
+            return {task_id: sorted(missing) for task_id, missing in self._missing.items()}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'live': len(self._tasks), 'waiting': len(self._missing),
+                    'finished_live': len(self._finished), 'remembered_outcomes': len(self._outcomes)}
+
+    def critical_path(self, task_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Longest dependency chain among live tasks, weighted by measured duration or the task estimate"""
+        with self._lock:
+            nodes = {task_id for task_id in (task_ids if task_ids is not None else self._tasks)
+                     if task_id in self._tasks}
+            # Ancestors of the requested tasks are part of their chains
+            stack = list(nodes)
+            while stack:
+                for dep in self._tasks[stack.pop()].dependencies or []:
+                    if dep in self._tasks and dep not in nodes:
+                        nodes.add(dep)
+                        stack.append(dep)
+
+            # Kahn's algorithm: each node is settled after all of its dependencies
+            indegree = {task_id: 0 for task_id in nodes}
+            children: Dict[str, List[str]] = {}
+            for task_id in nodes:
+                for dep in set(self._tasks[task_id].dependencies or []):
+                    if dep in nodes:
+                        indegree[task_id] += 1
+                        children.setdefault(dep, []).append(task_id)
+            best: Dict[str, float] = {}
+            previous: Dict[str, Optional[str]] = {}
+            ready = [task_id for task_id, degree in indegree.items() if degree == 0]
+            for task_id in ready:
+                best[task_id], previous[task_id] = 0.0, None
+            while ready:
+                task_id = ready.pop()
+                best[task_id] += self._duration(task_id)
+                for child in children.get(task_id, ()):
+                    if child not in best or best[task_id] > best[child]:
+                        best[child], previous[child] = best[task_id], task_id
+                    indegree[child] -= 1
+                    if indegree[child] == 0:
+                        ready.append(child)
+
+            end = max(best, key=best.get, default=None)
+            path = []
+            while end is not None:
+                path.append(end)
+                end = previous[end]
+            return {
+                'length_seconds': best[path[0]] if path else 0.0,
+                'path': path[::-1],
+                'total_work_seconds': sum(self._duration(task_id) for task_id in nodes)
+            }
+
+    def _duration(self, task_id: str) -> float:
+        finished = self._finished.get(task_id)
+        if finished:
+            return finished['finished'] - finished['started']
+        return parse_duration(getattr(self._tasks.get(task_id), 'estimated_duration', None))
+
+    def _reaches(self, sources: List[str], target: str) -> bool:
+        """True if `target` is reachable from `sources` through pending dependencies"""
+        stack, seen = list(sources), set()
+        while stack:
+            task_id = stack.pop()
+            if task_id == target:
+                return True
+            if task_id in seen:
+                continue
+            seen.add(task_id)
+            stack.extend(self._missing.get(task_id, ()))
+        return False
+
+    def _cancel_downstream(self, task_id: str, reason: str):
+        stack = [task_id]
+        while stack:
+            current = stack.pop()
+            with self._lock:
+                if self._outcome(current) is not None:
+                    continue
+                self._missing.pop(current, None)
+                task = self._tasks.get(current)
+                now = time.monotonic()
+                self._record_finished(current, False, now, now)
+                stack.extend(self._dependents.pop(current, []))
+            if task is not None and self._cancel:
+                self._cancel(task, reason)
@@ -0,0 +1,96 @@
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from dag_scheduler import parse_duration
+
+PRIORITY_LEVELS = ['critical', 'high', 'medium', 'low']
+DEFAULT_MAX_WAIT_SECONDS = {'critical': 300, 'high': 900, 'medium': 1800, 'low': 3600}
+
+
+def priority_level(priority: int) -> str:
+    """Map a raw 1-10 priority to its level"""
+    if priority >= 8:
+        return 'critical'
+    elif priority >= 6:
+        return 'high'
+    elif priority >= 4:
+        return 'medium'
+    return 'low'
+
+
+def iso_timestamp(value: Optional[str]) -> Optional[float]:
+    """Task.deadline / Task.timestamp (ISO 8601) as a Unix timestamp"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+class TaskPreempted(Exception):
+    """Raised inside a running task when the scheduler asked it to yield"""
+
+
+class DeadlinePolicy:
+    """Earliest-deadline-first ordering with priority aging.
+
+    Every task gets a virtual deadline: the latest start that still meets
+    its real deadline, or the moment it has waited `aging_factor` times the
+    maximum wait of its priority level, whichever comes first. Ordering by
+    that absolute timestamp is EDF for tasks with deadlines and ages
+    everything else (a low-priority task enqueued long ago eventually
+    outranks a fresh high-priority one). Since the key is a point in time
+    rather than a bucket computed at enqueue, it never goes stale and queued
+    tasks do not need to be re-scored.
+    """
+
+    def __init__(self, max_wait_seconds: Optional[Dict[str, float]] = None, aging_factor: float = 2.0,
+                 preempt_slack_seconds: float = 60, min_preempt_gain_seconds: float = 300,
+                 max_preemptions: int = 2):
+        self.max_wait_seconds = dict(DEFAULT_MAX_WAIT_SECONDS, **(max_wait_seconds or {}))
+        # At 1x, aged tasks crowd out real deadlines near saturation (see `benchmarks.py deadlines`)
+        self.aging_factor = aging_factor
+        self.preempt_slack_seconds = preempt_slack_seconds
+        self.min_preempt_gain_seconds = min_preempt_gain_seconds
+        self.max_preemptions = max_preemptions
+
+    def virtual_deadline(self, task: Any, enqueued_at: float) -> float:
+        aged = enqueued_at + self.aging_factor * self.max_wait_seconds[priority_level(task.priority)]
+        deadline = iso_timestamp(task.deadline)
+        if deadline is None:
+            return aged
+        # Latest start that still meets the deadline, so long tasks are started earlier
+        return min(deadline - parse_duration(task.estimated_duration), aged)
+
+    def key(self, task: Any, enqueued_at: float) -> Tuple[float, int]:
+        """Dispatch order: virtual deadline, then raw priority (highest first)"""
+        return (self.virtual_deadline(task, enqueued_at), -task.priority)
+
+    def slack(self, task: Any, enqueued_at: float, now: Optional[float] = None) -> float:
+        """Seconds left before the task must start to meet its virtual deadline"""
+        now = time.time() if now is None else now
+        # virtual_deadline already is a latest start (deadline minus estimated duration)
+        return self.virtual_deadline(task, enqueued_at) - now
+
+    def choose_victim(self, task: Any, enqueued_at: float,
+                      running: Iterable[Tuple[Any, float, int]], now: Optional[float] = None) -> Optional[Any]:
+        """Running task to preempt so that an urgent `task` can start, if any.
+
+        `running` yields (task, enqueued_at, times already preempted). Only an
+        urgent task preempts, and only a running task whose virtual deadline
+        is later by at least `min_preempt_gain_seconds` and that has not been
+        preempted `max_preemptions` times already, so tasks cannot thrash.
+        """
+        if self.slack(task, enqueued_at, now) > self.preempt_slack_seconds:
+            return None
+        threshold = self.virtual_deadline(task, enqueued_at) + self.min_preempt_gain_seconds
+        victim, victim_deadline = None, threshold
+        for candidate, candidate_enqueued_at, preemptions in running:
+            if preemptions >= self.max_preemptions:
+                continue
+            candidate_deadline = self.virtual_deadline(candidate, candidate_enqueued_at)
+            if candidate_deadline > victim_deadline:
+                victim, victim_deadline = candidate, candidate_deadline
+        return victim
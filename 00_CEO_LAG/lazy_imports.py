@@ -0,0 +1,43 @@
+import importlib
+import importlib.util
+import threading
+from types import ModuleType
+from typing import Optional
+
+# Heavy backends that must never be imported just by loading the CEO or its API
+HEAVY_MODULES = ('torch', 'GPUtil', 'numpy')
+
+
+class LazyModule:
+    """Module proxy that performs the real import on first attribute access"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def available(self) -> bool:
+        """Whether the module is installed, without importing it"""
+        return self._module is not None or importlib.util.find_spec(self._name) is not None
+
+    def load(self) -> ModuleType:
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self.load(), attr)
+
+    def __repr__(self) -> str:
+        return f"<lazy module '{self._name}' ({'loaded' if self.loaded else 'not loaded'})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Defer importing `name` until it is actually used"""
+    return LazyModule(name)
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+class Subscription:
+    """Keys changed since a stream consumer last drained them.
+
+    Repeated updates of the same entry collapse into one dirty key, so a
+    slow consumer costs at most one pending value per entry instead of a
+    growing backlog of messages.
+    """
+
+    def __init__(self, sections: Optional[Iterable[str]], wake: Callable[[], None]):
+        self.sections = set(sections) if sections else None
+        self.dirty: Set[Tuple[str, str]] = set()
+        self._wake = wake
+
+    def _mark(self, section: str, key: str):
+        if self.sections is not None and section not in self.sections:
+            return
+        was_clean = not self.dirty
+        self.dirty.add((section, key))
+        if was_clean:
+            self._wake()
+
+
+class LiveState:
+    """Versioned, incrementally updated snapshot of the CEO agent state.
+
+    The scheduler and the resource sampler push changes as they happen
+    (`update`/`remove`), so readers never walk live scheduler structures.
+    Every change bumps a global version and the version of its section,
+    which gives list endpoints a cheap ETag. Sections with a limit evict
+    their least recently updated entries.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        self.limits = dict(limits or {})
+        self.version = 0
+        self._sections: Dict[str, "OrderedDict[str, Dict[str, Any]]"] = {}
+        self._versions: Dict[str, int] = {}
+        self._subscriptions: List[Subscription] = []
+        self._lock = threading.Lock()
+
+    def update(self, section: str, key: str, fields: Dict[str, Any]):
+        """Merge `fields` into an entry, creating it if needed"""
+        with self._lock:
+            entries = self._sections.setdefault(section, OrderedDict())
+            entry = entries.pop(key, {})
+            entry.update(fields, id=key, updated_at=time.time())
+            entries[key] = entry
+            limit = self.limits.get(section)
+            while limit and len(entries) > limit:
+                evicted, _ = entries.popitem(last=False)
+                self._mark(section, evicted)
+            self._bump(section)
+            self._mark(section, key)
+
+    def remove(self, section: str, key: str):
+        """Drop an entry"""
+        with self._lock:
+            if self._sections.get(section, {}).pop(key, None) is not None:
+                self._bump(section)
+                self._mark(section, key)
+
+    def section_version(self, section: str) -> int:
+        with self._lock:
+            return self._versions.get(section, 0)
+
+    def get(self, section: str, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._sections.get(section, {}).get(key)
+            return dict(entry) if entry else None
+
+    def page(self, section: str, offset: int = 0, limit: int = 100,
+             where: Optional[Dict[str, Any]] = None) -> Tuple[int, List[Dict[str, Any]], int]:
+        """(section version, one page of entries most recent first, total matching)"""
+        with self._lock:
+            version = self._versions.get(section, 0)
+            entries = [dict(entry) for entry in reversed(self._sections.get(section, {}).values())
+                       if not where or all(entry.get(k) == v for k, v in where.items())]
+        return version, entries[offset:offset + limit], len(entries)
+
+    def subscribe(self, sections: Optional[Iterable[str]], wake: Callable[[], None]) -> Subscription:
+        """Register a change consumer; `wake` is called when it goes from clean to dirty"""
+        subscription = Subscription(sections, wake)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def snapshot(self, sections: Optional[Iterable[str]] = None) -> Tuple[int, Dict[str, Dict[str, Dict[str, Any]]]]:
+        """(version, full copy of the requested sections)"""
+        with self._lock:
+            names = list(sections) if sections else list(self._sections)
+            return self.version, {
+                name: {key: dict(entry) for key, entry in self._sections.get(name, {}).items()}
+                for name in names
+            }
+
+    def drain(self, subscription: Subscription) -> Tuple[int, Dict[str, Dict[str, Optional[Dict[str, Any]]]]]:
+        """(version, current value of every dirty key; None for removed entries)"""
+        with self._lock:
+            dirty, subscription.dirty = subscription.dirty, set()
+            changes: Dict[str, Dict[str, Optional[Dict[str, Any]]]] = {}
+            for section, key in dirty:
+                entry = self._sections.get(section, {}).get(key)
+                changes.setdefault(section, {})[key] = dict(entry) if entry else None
+            return self.version, changes
+
+    def _mark(self, section: str, key: str):
+        for subscription in self._subscriptions:
+            subscription._mark(section, key)
+
+    def _bump(self, section: str):
+        self.version += 1
+        self._versions[section] = self.version
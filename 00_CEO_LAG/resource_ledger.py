@@ -0,0 +1,120 @@
+import threading
+from typing import Dict, List, Optional
+
+RESOURCE_KEYS = ('ram_gb', 'gpu_vram_gb', 'cpu_threads')
+
+
+class ResourceLedger:
+    """In-memory reservation ledger for RAM, VRAM and CPU threads.
+
+    Allocation decisions are plain arithmetic on cached numbers, so they
+    never wait for psutil. A task may claim what is left of the configured
+    capacity after outstanding reservations, bounded by what the last sample
+    measured as free minus the reservations the sampler cannot have seen
+    yet (granted within the last `settle_refreshes` samples), minus the
+    configured headroom. Every grant is recorded before the lock is
+    released, so two tasks can never both claim the same free memory.
+    """
+
+    def __init__(self, capacity: Dict[str, float], headroom: Optional[Dict[str, float]] = None,
+                 settle_refreshes: int = 2):
+        self.capacity = {key: float(capacity.get(key, 0)) for key in RESOURCE_KEYS}
+        self.headroom = {key: float((headroom or {}).get(key, 0)) for key in RESOURCE_KEYS}
+        self.settle_refreshes = max(1, settle_refreshes)
+        # Until the first sample arrives, trust the configured capacity
+        self.measured_free = dict(self.capacity)
+        self.reserved = {key: 0.0 for key in RESOURCE_KEYS}
+        self.unsettled = {key: 0.0 for key in RESOURCE_KEYS}
+        self.reservations: Dict[str, Dict[str, float]] = {}
+        self._granted_at: Dict[str, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def refresh(self, measured_free: Dict[str, Optional[float]]) -> bool:
+        """Update measured free capacity from the sampler; True if availability grew"""
+        with self._lock:
+            before = {key: self._available(key) for key in RESOURCE_KEYS}
+            for key in RESOURCE_KEYS:
+                value = measured_free.get(key)
+                if value is not None:
+                    self.measured_free[key] = float(value)
+            self._epoch += 1
+            self.unsettled = {key: 0.0 for key in RESOURCE_KEYS}
+            for task_id, claim in self.reservations.items():
+                if self._epoch - self._granted_at[task_id] < self.settle_refreshes:
+                    for key, amount in claim.items():
+                        self.unsettled[key] += amount
+            return any(self._available(key) > before[key] for key in RESOURCE_KEYS)
+
+    def available(self) -> Dict[str, float]:
+        """Capacity a new reservation could claim right now"""
+        with self._lock:
+            return {key: self._available(key) for key in RESOURCE_KEYS}
+
+    def can_reserve(self, requirements: Dict[str, float]) -> bool:
+        """Check a task's requirements without reserving anything"""
+        with self._lock:
+            return self._fits(requirements)
+
+    def shortfall(self, requirements: Dict[str, float]) -> List[str]:
+        """Resource keys whose requirement does not fit right now"""
+        with self._lock:
+            return [key for key in RESOURCE_KEYS
+                    if float(requirements.get(key, 0) or 0) > self._available(key)]
+
+    def reservation(self, task_id: str) -> Dict[str, float]:
+        """What a task currently holds (empty if nothing)"""
+        with self._lock:
+            return dict(self.reservations.get(task_id, {}))
+
+    def try_reserve(self, task_id: str, requirements: Dict[str, float]) -> bool:
+        """Atomically check and reserve a task's requirements"""
+        with self._lock:
+            if task_id in self.reservations:
+                return True
+            if not self._fits(requirements):
+                return False
+            claim = {key: float(requirements.get(key, 0) or 0) for key in RESOURCE_KEYS}
+            for key, amount in claim.items():
+                self.reserved[key] += amount
+                self.unsettled[key] += amount
+            self.reservations[task_id] = claim
+            self._granted_at[task_id] = self._epoch
+            return True
+
+    def release(self, task_id: str) -> Optional[Dict[str, float]]:
+        """Return a task's reservation to the pool"""
+        with self._lock:
+            claim = self.reservations.pop(task_id, None)
+            if claim:
+                settling = self._epoch - self._granted_at.pop(task_id) < self.settle_refreshes
+                for key, amount in claim.items():
+                    self.reserved[key] = max(0.0, self.reserved[key] - amount)
+                    if settling:
+                        self.unsettled[key] = max(0.0, self.unsettled[key] - amount)
+            return claim
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Capacity, measured free, reserved and available amounts per resource"""
+        with self._lock:
+            return {
+                key: {
+                    'capacity': self.capacity[key],
+                    'measured_free': self.measured_free[key],
+                    'reserved': self.reserved[key],
+                    'unsettled': self.unsettled[key],
+                    'available': self._available(key)
+                }
+                for key in RESOURCE_KEYS
+            }
+
+    def _available(self, key: str) -> float:
+        unreserved = self.capacity[key] - self.reserved[key]
+        unseen_free = self.measured_free[key] - self.unsettled[key]
+        return max(0.0, min(unseen_free, unreserved) - self.headroom[key])
+
+    def _fits(self, requirements: Dict[str, float]) -> bool:
+        return all(
+            float(requirements.get(key, 0) or 0) <= self._available(key)
+            for key in RESOURCE_KEYS
+        )
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+🚦 ADMISSION CONTROL VHQ_LAG - ADMISIÓN SEGÚN PRESIÓN DE MEMORIA
+Antes de activar un agente comprueba que su `ram_gb` cabe en la memoria
+disponible (menos una reserva) y que el sistema no está ya esperando memoria
+(PSI). Si no cabe, la activación queda en cola hasta que haya sitio en vez de
+empujar la máquina a swap.
+En Linux con cgroup v2 cada agente corre en su propio cgroup con
+memory.max = ram_gb, memory.high por debajo (el kernel recupera memoria antes
+de llegar al límite) y sin swap, y se leen su memoria cargada y su PSI.
+"""
+
+import os
+import sys
+import time
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import psutil
+
+from control_loop import parse_psi, read_psi
+
+logger = logging.getLogger(__name__)
+
+GB = 1024 ** 3
+CGROUP_GROUP = os.environ.get("VHQ_CGROUP_GROUP", "vhq_lag")
+
+
+def find_cgroup2_mount() -> Optional[Path]:
+    """Punto de montaje de cgroup v2 (también en modo híbrido, p. ej. /sys/fs/cgroup/unified)"""
+    try:
+        with open("/proc/mounts") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) > 2 and parts[2] == "cgroup2":
+                    return Path(parts[1])
+    except OSError:
+        pass
+    return None
+
+
+class CgroupManager:
+    """Un cgroup v2 por agente bajo `<montaje>/<group>` con límites de memoria"""
+
+    def __init__(self, root: Optional[Path] = None, group: str = CGROUP_GROUP,
+                 high_ratio: float = 0.9, swap_gb: float = 0.0):
+        self.root = Path(root) if root else find_cgroup2_mount()
+        self.base = self.root / group if self.root else None
+        self.high_ratio = high_ratio
+        self.swap_gb = swap_gb
+        self.limits: Dict[str, float] = {}
+        self.available = self._setup()
+
+    def _setup(self) -> bool:
+        if self.root is None:
+            return False
+        try:
+            if "memory" not in (self.root / "cgroup.controllers").read_text().split():
+                logger.info("cgroup v2 sin controlador de memoria (¿modo híbrido?), límites por agente desactivados")
+                return False
+            self.base.mkdir(exist_ok=True)
+            self._enable_memory(self.root)
+            self._enable_memory(self.base)
+        except OSError as e:
+            logger.info(f"No se pueden crear cgroups en {self.base}: {e}")
+            return False
+        return True
+
+    def _enable_memory(self, path: Path):
+        subtree = path / "cgroup.subtree_control"
+        if "memory" not in subtree.read_text().split():
+            subtree.write_text("+memory")
+
+    def path(self, agent_name: str) -> Path:
+        return self.base / agent_name
+
+    def configure(self, agent_name: str, ram_gb: float) -> bool:
+        """Crea el cgroup del agente con memory.max = ram_gb y memory.high = high_ratio · ram_gb"""
+        if not self.available:
+            return False
+        path = self.path(agent_name)
+        try:
+            path.mkdir(exist_ok=True)
+            (path / "memory.max").write_text(str(int(ram_gb * GB)))
+            (path / "memory.high").write_text(str(int(ram_gb * self.high_ratio * GB)))
+            if (path / "memory.swap.max").exists():
+                (path / "memory.swap.max").write_text(str(int(self.swap_gb * GB)))
+        except OSError as e:
+            logger.warning(f"No se pudo configurar el cgroup de {agent_name}: {e}")
+            return False
+        self.limits[agent_name] = ram_gb
+        return True
+
+    def attach(self, agent_name: str, pid: int) -> bool:
+        """Mueve `pid` al cgroup del agente; los hijos que lance después lo heredan"""
+        if agent_name not in self.limits:
+            return False
+        try:
+            (self.path(agent_name) / "cgroup.procs").write_text(str(pid))
+        except OSError as e:
+            logger.warning(f"No se pudo mover {pid} al cgroup de {agent_name}: {e}")
+            return False
+        return True
+
+    def _read(self, agent_name: str, name: str) -> Optional[str]:
+        if agent_name not in self.limits:
+            return None
+        try:
+            return (self.path(agent_name) / name).read_text()
+        except OSError:
+            return None
+
+    def current_bytes(self, agent_name: str) -> int:
+        value = self._read(agent_name, "memory.current")
+        return int(value) if value else 0
+
+    def events(self, agent_name: str) -> Dict[str, int]:
+        """Contadores de memory.events: high (recuperación forzada), max, oom, oom_kill"""
+        value = self._read(agent_name, "memory.events") or ""
+        return {key: int(count) for key, count in (line.split() for line in value.splitlines() if line.strip())}
+
+    def pressure(self, agent_name: str) -> Optional[Dict[str, Dict[str, float]]]:
+        value = self._read(agent_name, "memory.pressure")
+        return parse_psi(value) if value else None
+
+    def remove(self, agent_name: str):
+        """Borra el cgroup (sólo posible sin procesos dentro)"""
+        if self.limits.pop(agent_name, None) is None:
+            return
+        try:
+            self.path(agent_name).rmdir()
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for agent_name, ram_gb in self.limits.items():
+            pressure = self.pressure(agent_name) or {}
+            events = self.events(agent_name)
+            result[agent_name] = {
+                "max_gb": ram_gb,
+                "current_mb": self.current_bytes(agent_name) / 1024 ** 2,
+                "high_events": events.get("high", 0),
+                "oom_kills": events.get("oom_kill", 0),
+                "stall_avg10": pressure.get("some", {}).get("avg10", 0.0),
+            }
+        return result
+
+
+@dataclass
+class AdmissionDecision:
+    """Resultado de pedir la activación de un agente"""
+    admitted: bool
+    reason: str
+    required_gb: float
+    available_gb: float
+    stall_percent: float
+
+
+class AdmissionController:
+    """Admite o encola activaciones según la RAM disponible y la presión de memoria.
+
+    Un agente necesita su `ram_gb` menos lo que ya tiene cargado (un proceso
+    congelado conserva su memoria). Se admite si eso cabe en MemAvailable
+    menos `reserve_gb` y si el sistema no pasa más de `max_stall_percent` del
+    tiempo esperando memoria (PSI "some avg10"); si no, queda en cola.
+    """
+
+    def __init__(self, cgroups: Optional[CgroupManager] = None, reserve_gb: float = 1.0,
+                 max_stall_percent: float = 5.0):
+        self.cgroups = cgroups
+        self.reserve_gb = reserve_gb
+        self.max_stall_percent = max_stall_percent
+        self.queue: "OrderedDict[str, Tuple[float, float, str]]" = OrderedDict()  # agente -> (ram_gb, en cola desde, motivo)
+        self.admitted = 0
+        self.refused = 0
+        self.wait_seconds: List[float] = []
+
+    def stall_percent(self) -> float:
+        pressure = read_psi("memory")
+        return pressure["some"]["avg10"] if pressure and "some" in pressure else 0.0
+
+    def evaluate(self, agent_name: str, ram_gb: float, charged_gb: float = 0.0) -> AdmissionDecision:
+        """Decide sin tocar la cola; `charged_gb` es la memoria que el agente ya ocupa"""
+        if self.cgroups and self.cgroups.available and agent_name in self.cgroups.limits:
+            charged_gb = max(charged_gb, self.cgroups.current_bytes(agent_name) / GB)
+        required_gb = max(ram_gb - charged_gb, 0.0)
+        available_gb = psutil.virtual_memory().available / GB - self.reserve_gb
+        stall = self.stall_percent()
+        if stall > self.max_stall_percent:
+            return AdmissionDecision(False, f"presión de memoria: {stall:.1f}% del tiempo esperando memoria",
+                                     required_gb, available_gb, stall)
+        if required_gb > available_gb:
+            return AdmissionDecision(False, f"necesita {required_gb:.1f} GB y hay {max(available_gb, 0):.1f} GB "
+                                            f"(reserva {self.reserve_gb:.0f} GB)", required_gb, available_gb, stall)
+        return AdmissionDecision(True, "ok", required_gb, available_gb, stall)
+
+    def request(self, agent_name: str, ram_gb: float, charged_gb: float = 0.0) -> AdmissionDecision:
+        """Evalúa la activación; si se rechaza el agente queda en cola, si se admite sale de ella"""
+        decision = self.evaluate(agent_name, ram_gb, charged_gb)
+        if decision.admitted:
+            self.admitted += 1
+            queued = self.queue.pop(agent_name, None)
+            if queued:
+                self.wait_seconds.append(time.time() - queued[1])
+                self.wait_seconds = self.wait_seconds[-100:]
+        else:
+            self.refused += 1
+            queued_at = self.queue[agent_name][1] if agent_name in self.queue else time.time()
+            self.queue[agent_name] = (ram_gb, queued_at, decision.reason)
+        return decision
+
+    def pending(self) -> List[str]:
+        return list(self.queue)
+
+    def drop(self, agent_name: str):
+        self.queue.pop(agent_name, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cgroups": bool(self.cgroups and self.cgroups.available),
+            "admitted": self.admitted,
+            "refused": self.refused,
+            "queue": {name: {"ram_gb": ram_gb, "waiting_s": time.time() - since, "reason": reason}
+                      for name, (ram_gb, since, reason) in self.queue.items()},
+            "mean_wait_s": sum(self.wait_seconds) / len(self.wait_seconds) if self.wait_seconds else None,
+            "stall_percent": self.stall_percent(),
+        }
+
+
+def main():
+    """Comprueba si un agente con `ram_gb` se admitiría ahora"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if len(sys.argv) < 2:
+        print("Uso: python admission_control.py <ram_gb>")
+        return
+    controller = AdmissionController(CgroupManager())
+    decision = controller.evaluate("manual", float(sys.argv[1]))
+    print(f"{'✅ Admitido' if decision.admitted else '⏳ En cola'}: {decision.reason} "
+          f"(necesita {decision.required_gb:.1f} GB, disponibles {decision.available_gb:.1f} GB, "
+          f"PSI {decision.stall_percent:.1f}%) | cgroups v2: {'sí' if controller.cgroups.available else 'no'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,13 +5,20 @@ Gestiona persistencia de estado, checkpoints y recuperación de agentes
 Fecha: 27 de Junio 2025
 """
 
+import os
 import json
 import time
+import atexit
 import logging
+import threading
 from datetime import datetime, timedelta
 from pathlib import Path
-from dataclasses import dataclass, asdict
-from typing import Dict, List, Optional, Any
+from dataclasses import dataclass, asdict, fields
+from collections.abc import MutableMapping
+from typing import Callable, Dict, Iterator, List, Optional, Any
+
+from checkpoint_log import CheckpointLog
+from checkpoint_index import CheckpointIndex, iso_to_timestamp
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -52,8 +59,70 @@ class AgentState:
     resource_usage: Dict[str, float]
     configuration: Dict[str, Any]
 
+def checkpoint_status(checkpoint: TaskCheckpoint) -> str:
+    """Estado de una tarea según su checkpoint: completed, failed o active"""
+    if checkpoint.progress_percentage >= 100:
+        return "completed"
+    if checkpoint.current_step == "Tarea fallida":
+        return "failed"
+    return "active"
+
+class TaskCheckpointMap(MutableMapping):
+    """task_id -> TaskCheckpoint que sólo lee el log de una tarea cuando se accede a ella.
+    
+    Pertenencia y tamaño se resuelven con el índice, así que el arranque no
+    depende de cuántos checkpoints haya en disco.
+    """
+    
+    def __init__(self, index: CheckpointIndex, log: CheckpointLog):
+        self.index = index
+        self.log = log
+        self.loaded: Dict[str, TaskCheckpoint] = {}
+        
+    def __getitem__(self, task_id: str) -> TaskCheckpoint:
+        checkpoint = self.loaded.get(task_id)
+        if checkpoint is None:
+            data = self.log.load(task_id) if self.index.contains(task_id) else None
+            if data is None:
+                raise KeyError(task_id)
+            checkpoint = self.loaded[task_id] = TaskCheckpoint(**data)
+        return checkpoint
+        
+    def __contains__(self, task_id) -> bool:
+        return task_id in self.loaded or self.index.contains(task_id)
+        
+    def __setitem__(self, task_id: str, checkpoint: TaskCheckpoint):
+        self.loaded[task_id] = checkpoint
+        
+    def __delitem__(self, task_id: str):
+        self.loaded.pop(task_id, None)
+        
+    def __iter__(self) -> Iterator[str]:
+        yield from list(self.loaded)
+        for task_id in self.index.task_ids():
+            if task_id not in self.loaded:
+                yield task_id
+                
+    def __len__(self) -> int:
+        return self.index.count() + sum(1 for task_id in list(self.loaded) if not self.index.contains(task_id))
+        
+    def evict(self, task_id: str):
+        """Libera de memoria un checkpoint ya persistido (se recarga si se vuelve a pedir)"""
+        self.loaded.pop(task_id, None)
+
+# Durabilidad de los checkpoints:
+#   deferred  - write-behind: se agrupan por tarea y se escriben cada `flush_interval` segundos
+#               y en complete_task / pause_agent / cierre (por defecto)
+#   immediate - cada actualización se escribe al momento (caché del SO, sin fsync)
+#   sync      - cada actualización se escribe y se hace fsync
+DURABILITY_MODES = ("deferred", "immediate", "sync")
+
 class AgentStateManager:
-    def __init__(self):
+    def __init__(self, durability: str = "deferred", flush_interval: float = 1.0):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Durabilidad '{durability}' no válida, usa una de {DURABILITY_MODES}")
+        self.durability = durability
+        self.flush_interval = flush_interval
         self.base_path = Path("shared_resources/state")
         self.checkpoints_path = self.base_path / "checkpoints"
         self.agents_path = self.base_path / "agents"
@@ -64,10 +133,25 @@ class AgentStateManager:
             path.mkdir(parents=True, exist_ok=True)
             
         self.agents_state: Dict[str, AgentState] = {}
-        self.task_checkpoints: Dict[str, TaskCheckpoint] = {}
+        self.checkpoint_log = CheckpointLog(self.checkpoints_path, fsync=durability == "sync")
+        self.checkpoint_index = CheckpointIndex(self.checkpoints_path / "index.db")
+        self.task_checkpoints = TaskCheckpointMap(self.checkpoint_index, self.checkpoint_log)
+        self.checkpoint_listeners: List[Callable[[TaskCheckpoint], None]] = []
+        
+        # Caché write-behind: qué checkpoints/estados tienen cambios sin escribir
+        self.io_lock = threading.RLock()
+        self.dirty_checkpoints: set = set()
+        self.dirty_agents: set = set()
+        self.flush_stop = threading.Event()
+        self.flush_thread = None
         
         self.load_all_states()
         
+        if self.durability == "deferred":
+            self.flush_thread = threading.Thread(target=self._flush_loop, daemon=True, name="CheckpointFlush")
+            self.flush_thread.start()
+        atexit.register(self.close)
+        
     def load_all_states(self):
         """Carga todos los estados guardados"""
         # Cargar estados de agentes
@@ -81,29 +165,92 @@ class AgentStateManager:
             except Exception as e:
                 logger.error(f"Error cargando estado de {agent_file}: {e}")
                 
-        # Cargar checkpoints de tareas
+        # Los checkpoints de tareas se cargan bajo demanda desde el índice
+        if self.checkpoint_index.get_meta("built") is None:
+            self.build_checkpoint_index()
+        elif self.checkpoint_index.get_meta("open") == "1":
+            # El proceso anterior no llegó a close(): pudo caer entre escribir un log y su fila de índice
+            self.reconcile_checkpoint_index()
+        self.checkpoint_index.set_meta("open", "1")
+        logger.info(f"Índice de checkpoints: {self.checkpoint_index.count()} tareas")
+        
+    def build_checkpoint_index(self):
+        """Indexa (una sola vez) los logs existentes y migra los checkpoints .json antiguos"""
+        rows = []
         for checkpoint_file in self.checkpoints_path.glob("*.json"):
             try:
                 with open(checkpoint_file, 'r') as f:
-                    data = json.load(f)
-                    checkpoint = TaskCheckpoint(**data)
-                    self.task_checkpoints[checkpoint.task_id] = checkpoint
-                    logger.info(f"Checkpoint cargado para tarea {checkpoint.task_id}")
+                    checkpoint = TaskCheckpoint(**json.load(f))
+                self.checkpoint_log.compact(checkpoint.task_id, asdict(checkpoint))
+                checkpoint_file.unlink()
+            except Exception as e:
+                logger.error(f"Error migrando checkpoint de {checkpoint_file}: {e}")
+                
+        for task_id, data in self.checkpoint_log.load_all():
+            try:
+                rows.append(self._index_row(TaskCheckpoint(**data)))
             except Exception as e:
-                logger.error(f"Error cargando checkpoint de {checkpoint_file}: {e}")
+                logger.error(f"Error indexando checkpoint de {task_id}: {e}")
+            self.checkpoint_log.forget(task_id)
+            
+        self.checkpoint_index.upsert_many(rows)
+        self.checkpoint_index.set_meta("built", datetime.now().isoformat())
+        logger.info(f"Índice de checkpoints construido: {len(rows)} tareas")
+        
+    def reconcile_checkpoint_index(self):
+        """Reindexa los logs cuyo tamaño no coincide con el índice y quita filas sin log"""
+        indexed = self.checkpoint_index.log_sizes()
+        rows, on_disk = [], set()
+        with os.scandir(self.checkpoints_path) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".log"):
+                    continue
+                task_id = entry.name[:-len(".log")]
+                on_disk.add(task_id)
+                if indexed.get(task_id) == entry.stat().st_size:
+                    continue
+                try:
+                    data = self.checkpoint_log.load(task_id)
+                    if data is not None:
+                        rows.append(self._index_row(TaskCheckpoint(**data)))
+                except Exception as e:
+                    logger.error(f"Error reindexando checkpoint de {task_id}: {e}")
+                self.checkpoint_log.forget(task_id)
+        orphans = [task_id for task_id in indexed if task_id not in on_disk]
+        self.checkpoint_index.upsert_many(rows)
+        self.checkpoint_index.remove_many(orphans)
+        logger.info(f"Índice de checkpoints reconciliado: {len(rows)} reindexados, {len(orphans)} sin log")
+        return len(rows), len(orphans)
+        
+    def _index_row(self, checkpoint: TaskCheckpoint):
+        return (checkpoint.task_id, checkpoint.agent_name, checkpoint_status(checkpoint),
+                iso_to_timestamp(checkpoint.last_update), self.checkpoint_log.size(checkpoint.task_id))
                 
     def save_agent_state(self, agent_name: str):
-        """Guarda el estado de un agente específico"""
+        """Guarda el estado de un agente específico (o lo marca para el próximo flush)"""
         if agent_name not in self.agents_state:
             logger.error(f"Agente {agent_name} no encontrado")
             return False
             
+        if self.durability == "deferred":
+            with self.io_lock:
+                self.dirty_agents.add(agent_name)
+            return True
+        return self._write_agent_state(agent_name)
+        
+    def _write_agent_state(self, agent_name: str) -> bool:
         try:
             agent_state = self.agents_state[agent_name]
             file_path = self.agents_path / f"{agent_name}.json"
-            
-            with open(file_path, 'w') as f:
-                json.dump(asdict(agent_state), f, indent=2)
+            tmp_path = file_path.with_suffix(".json.tmp")
+            
+            with self.io_lock:
+                with open(tmp_path, 'w') as f:
+                    json.dump(asdict(agent_state), f, indent=2)
+                    if self.durability == "sync":
+                        f.flush()
+                        os.fsync(f.fileno())
+                os.replace(tmp_path, file_path)
                 
             logger.debug(f"Estado guardado para {agent_name}")
             return True
@@ -112,26 +259,78 @@ class AgentStateManager:
             logger.error(f"Error guardando estado de {agent_name}: {e}")
             return False
             
+    def add_checkpoint_listener(self, listener: Callable[[TaskCheckpoint], None]):
+        """Registra un callback que recibe cada checkpoint guardado (progreso en vivo)"""
+        self.checkpoint_listeners.append(listener)
+        
     def save_task_checkpoint(self, task_id: str):
-        """Guarda un checkpoint de tarea"""
+        """Guarda un checkpoint de tarea (o lo marca para el próximo flush)"""
         if task_id not in self.task_checkpoints:
             logger.error(f"Checkpoint {task_id} no encontrado")
             return False
             
+        # Los listeners reciben cada actualización aunque la escritura se difiera
+        for listener in self.checkpoint_listeners:
+            try:
+                listener(self.task_checkpoints[task_id])
+            except Exception as e:
+                logger.error(f"Error notificando checkpoint {task_id}: {e}")
+                
+        if self.durability == "deferred":
+            with self.io_lock:
+                self.dirty_checkpoints.add(task_id)
+            return True
+        row = self._write_task_checkpoint(task_id)
+        if row is None:
+            return False
+        self.checkpoint_index.upsert(*row)
+        return True
+        
+    def _write_task_checkpoint(self, task_id: str):
+        """Añade el checkpoint al log; devuelve su fila de índice (None si falla)"""
         try:
             checkpoint = self.task_checkpoints[task_id]
-            file_path = self.checkpoints_path / f"{task_id}.json"
-            
-            with open(file_path, 'w') as f:
-                json.dump(asdict(checkpoint), f, indent=2)
+            # Sólo se añade al log lo que cambió desde el último guardado (pasos nuevos, campos modificados)
+            data = {field.name: getattr(checkpoint, field.name) for field in fields(checkpoint)}
+            with self.io_lock:
+                self.checkpoint_log.write(task_id, data)
                 
             logger.debug(f"Checkpoint guardado para tarea {task_id}")
-            return True
+            return self._index_row(checkpoint)
             
         except Exception as e:
             logger.error(f"Error guardando checkpoint {task_id}: {e}")
-            return False
+            return None
             
+    def flush(self) -> int:
+        """Escribe todos los checkpoints y estados pendientes; devuelve cuántos se escribieron"""
+        with self.io_lock:
+            task_ids, self.dirty_checkpoints = self.dirty_checkpoints, set()
+            agent_names, self.dirty_agents = self.dirty_agents, set()
+            rows = [self._write_task_checkpoint(task_id) for task_id in task_ids
+                    if task_id in self.task_checkpoints.loaded]
+            self.checkpoint_index.upsert_many(row for row in rows if row is not None)
+            for agent_name in agent_names:
+                if agent_name in self.agents_state:
+                    self._write_agent_state(agent_name)
+        return len(task_ids) + len(agent_names)
+        
+    def _flush_loop(self):
+        while not self.flush_stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error en flush de checkpoints: {e}")
+                
+    def close(self):
+        """Detiene el flush periódico y escribe lo pendiente (se llama también al salir)"""
+        self.flush_stop.set()
+        if self.flush_thread is not None and self.flush_thread is not threading.current_thread():
+            self.flush_thread.join(timeout=5)
+        self.flush()
+        # Todo lo escrito está indexado: el próximo arranque no necesita reconciliar
+        self.checkpoint_index.set_meta("open", "0")
+        
     def create_agent_state(self, agent_name: str, config: Dict[str, Any] = None) -> AgentState:
         """Crea un nuevo estado de agente"""
         if config is None:
@@ -201,6 +400,7 @@ class AgentStateManager:
         agent_state.session_start = None
         
         self.save_agent_state(agent_name)
+        self.flush()
         logger.info(f"Agente {agent_name} pausado: {reason}")
         
         return True
@@ -372,6 +572,15 @@ class AgentStateManager:
                 
             self.save_agent_state(agent_name)
             
+        # Tarea terminada: se escribe ya, el log queda como un único registro base
+        # y el checkpoint sale de memoria (el índice conserva sus metadatos)
+        self.flush()
+        with self.io_lock:
+            self.checkpoint_log.compact(task_id)
+            self.checkpoint_index.upsert(*self._index_row(checkpoint))
+            self.checkpoint_log.forget(task_id)
+            self.task_checkpoints.evict(task_id)
+            
         return True
         
     def add_task_to_queue(self, agent_name: str, task_id: str, priority: bool = False) -> bool:
@@ -470,13 +679,12 @@ class AgentStateManager:
             if agent_state.average_task_duration > 0:
                 total_durations.append(agent_state.average_task_duration)
                 
-        for task_id, checkpoint in self.task_checkpoints.items():
-            if checkpoint.progress_percentage >= 100:
-                overview["completed_tasks"] += 1
-            elif checkpoint.error_count > 0 and checkpoint.current_step == "Tarea fallida":
-                overview["failed_tasks"] += 1
-            else:
-                overview["active_tasks"].append(task_id)
+        # Conteos desde el índice, sin cargar ningún checkpoint
+        self.flush()
+        status_counts = self.checkpoint_index.status_counts()
+        overview["completed_tasks"] = status_counts.get("completed", 0)
+        overview["failed_tasks"] = status_counts.get("failed", 0)
+        overview["active_tasks"] = self.checkpoint_index.task_ids("active")
                 
         overview["system_stats"]["total_uptime_hours"] = total_uptime / 60
         overview["system_stats"]["total_tasks_completed"] = total_completed
@@ -488,24 +696,23 @@ class AgentStateManager:
         return overview
         
     def cleanup_old_checkpoints(self, days: int = 30):
-        """Limpia checkpoints antiguos para ahorrar espacio"""
+        """Limpia checkpoints antiguos para ahorrar espacio.
+        
+        La retención va por días completos según el índice: se eliminan las
+        tareas terminadas cuyo último día de actividad es anterior al corte,
+        sin abrir sus archivos.
+        """
         cutoff_date = datetime.now() - timedelta(days=days)
-        cleaned_count = 0
+        self.flush()
         
-        for task_id, checkpoint in list(self.task_checkpoints.items()):
-            last_update = datetime.fromisoformat(checkpoint.last_update)
-            
-            if (last_update < cutoff_date and 
-                (checkpoint.progress_percentage >= 100 or checkpoint.current_step == "Tarea fallida")):
-                
-                # Eliminar archivo
-                checkpoint_file = self.checkpoints_path / f"{task_id}.json"
-                if checkpoint_file.exists():
-                    checkpoint_file.unlink()
-                    
-                # Eliminar de memoria
+        with self.io_lock:
+            expired = self.checkpoint_index.expired(cutoff_date.timestamp())
+            for task_id in expired:
+                # Eliminar archivo y memoria
+                self.checkpoint_log.remove(task_id)
                 del self.task_checkpoints[task_id]
-                cleaned_count += 1
+            self.checkpoint_index.remove_many(expired)
+        cleaned_count = len(expired)
                 
         logger.info(f"Limpieza completada: {cleaned_count} checkpoints antiguos eliminados")
         return cleaned_count
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+🧊 AGENT SUPERVISOR VHQ_LAG - HIBERNACIÓN REAL DE AGENTES
+Ejecuta cada agente como proceso hijo y lo hiberna de verdad:
+  suspend - congela el árbol de procesos (SIGSTOP / NtSuspendProcess vía psutil)
+            y descarga su modelo si nadie más lo usa; reanudar es casi
+            instantáneo salvo la recarga del modelo
+  exit    - termina el proceso y descarga el modelo si nadie más lo usa;
+            libera toda su RAM y al reanudar se relanza con el checkpoint en
+            VHQ_AGENT_CHECKPOINT
+Mide la latencia de hibernar/reanudar y la memoria recuperada.
+Un agente se puede precalentar antes de su ventana: se lanza, arranca y se
+congela, de modo que al abrir la ventana sólo hay que descongelarlo.
+Con cgroups v2 cada proceso se mete en el cgroup de su agente al lanzarlo.
+"""
+
+import os
+import sys
+import json
+import time
+import psutil
+import logging
+import threading
+import subprocess
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from model_residency import ModelResidencyManager
+from admission_control import CgroupManager
+
+logger = logging.getLogger(__name__)
+
+AGENTS_ROOT = Path(__file__).resolve().parents[2]
+HIBERNATION_MODES = ("suspend", "exit")
+
+
+@dataclass
+class AgentProcess:
+    """Proceso supervisado de un agente"""
+    agent_name: str
+    command: List[str]
+    cwd: Path
+    model: Optional[str] = None
+    env: Dict[str, str] = field(default_factory=dict)
+    process: Optional[subprocess.Popen] = None
+    suspended: bool = False
+    prewarming: bool = False
+    started_at: Optional[float] = None
+    last_hibernation: Dict[str, Any] = field(default_factory=dict)
+    last_resume: Dict[str, Any] = field(default_factory=dict)
+
+
+class AgentSupervisor:
+    """Arranca, hiberna y reanuda los procesos de los agentes"""
+
+    def __init__(self, agents_root: Path = AGENTS_ROOT, models: Optional[ModelResidencyManager] = None,
+                 stop_timeout: float = 10.0, cgroups: Optional[CgroupManager] = None):
+        self.agents_root = Path(agents_root)
+        self.models = models
+        self.cgroups = cgroups
+        self.stop_timeout = stop_timeout
+        self.agents: Dict[str, AgentProcess] = {}
+        self.lock = threading.RLock()
+
+    def register(self, agent_name: str, command: Optional[List[str]] = None, cwd: Optional[Path] = None,
+                 model: Optional[str] = None, env: Optional[Dict[str, str]] = None) -> AgentProcess:
+        """Registra cómo lanzar un agente (por defecto `<agente>/start_agent.py`)"""
+        cwd = Path(cwd) if cwd else self.agents_root / agent_name
+        command = command or [sys.executable, str(cwd / "start_agent.py")]
+        agent = self.agents.get(agent_name)
+        if agent is None:
+            agent = self.agents[agent_name] = AgentProcess(agent_name, command, cwd, model, env or {})
+        else:
+            agent.command, agent.cwd, agent.model, agent.env = command, cwd, model, env or {}
+        return agent
+
+    def _agent(self, agent_name: str) -> AgentProcess:
+        return self.agents.get(agent_name) or self.register(agent_name)
+
+    def is_running(self, agent_name: str) -> bool:
+        agent = self.agents.get(agent_name)
+        return bool(agent and agent.process and agent.process.poll() is None)
+
+    def is_suspended(self, agent_name: str) -> bool:
+        return self.is_running(agent_name) and self.agents[agent_name].suspended
+
+    def _tree(self, agent: AgentProcess) -> List[psutil.Process]:
+        try:
+            root = psutil.Process(agent.process.pid)
+            return [root] + root.children(recursive=True)
+        except (psutil.NoSuchProcess, AttributeError):
+            return []
+
+    def memory_bytes(self, agent_name: str) -> int:
+        """RSS del árbol de procesos del agente"""
+        total = 0
+        for process in self._tree(self._agent(agent_name)):
+            try:
+                total += process.memory_info().rss
+            except psutil.NoSuchProcess:
+                pass
+        return total
+
+    def start(self, agent_name: str, checkpoint: Optional[Dict[str, Any]] = None) -> bool:
+        """Lanza el proceso del agente; el checkpoint viaja en VHQ_AGENT_CHECKPOINT"""
+        agent = self._agent(agent_name)
+        if self.is_running(agent_name):
+            return True
+        script = agent.cwd / agent.command[-1]
+        if agent.command[0] == sys.executable and script.suffix == ".py" and not script.exists():
+            logger.error(f"No existe {script} para {agent_name}")
+            return False
+        env = dict(os.environ, **agent.env, VHQ_AGENT_NAME=agent_name)
+        if checkpoint is not None:
+            env["VHQ_AGENT_CHECKPOINT"] = json.dumps(checkpoint)
+        try:
+            agent.process = subprocess.Popen(agent.command, cwd=str(agent.cwd), env=env)
+        except OSError as e:
+            logger.error(f"Error lanzando {agent_name}: {e}")
+            return False
+        if self.cgroups:
+            self.cgroups.attach(agent_name, agent.process.pid)
+        agent.suspended = False
+        agent.started_at = time.time()
+        logger.info(f"🚀 {agent_name} lanzado (pid {agent.process.pid})")
+        return True
+
+    def hibernate(self, agent_name: str, mode: str = "suspend") -> Optional[Dict[str, Any]]:
+        """Congela o termina el agente y descarga su modelo; devuelve latencia y memoria recuperada"""
+        if mode not in HIBERNATION_MODES:
+            raise ValueError(f"Modo de hibernación '{mode}' no válido, usa uno de {HIBERNATION_MODES}")
+        agent = self._agent(agent_name)
+        if not self.is_running(agent_name):
+            return None
+        start = time.perf_counter()
+        rss_before = self.memory_bytes(agent_name)
+        model_bytes = 0
+        if agent.model and self.models:
+            model_bytes = self.models.release(agent.model, agent_name, evict=True)
+
+        if mode == "suspend":
+            self._suspend(agent)
+            rss_after = self.memory_bytes(agent_name)
+        else:
+            self.stop(agent_name)
+            rss_after = 0
+
+        agent.last_hibernation = {
+            "mode": mode,
+            "latency_ms": (time.perf_counter() - start) * 1000,
+            "rss_reclaimed_mb": (rss_before - rss_after) / 1024 ** 2,
+            "model_unloaded_mb": model_bytes / 1024 ** 2,
+        }
+        logger.info(f"🧊 {agent_name} hibernado ({mode}) en {agent.last_hibernation['latency_ms']:.0f} ms, "
+                    f"{agent.last_hibernation['rss_reclaimed_mb'] + agent.last_hibernation['model_unloaded_mb']:.0f} MB liberados")
+        return agent.last_hibernation
+
+    def _suspend(self, agent: AgentProcess):
+        with self.lock:
+            agent.prewarming = False
+            if not agent.suspended:
+                for process in self._tree(agent):
+                    try:
+                        process.suspend()
+                    except psutil.NoSuchProcess:
+                        pass
+                agent.suspended = True
+
+    def prewarm(self, agent_name: str, checkpoint: Optional[Dict[str, Any]] = None,
+                warmup_seconds: float = 20.0) -> bool:
+        """Lanza el agente antes de su ventana y lo congela tras `warmup_seconds` de arranque"""
+        if self.is_running(agent_name):
+            return True
+        if not self.start(agent_name, checkpoint):
+            return False
+        agent = self.agents[agent_name]
+        agent.prewarming = True
+        timer = threading.Timer(warmup_seconds, self._finish_prewarm, args=(agent_name,))
+        timer.daemon = True
+        timer.start()
+        return True
+
+    def _finish_prewarm(self, agent_name: str):
+        with self.lock:
+            agent = self.agents[agent_name]
+            # Si la ventana ya se abrió (resume) o se paró el agente, no hay nada que congelar
+            if agent.prewarming and self.is_running(agent_name):
+                self._suspend(agent)
+                logger.info(f"🌡️  {agent_name} precalentado y congelado hasta su ventana")
+            agent.prewarming = False
+
+    def resume(self, agent_name: str, checkpoint: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Carga el modelo y descongela o relanza el agente desde su checkpoint"""
+        agent = self._agent(agent_name)
+        start = time.perf_counter()
+        if agent.model and self.models and not self.models.acquire(agent.model, agent_name):
+            logger.error(f"Sin modelo {agent.model} para {agent_name}")
+            return None
+        with self.lock:
+            agent.prewarming = False
+            if self.is_suspended(agent_name):
+                for process in reversed(self._tree(agent)):
+                    try:
+                        process.resume()
+                    except psutil.NoSuchProcess:
+                        pass
+                agent.suspended = False
+                mode = "suspend"
+            elif self.is_running(agent_name):
+                mode = "running"
+            elif self.start(agent_name, checkpoint):
+                mode = "exit"
+            else:
+                return None
+        agent.last_resume = {"mode": mode, "latency_ms": (time.perf_counter() - start) * 1000}
+        logger.info(f"▶️  {agent_name} reanudado ({mode}) en {agent.last_resume['latency_ms']:.0f} ms")
+        return agent.last_resume
+
+    def stop(self, agent_name: str) -> bool:
+        """Termina el árbol de procesos del agente (SIGTERM y, si no responde, SIGKILL)"""
+        agent = self.agents.get(agent_name)
+        if agent is None or agent.process is None:
+            return False
+        agent.prewarming = False
+        tree = self._tree(agent)
+        for process in tree:
+            try:
+                if agent.suspended:
+                    process.resume()  # Un proceso congelado no atendería SIGTERM
+                process.terminate()
+            except psutil.NoSuchProcess:
+                pass
+        _, alive = psutil.wait_procs(tree, timeout=self.stop_timeout)
+        for process in alive:
+            try:
+                process.kill()
+            except psutil.NoSuchProcess:
+                pass
+        agent.process.wait()
+        agent.process = None
+        agent.suspended = False
+        return True
+
+    def shutdown(self):
+        for agent_name in list(self.agents):
+            self.stop(agent_name)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "pid": agent.process.pid if self.is_running(name) else None,
+                "suspended": agent.suspended,
+                "rss_mb": self.memory_bytes(name) / 1024 ** 2,
+                "model": agent.model,
+                "last_hibernation": agent.last_hibernation,
+                "last_resume": agent.last_resume,
+            }
+            for name, agent in self.agents.items()
+        }
+
+
+def main():
+    """Lanzamiento manual de un agente supervisado"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    supervisor = AgentSupervisor()
+    if len(sys.argv) < 3 or sys.argv[1] != "start":
+        print("Uso: python agent_supervisor.py start <agente>")
+        return
+    if supervisor.start(sys.argv[2]):
+        try:
+            supervisor.agents[sys.argv[2]].process.wait()
+        except KeyboardInterrupt:
+            supervisor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
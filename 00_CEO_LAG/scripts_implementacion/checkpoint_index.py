@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+🗂️ CHECKPOINT INDEX VHQ_LAG - ÍNDICE DE CHECKPOINTS
+Índice SQLite (WAL) task_id → agente, estado, última actualización y tamaño
+del log. Permite arrancar sin abrir cada checkpoint, consultar en O(1) y
+aplicar la retención por buckets diarios sin leer los archivos.
+"""
+
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BUCKET_SECONDS = 86400  # retención por días
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    task_id TEXT PRIMARY KEY,
+    agent_name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    last_update REAL NOT NULL,
+    bucket INTEGER NOT NULL,
+    log_bytes INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_checkpoints_retention ON checkpoints (bucket, status);
+CREATE INDEX IF NOT EXISTS idx_checkpoints_status ON checkpoints (status);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def iso_to_timestamp(value: Optional[str]) -> float:
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class CheckpointIndex:
+    """Metadatos de todos los checkpoints sin cargar su contenido"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def upsert_many(self, rows: Iterable[Tuple[str, str, str, float, int]]):
+        """Filas (task_id, agent_name, status, last_update, log_bytes) en una transacción"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO checkpoints (task_id, agent_name, status, last_update, bucket, log_bytes) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(task_id, agent_name, status, last_update, int(last_update // BUCKET_SECONDS), log_bytes)
+                 for task_id, agent_name, status, last_update, log_bytes in rows])
+
+    def upsert(self, task_id: str, agent_name: str, status: str, last_update: float, log_bytes: int = 0):
+        self.upsert_many([(task_id, agent_name, status, last_update, log_bytes)])
+
+    def get(self, task_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT agent_name, status, last_update, log_bytes FROM checkpoints WHERE task_id = ?",
+                (task_id,)).fetchone()
+        if row is None:
+            return None
+        return {"task_id": task_id, "agent_name": row[0], "status": row[1],
+                "last_update": row[2], "log_bytes": row[3]}
+
+    def contains(self, task_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM checkpoints WHERE task_id = ?", (task_id,)).fetchone() is not None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+
+    def status_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM checkpoints GROUP BY status"))
+
+    def task_ids(self, status: Optional[str] = None) -> List[str]:
+        with self._lock:
+            if status is None:
+                return [row[0] for row in self._conn.execute("SELECT task_id FROM checkpoints")]
+            return [row[0] for row in self._conn.execute(
+                "SELECT task_id FROM checkpoints WHERE status = ?", (status,))]
+
+    def log_sizes(self) -> Dict[str, int]:
+        """task_id -> bytes del log según el índice (para reconciliar tras una caída)"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT task_id, log_bytes FROM checkpoints"))
+
+    def expired(self, cutoff: float, statuses: Tuple[str, ...] = ("completed", "failed")) -> List[str]:
+        """Tareas terminadas en buckets (días) completos anteriores a `cutoff`, sin abrir ningún archivo"""
+        placeholders = ",".join("?" * len(statuses))
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                f"SELECT task_id FROM checkpoints WHERE bucket < ? AND status IN ({placeholders})",
+                (int(cutoff // BUCKET_SECONDS), *statuses))]
+
+    def remove_many(self, task_ids: Iterable[str]):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM checkpoints WHERE task_id = ?", [(task_id,) for task_id in task_ids])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
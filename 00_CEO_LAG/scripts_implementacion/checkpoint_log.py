@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+📝 CHECKPOINT LOG VHQ_LAG - CHECKPOINTS INCREMENTALES
+Log binario append-only por tarea: un registro base con el checkpoint
+completo y después sólo los cambios (campos nuevos, pasos añadidos, claves
+de custom_data modificadas). Se compacta de forma periódica para que la
+recuperación no tenga que reproducir miles de deltas.
+Codificación msgpack si está instalado, JSON compacto si no.
+"""
+
+import os
+import copy
+import json
+import struct
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"VHQCKPT1"
+RECORD_HEADER = struct.Struct("<cI")  # codificación ('M' msgpack / 'J' json), longitud del payload
+_MISSING = object()
+
+
+def encode_payload(record: Dict[str, Any]) -> Tuple[bytes, bytes]:
+    if msgpack is not None:
+        return b"M", msgpack.packb(record, use_bin_type=True)
+    return b"J", json.dumps(record, separators=(",", ":")).encode("utf-8")
+
+
+def decode_payload(encoding: bytes, payload: bytes) -> Dict[str, Any]:
+    if encoding == b"M":
+        if msgpack is None:
+            raise RuntimeError("checkpoint codificado con msgpack y msgpack no está instalado")
+        return msgpack.unpackb(payload, raw=False)
+    return json.loads(payload.decode("utf-8"))
+
+
+def diff_checkpoint(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Cambios de `old` a `new`: listas que sólo crecen y dicts que sólo ganan/cambian claves viajan como delta"""
+    delta: Dict[str, Dict[str, Any]] = {}
+    for key, value in new.items():
+        previous = old.get(key, _MISSING)
+        if previous is _MISSING:
+            delta.setdefault("set", {})[key] = value
+        elif isinstance(value, list) and isinstance(previous, list) \
+                and len(value) >= len(previous) and value[:len(previous)] == previous:
+            if len(value) > len(previous):
+                delta.setdefault("append", {})[key] = value[len(previous):]
+        elif isinstance(value, dict) and isinstance(previous, dict) and previous.keys() <= value.keys():
+            changed = {k: v for k, v in value.items() if k not in previous or previous[k] != v}
+            if changed:
+                delta.setdefault("merge", {})[key] = changed
+        elif value != previous:
+            delta.setdefault("set", {})[key] = value
+    return delta
+
+
+def apply_delta(data: Dict[str, Any], delta: Dict[str, Dict[str, Any]]):
+    data.update(delta.get("set", {}))
+    for key, items in delta.get("append", {}).items():
+        data.setdefault(key, []).extend(items)
+    for key, changed in delta.get("merge", {}).items():
+        data.setdefault(key, {}).update(changed)
+
+
+class CheckpointLog:
+    """Un archivo `<task_id>.log` por tarea con registros base + delta"""
+
+    def __init__(self, directory: Path, compact_ratio: float = 4.0, max_deltas: int = 1000, fsync: bool = False):
+        self.directory = Path(directory)
+        self.fsync = fsync
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Compactar cuando los deltas pesan `compact_ratio` veces la base (coste amortizado lineal)
+        # o cuando hay demasiados deltas que reproducir y al menos igualan a la base
+        self.compact_ratio = compact_ratio
+        self.max_deltas = max_deltas
+        self._persisted: Dict[str, Dict[str, Any]] = {}
+        self._sizes: Dict[str, Tuple[int, int, int]] = {}  # task_id -> (bytes base, bytes deltas, nº deltas)
+        self.bytes_written = 0
+        self.records_written = 0
+
+    def path(self, task_id: str) -> Path:
+        return self.directory / f"{task_id}.log"
+
+    def write(self, task_id: str, data: Dict[str, Any]) -> int:
+        """Persiste `data` como delta respecto a lo último escrito; devuelve los bytes añadidos"""
+        persisted = self._persisted.get(task_id)
+        if persisted is None:
+            return self.compact(task_id, data)
+        delta = diff_checkpoint(persisted, data)
+        if not delta:
+            return 0
+        base_bytes, delta_bytes, delta_count = self._sizes[task_id]
+        encoding, payload = encode_payload({"delta": delta})
+        record = RECORD_HEADER.pack(encoding, len(payload)) + payload
+        if delta_bytes + len(record) > self.compact_ratio * base_bytes or \
+                (delta_count >= self.max_deltas and delta_bytes + len(record) > base_bytes):
+            return self.compact(task_id, data)
+        with open(self.path(task_id), "ab") as f:
+            f.write(record)
+            self._sync(f)
+        # La copia persistida se actualiza con lo decodificado: nunca comparte objetos con `data`
+        apply_delta(persisted, decode_payload(encoding, payload)["delta"])
+        self._sizes[task_id] = (base_bytes, delta_bytes + len(record), delta_count + 1)
+        self.bytes_written += len(record)
+        self.records_written += 1
+        return len(record)
+
+    def compact(self, task_id: str, data: Optional[Dict[str, Any]] = None) -> int:
+        """Reescribe el log como un único registro base (escritura atómica)"""
+        if data is None:
+            data = self._persisted.get(task_id) or self.load(task_id)
+            if data is None:
+                return 0
+        encoding, payload = encode_payload({"base": data})
+        content = MAGIC + RECORD_HEADER.pack(encoding, len(payload)) + payload
+        path = self.path(task_id)
+        tmp_path = path.with_suffix(".log.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+            self._sync(f)
+        os.replace(tmp_path, path)
+        self._persisted[task_id] = copy.deepcopy(data)
+        self._sizes[task_id] = (len(content), 0, 0)
+        self.bytes_written += len(content)
+        self.records_written += 1
+        return len(content)
+
+    def size(self, task_id: str) -> int:
+        """Bytes del log (base + deltas) según lo escrito o cargado en este proceso"""
+        base_bytes, delta_bytes, _ = self._sizes.get(task_id, (0, 0, 0))
+        return base_bytes + delta_bytes
+
+    def _sync(self, f):
+        if self.fsync:
+            f.flush()
+            os.fsync(f.fileno())
+
+    def load(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Reconstruye el checkpoint reproduciendo base + deltas; descarta un registro final truncado"""
+        path = self.path(task_id)
+        if not path.exists():
+            return None
+        with open(path, "rb") as f:
+            content = f.read()
+        if not content.startswith(MAGIC):
+            raise ValueError(f"{path} no es un log de checkpoints")
+        data: Optional[Dict[str, Any]] = None
+        offset, delta_count = len(MAGIC), 0
+        while offset + RECORD_HEADER.size <= len(content):
+            encoding, length = RECORD_HEADER.unpack_from(content, offset)
+            end = offset + RECORD_HEADER.size + length
+            if end > len(content):
+                break
+            record = decode_payload(encoding, content[offset + RECORD_HEADER.size:end])
+            if "base" in record:
+                data, base_end, delta_count = record["base"], end, 0
+            elif data is not None:
+                apply_delta(data, record["delta"])
+                delta_count += 1
+            offset = end
+        if data is None:
+            return None
+        if offset < len(content):
+            logger.warning(f"⚠️ Registro truncado en {path}, se descarta")
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+        self._persisted[task_id] = copy.deepcopy(data)
+        self._sizes[task_id] = (base_end, offset - base_end, delta_count)
+        return data
+
+    def load_all(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for path in self.directory.glob("*.log"):
+            task_id = path.stem
+            try:
+                data = self.load(task_id)
+            except Exception as e:
+                logger.error(f"Error cargando checkpoint de {path}: {e}")
+                continue
+            if data is not None:
+                yield task_id, data
+
+    def forget(self, task_id: str):
+        """Olvida la copia en memoria de un checkpoint que ya no se va a actualizar"""
+        self._persisted.pop(task_id, None)
+        self._sizes.pop(task_id, None)
+
+    def remove(self, task_id: str):
+        self._persisted.pop(task_id, None)
+        self._sizes.pop(task_id, None)
+        path = self.path(task_id)
+        if path.exists():
+            path.unlink()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+🎛️ CONTROL LOOP VHQ_LAG - BUCLE DE CONTROL ADAPTATIVO
+Sustituye los bucles de periodo fijo (60 s / 30 s) por un bucle que:
+  - alarga el periodo cuando los recursos están lejos de los umbrales y lo
+    acorta (hasta `min_interval`) a medida que se acercan
+  - se despierta al momento si un snapshot del sampler compartido cruza el
+    umbral crítico o si el kernel avisa de presión de memoria (triggers PSI
+    de /proc/pressure/memory en Linux)
+En reposo sólo cuesta una comparación por snapshot y un hilo bloqueado en poll().
+"""
+
+import os
+import sys
+import time
+import select
+import threading
+import logging
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Optional
+
+from resource_sampler import ResourceSampler, ResourceSnapshot, get_shared_sampler
+
+logger = logging.getLogger(__name__)
+
+PSI_ROOT = Path("/proc/pressure")
+
+
+def parse_psi(text: str) -> Dict[str, Dict[str, float]]:
+    """Formato PSI ("some avg10=0.00 avg60=0.00 avg300=0.00 total=0") -> {"some": {...}, "full": {...}}"""
+    pressure = {}
+    for line in text.splitlines():
+        if line.strip():
+            kind, *values = line.split()
+            pressure[kind] = {key: float(value) for key, value in (item.split("=") for item in values)}
+    return pressure
+
+
+def read_psi(resource: str = "memory") -> Optional[Dict[str, Dict[str, float]]]:
+    """Lee /proc/pressure/<recurso>: {"some": {"avg10": ..., "total": ...}, "full": {...}}; None si no hay PSI"""
+    try:
+        with open(PSI_ROOT / resource) as f:
+            return parse_psi(f.read())
+    except OSError:
+        return None
+
+
+class PressureWatcher:
+    """Hilo bloqueado en poll() sobre un trigger PSI; llama a `callback` cuando el kernel avisa.
+
+    El trigger "some <stall_us> <window_us>" salta cuando las tareas pasan más de
+    `stall_us` esperando memoria dentro de una ventana de `window_us`. Sin
+    privilegios el kernel sólo acepta ventanas múltiplo de 2 s.
+    """
+
+    def __init__(self, callback: Callable[[str], None], resource: str = "memory",
+                 stall_us: int = 150000, window_us: int = 2000000):
+        self.callback = callback
+        self.resource = resource
+        self.stall_us = stall_us
+        self.window_us = window_us
+        self.events = 0
+        self._fd: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def available(self) -> bool:
+        return self._fd is not None
+
+    def _open(self) -> bool:
+        if not hasattr(select, "poll"):
+            return False
+        for window_us in dict.fromkeys((self.window_us, max(2000000, self.window_us // 2000000 * 2000000))):
+            try:
+                fd = os.open(PSI_ROOT / self.resource, os.O_RDWR | os.O_NONBLOCK)
+            except OSError:
+                return False
+            try:
+                os.write(fd, f"some {self.stall_us} {window_us}\n".encode())
+            except OSError:
+                os.close(fd)
+                continue
+            self._fd, self.window_us = fd, window_us
+            return True
+        return False
+
+    def start(self) -> bool:
+        """Registra el trigger y arranca el hilo; False si el sistema no tiene PSI"""
+        if self._thread and self._thread.is_alive():
+            return True
+        if not self._open():
+            logger.info(f"PSI de {self.resource} no disponible, sólo umbrales del sampler")
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="PressureWatcher", daemon=True)
+        self._thread.start()
+        logger.info(f"📉 Trigger PSI {self.resource}: {self.stall_us / 1000:.0f} ms de espera por "
+                    f"ventana de {self.window_us / 1e6:.0f} s")
+        return True
+
+    def _run(self):
+        poller = select.poll()
+        poller.register(self._fd, select.POLLPRI)
+        while not self._stop.is_set():
+            # Timeout sólo para poder parar el hilo; el aviso del kernel despierta al momento
+            for _, event in poller.poll(1000):
+                if event & select.POLLERR:
+                    logger.warning("Trigger PSI cerrado por el kernel")
+                    return
+                if event & select.POLLPRI:
+                    self.events += 1
+                    try:
+                        self.callback(self.resource)
+                    except Exception as e:
+                        logger.error(f"Error en aviso PSI: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(2)
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class AdaptiveControlLoop:
+    """Ejecuta `step` con un periodo que se adapta a la cercanía a los umbrales.
+
+    `proximity(snapshot)` devuelve 0 (lejos) … 1 (en el umbral crítico o por
+    encima). Por debajo de `calm` el periodo es `max_interval`; de `calm` a 1
+    baja geométricamente hasta `min_interval`. Cada snapshot del sampler
+    recalcula el periodo y despierta el bucle si ya toca, así que un pico se
+    atiende en el siguiente snapshot (≤ 1 s) y un aviso PSI al instante.
+    `next_deadline()` permite además despertar para eventos propios (horarios).
+    """
+
+    def __init__(self, step: Callable[[], Any], proximity: Callable[[ResourceSnapshot], float],
+                 min_interval: float = 1.0, max_interval: float = 60.0, calm: float = 0.7,
+                 sampler: Optional[ResourceSampler] = None, psi: bool = True,
+                 next_deadline: Optional[Callable[[], Optional[float]]] = None):
+        self.step = step
+        self.proximity = proximity
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.calm = calm
+        self.sampler = sampler or get_shared_sampler()
+        self.next_deadline = next_deadline
+        self.watcher = PressureWatcher(lambda resource: self.wake(f"psi_{resource}")) if psi else None
+        self.interval = max_interval
+        self.level = 0.0
+        self.steps = 0
+        self.wakeups: Dict[str, int] = {}
+        self.reaction_ms: Deque[float] = deque(maxlen=100)
+        self._wake = threading.Event()
+        self._reason: Optional[str] = None
+        self._triggered_at: Optional[float] = None
+        self._last_step = time.monotonic()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def interval_for(self, level: float) -> float:
+        if level <= self.calm:
+            return self.max_interval
+        fraction = min((level - self.calm) / (1 - self.calm), 1.0)
+        return self.max_interval * (self.min_interval / self.max_interval) ** fraction
+
+    def wake(self, reason: str, at: Optional[float] = None):
+        with self._lock:
+            if self._reason is None:
+                self._reason = reason
+                self._triggered_at = at if at is not None else time.time()
+        self._wake.set()
+
+    def _on_snapshot(self, snapshot: ResourceSnapshot):
+        self.level = self.proximity(snapshot)
+        self.interval = self.interval_for(self.level)
+        if self.level >= 1:
+            self.wake("threshold", at=snapshot.timestamp)
+        elif time.monotonic() - self._last_step >= self.interval:
+            self.wake("adaptive")
+
+    def _timeout(self) -> float:
+        timeout = self.interval - (time.monotonic() - self._last_step)
+        if self.next_deadline:
+            # Un evento ya vencido lo tuvo el último paso; no se reintenta en bucle
+            deadline = self.next_deadline()
+            if deadline is not None and deadline > 0:
+                timeout = min(timeout, deadline)
+        return max(timeout, 0.05)
+
+    def run(self):
+        """Bucle bloqueante hasta `stop()`; las excepciones de `step` se propagan"""
+        self.sampler.subscribe(self._on_snapshot)
+        if self.watcher:
+            self.watcher.start()
+        try:
+            while not self._stop.is_set():
+                woken = self._wake.wait(self._timeout())
+                with self._lock:
+                    reason = self._reason if woken else "timer"
+                    triggered_at = self._triggered_at
+                    self._reason = self._triggered_at = None
+                    self._wake.clear()
+                if self._stop.is_set():
+                    break
+                if woken and reason != "adaptive" and triggered_at is not None:
+                    self.reaction_ms.append((time.time() - triggered_at) * 1000)
+                self.wakeups[reason] = self.wakeups.get(reason, 0) + 1
+                self._last_step = time.monotonic()
+                self.steps += 1
+                self.step()
+        finally:
+            self.sampler.unsubscribe(self._on_snapshot)
+            if self.watcher:
+                self.watcher.stop()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self.interval,
+            "level": self.level,
+            "steps": self.steps,
+            "wakeups": dict(self.wakeups),
+            "psi": bool(self.watcher and self.watcher.available),
+            "psi_events": self.watcher.events if self.watcher else 0,
+            "mean_reaction_ms": sum(self.reaction_ms) / len(self.reaction_ms) if self.reaction_ms else None,
+        }
+
+
+def main():
+    """Muestra la presión de memoria actual y espera avisos PSI"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    print(read_psi("memory") or "PSI no disponible")
+    if len(sys.argv) > 1 and sys.argv[1] == "watch":
+        watcher = PressureWatcher(lambda resource: print(f"⚠️  Presión de {resource}: {read_psi(resource)}"))
+        if watcher.start():
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                watcher.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+🗃️ MEDIA CACHE VHQ_LAG - CACHÉ DE ACTIVOS DERIVADOS POR CONTENIDO
+Caché en disco compartida por MEDIA_LAG, CLIP_LAG y DJ_LAG para miniaturas,
+proxies, formas de onda, codificaciones por plataforma y previews.
+La clave es una huella rápida de la(s) fuente(s) (tamaño + muestras del
+principio, medio y final, con blake2b) más la transformación y sus
+parámetros, así que una fuente idéntica no se vuelve a procesar aunque cambie
+de nombre o de carpeta. El tamaño total está acotado y se expulsan primero
+las entradas usadas hace más tiempo (LRU). El índice es SQLite (WAL), que
+admite varios procesos a la vez. Como otro proceso puede expulsar una entrada
+en cualquier momento, los aciertos se enlazan (o copian) al directorio de
+trabajo de quien los pide y se devuelven esas rutas, no las de la caché.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+AGENTS_ROOT = Path(__file__).resolve().parents[2]
+CACHE_ROOT = Path(os.environ.get("VHQ_MEDIA_CACHE", AGENTS_ROOT / "00_CEO_LAG" / "shared_resources" / "media_cache"))
+SAMPLE_BYTES = 1024 * 1024
+GB = 1024 ** 3
+
+PathLike = Union[str, Path]
+
+
+def fast_file_hash(path: PathLike, sample_bytes: int = SAMPLE_BYTES) -> str:
+    """Huella de un fichero: tamaño y tres muestras (principio, medio, final); entero si es pequeño"""
+    path = Path(path)
+    size = path.stat().st_size
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, "rb") as f:
+        if size <= 3 * sample_bytes:
+            digest.update(f.read())
+        else:
+            for offset in (0, (size - sample_bytes) // 2, size - sample_bytes):
+                f.seek(offset)
+                digest.update(f.read(sample_bytes))
+    return digest.hexdigest()
+
+
+def link_or_copy(source: PathLike, target: PathLike):
+    """Enlace duro de `source` en `target` si se puede (mismo volumen), si no copia"""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+class MediaCache:
+    """Caché de activos derivados: clave = huella de las fuentes + transformación + parámetros"""
+
+    def __init__(self, root: PathLike = CACHE_ROOT, max_bytes: Optional[int] = None):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            float(os.environ.get("VHQ_MEDIA_CACHE_GB", 50)) * GB)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root / "index.db"), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY, transform TEXT NOT NULL, files TEXT NOT NULL,
+                size INTEGER NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS source_hashes (
+                path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, hash TEXT NOT NULL)""")
+
+    def source_hash(self, path: PathLike) -> str:
+        """Huella de una fuente; se recuerda por (ruta, tamaño, mtime) para no releerla"""
+        path = Path(path).resolve()
+        stat = path.stat()
+        with self._lock:
+            row = self._conn.execute("SELECT size, mtime_ns, hash FROM source_hashes WHERE path = ?",
+                                     (str(path),)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+        digest = fast_file_hash(path)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO source_hashes VALUES (?, ?, ?, ?)",
+                               (str(path), stat.st_size, stat.st_mtime_ns, digest))
+        return digest
+
+    def key(self, sources: Union[PathLike, Sequence[PathLike]], transform: str,
+            params: Optional[Dict[str, Any]] = None) -> str:
+        """Clave de un activo derivado de `sources` con `transform` y sus parámetros"""
+        if isinstance(sources, (str, Path)):
+            sources = [sources]
+        material = json.dumps({"sources": [self.source_hash(source) for source in sources],
+                               "transform": transform, "params": params or {}}, sort_keys=True, default=str)
+        return hashlib.blake2b(material.encode(), digest_size=20).hexdigest()
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.objects / key[:2] / key
+
+    def get(self, key: str, dest_dir: Optional[PathLike] = None) -> Optional[List[Path]]:
+        """Ficheros de la entrada (y la marca como usada) o None si no está.
+
+        Con `dest_dir` se enlazan allí y se devuelven esas rutas, que siguen valiendo aunque
+        otro proceso expulse la entrada; sin él son rutas de la caché, válidas hasta la expulsión.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT files FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        entry_dir = self._entry_dir(key)
+        files = [entry_dir / name for name in json.loads(row[0])]
+        if not all(path.exists() for path in files):
+            # Borrada por fuera del índice: se trata como fallo
+            self._remove(key)
+            self.misses += 1
+            return None
+        if dest_dir is not None:
+            try:
+                files = self._checkout(files, Path(dest_dir))
+            except OSError:
+                # Expulsada por otro proceso mientras se enlazaba
+                self.misses += 1
+                return None
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        return files
+
+    @staticmethod
+    def _checkout(files: Sequence[Path], dest_dir: Path) -> List[Path]:
+        """Enlaza (o copia) los ficheros en `dest_dir` con su nombre, sustituyendo lo que hubiera"""
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        targets = []
+        for source in files:
+            target = dest_dir / source.name
+            if target.exists() and os.path.samefile(source, target):
+                targets.append(target)
+                continue
+            temp = target.with_name(f"{source.name}.tmp-{os.getpid()}-{threading.get_ident()}")
+            try:
+                link_or_copy(source, temp)
+                os.replace(temp, target)
+            except OSError:
+                temp.unlink(missing_ok=True)
+                raise
+            targets.append(target)
+        return targets
+
+    def put(self, key: str, files: Sequence[PathLike], transform: str = "") -> List[Path]:
+        """Guarda los ficheros bajo `key` (enlace duro si se puede, si no copia) y aplica el límite LRU.
+
+        Con enlace duro la caché y quien generó el fichero comparten los datos: para regenerarlo
+        hay que escribir uno nuevo y sustituirlo con os.replace, nunca reescribirlo en el sitio.
+        """
+        entry_dir = self._entry_dir(key)
+        staging = entry_dir.with_name(f"{key}.tmp-{os.getpid()}-{threading.get_ident()}")
+        staging.mkdir(parents=True, exist_ok=True)
+        names, size = [], 0
+        for source in map(Path, files):
+            target = staging / source.name
+            link_or_copy(source, target)
+            names.append(source.name)
+            size += target.stat().st_size
+        try:
+            staging.rename(entry_dir)
+        except OSError:
+            # Otro agente guardó la misma entrada a la vez: vale la suya
+            shutil.rmtree(staging, ignore_errors=True)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                               (key, transform, json.dumps(names), size, now, now))
+        self._evict(keep=key)
+        return [entry_dir / name for name in names]
+
+    def cached(self, key: str, transform: str, produce, dest_dir: Optional[PathLike] = None) -> List[Path]:
+        """get(key, dest_dir) o, si falla, produce() -> ficheros, que se guardan en la caché"""
+        files = self.get(key, dest_dir)
+        if files is None:
+            produced = [Path(path) for path in produce()]
+            files = self.put(key, produced, transform)
+            if dest_dir is not None:
+                files = self._checkout(produced, Path(dest_dir))
+        return files
+
+    def _remove(self, key: str):
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def _evict(self, keep: Optional[str] = None):
+        """Expulsa las entradas menos usadas hasta volver por debajo de max_bytes"""
+        with self._lock:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = self._conn.execute("SELECT key, size FROM entries WHERE key != ? ORDER BY last_access",
+                                      (keep or "",)).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._remove(key)
+            total -= size
+            self.evictions += 1
+            logger.debug(f"Caché de medios: expulsada {key} ({size / 1024 ** 2:.1f} MB)")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "size_gb": size / GB,
+            "max_gb": self.max_bytes / GB,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "evictions": self.evictions,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    """Estado de la caché compartida o huella de un fichero"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if len(sys.argv) > 2 and sys.argv[1] == "hash":
+        start = time.perf_counter()
+        print(f"{fast_file_hash(sys.argv[2])} ({(time.perf_counter() - start) * 1000:.1f} ms)")
+        return
+    cache = MediaCache()
+    print(f"Caché de medios en {cache.root}: {cache.stats()}")
+    print("Uso: python media_cache.py [hash <fichero>]")
+
+
+if __name__ == "__main__":
+    main()
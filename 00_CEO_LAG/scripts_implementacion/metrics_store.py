@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+📈 METRICS STORE VHQ_LAG - SERIES TEMPORALES CON AGREGADOS
+Serie temporal de recursos en SQLite (WAL): una fila por segundo durante un
+día y agregados (media/mín/máx) por minuto durante meses y por hora durante
+años. Las escrituras se agrupan por minuto y los agregados se calculan al
+cerrar cada minuto, así que guardar nunca reescribe el historial.
+"""
+
+import json
+import math
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Campos de ResourceSnapshot que se guardan como columnas
+METRICS = (
+    "cpu_percent", "ram_percent", "ram_available_gb", "swap_percent", "disk_free_gb",
+    "temperature", "cpu_temp", "gpu_percent", "gpu_temp", "gpu_vram_free_gb", "gpu_power_w"
+)
+
+# Resolución -> (segundos por punto, retención en segundos)
+RESOLUTIONS = {
+    "raw": (1, 86400),
+    "1m": (60, 90 * 86400),
+    "1h": (3600, 730 * 86400),
+}
+AGGREGATES = ("avg", "min", "max")
+
+
+def _value(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+class MetricsStore:
+    """Serie temporal de métricas con agregados por minuto y por hora"""
+
+    def __init__(self, db_path: Path, metrics: Sequence[str] = METRICS, batch_seconds: int = 60):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.metrics = tuple(metrics)
+        self.batch_seconds = batch_seconds
+        self._lock = threading.RLock()
+        self._buffer: List[Tuple] = []
+        self._minute: Optional[int] = None  # minuto (en segundos) del último punto añadido
+        self._pruned_hour: Optional[int] = None
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+
+    def _create_tables(self):
+        columns = ", ".join(f"{metric} REAL" for metric in self.metrics)
+        rollup_columns = ", ".join(f"{metric}_{agg} REAL" for metric in self.metrics for agg in AGGREGATES)
+        with self._conn:
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS raw (ts INTEGER PRIMARY KEY, {columns})")
+            for resolution in ("1m", "1h"):
+                self._conn.execute(f"CREATE TABLE IF NOT EXISTS rollup_{resolution} "
+                                   f"(ts INTEGER PRIMARY KEY, samples INTEGER NOT NULL, {rollup_columns})")
+
+    def append(self, timestamp: float, values: Dict[str, Any]):
+        """Añade un punto; al empezar un minuto nuevo se escribe el lote y se agrega el anterior"""
+        ts = int(timestamp)
+        row = (ts,) + tuple(_value(values.get(metric)) for metric in self.metrics)
+        with self._lock:
+            minute = ts // 60 * 60
+            if self._minute is not None and minute > self._minute:
+                self._flush()
+                self._rollup(self._minute, minute)
+            self._minute = max(minute, self._minute or minute)
+            self._buffer.append(row)
+            if len(self._buffer) >= self.batch_seconds:
+                self._flush()
+
+    def append_snapshot(self, snapshot):
+        """Callback para ResourceSampler.subscribe"""
+        self.append(snapshot.timestamp, {metric: getattr(snapshot, metric, None) for metric in self.metrics})
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        placeholders = ", ".join("?" * (len(self.metrics) + 1))
+        with self._conn:
+            self._conn.executemany(f"INSERT OR REPLACE INTO raw (ts, {', '.join(self.metrics)}) "
+                                   f"VALUES ({placeholders})", self._buffer)
+        self._buffer = []
+
+    def _rollup(self, start: int, end: int):
+        """Agrega [start, end) en minutos y recalcula las horas que tocan ese rango"""
+        minute_columns = ", ".join(f"AVG({m}), MIN({m}), MAX({m})" for m in self.metrics)
+        hour_columns = ", ".join(
+            f"SUM({m}_avg * samples) / SUM(CASE WHEN {m}_avg IS NOT NULL THEN samples END), "
+            f"MIN({m}_min), MAX({m}_max)" for m in self.metrics)
+        hour_start, hour_end = start // 3600 * 3600, -(-end // 3600) * 3600
+        with self._conn:
+            self._conn.execute(f"INSERT OR REPLACE INTO rollup_1m SELECT ts / 60 * 60, COUNT(*), {minute_columns} "
+                               f"FROM raw WHERE ts >= ? AND ts < ? GROUP BY ts / 60", (start, end))
+            self._conn.execute(f"INSERT OR REPLACE INTO rollup_1h SELECT ts / 3600 * 3600, SUM(samples), {hour_columns} "
+                               f"FROM rollup_1m WHERE ts >= ? AND ts < ? GROUP BY ts / 3600", (hour_start, hour_end))
+        if self._pruned_hour != end // 3600:
+            self._pruned_hour = end // 3600
+            self._prune(end)
+
+    def _prune(self, now: int):
+        with self._conn:
+            for resolution, (_, retention) in RESOLUTIONS.items():
+                table = "raw" if resolution == "raw" else f"rollup_{resolution}"
+                self._conn.execute(f"DELETE FROM {table} WHERE ts < ?", (now - retention,))
+
+    def resolution_for(self, start: float, now: float) -> str:
+        """La resolución más fina cuya retención cubre desde `start`"""
+        for resolution, (_, retention) in RESOLUTIONS.items():
+            if now - start <= retention:
+                return resolution
+        return "1h"
+
+    def query(self, metrics: Sequence[str], start: float, end: Optional[float] = None,
+              resolution: Optional[str] = None, aggregate: str = "avg") -> Dict[str, List[Optional[float]]]:
+        """Columnas {"timestamp": [...], métrica: [...]} entre `start` y `end` (por defecto ahora)"""
+        end = end if end is not None else datetime.now().timestamp()
+        resolution = resolution or self.resolution_for(start, end)
+        if resolution == "raw":
+            table, columns = "raw", list(metrics)
+        else:
+            table, columns = f"rollup_{resolution}", [f"{metric}_{aggregate}" for metric in metrics]
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(f"SELECT ts, {', '.join(columns)} FROM {table} "
+                                      f"WHERE ts >= ? AND ts < ? ORDER BY ts", (int(start), int(end) + 1)).fetchall()
+        result = {"timestamp": [row[0] for row in rows]}
+        for position, metric in enumerate(metrics, start=1):
+            result[metric] = [row[position] for row in rows]
+        return result
+
+    def count(self, resolution: str = "raw") -> int:
+        table = "raw" if resolution == "raw" else f"rollup_{resolution}"
+        with self._lock:
+            self._flush()
+            return self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def import_json_history(self, path: Path) -> int:
+        """Migra una vez el antiguo metrics_history.json (lo renombra a .imported)"""
+        path = Path(path)
+        if not path.exists():
+            return 0
+        try:
+            with open(path, 'r') as f:
+                history = json.load(f)
+        except Exception as e:
+            logger.error(f"Error leyendo historial antiguo {path}: {e}")
+            return 0
+        points = []
+        for record in history:
+            try:
+                gpu = record.get("gpu") or [{}]
+                points.append((datetime.fromisoformat(record["timestamp"]).timestamp(), {
+                    "cpu_percent": record["cpu"].get("cpu_percent"),
+                    "cpu_temp": record["cpu"].get("cpu_temp") or None,
+                    "ram_percent": record["memory"].get("ram_percent"),
+                    "ram_available_gb": record["memory"].get("ram_available_gb"),
+                    "swap_percent": record["memory"].get("swap_percent"),
+                    "disk_free_gb": record.get("disk", {}).get("disk_free_gb"),
+                    "gpu_percent": gpu[0].get("gpu_utilization"),
+                    "gpu_temp": gpu[0].get("gpu_temp"),
+                    "gpu_power_w": gpu[0].get("gpu_power_draw"),
+                }))
+            except (KeyError, TypeError, ValueError):
+                continue
+        if points:
+            points.sort(key=lambda point: point[0])
+            with self._lock:
+                self._flush()
+                for timestamp, values in points:
+                    self._buffer.append((int(timestamp),) + tuple(_value(values.get(m)) for m in self.metrics))
+                self._flush()
+                self._rollup(int(points[0][0]) // 60 * 60, int(points[-1][0]) // 60 * 60 + 60)
+        path.rename(path.with_suffix(path.suffix + ".imported"))
+        logger.info(f"Historial antiguo migrado: {len(points)} registros de {path}")
+        return len(points)
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            # El minuto en curso sólo se agrega al empezar el siguiente: se cierra aquí
+            if self._minute is not None:
+                self._rollup(self._minute, self._minute + 60)
+            self._conn.close()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+🧠 MODEL RESIDENCY VHQ_LAG - MODELOS OLLAMA RESIDENTES
+Lleva la cuenta de qué modelos de Ollama están cargados, con presupuesto de
+RAM/VRAM, desalojo por prioridad + LRU, precarga según los horarios de los
+agentes y métricas de tiempo de carga y aciertos de caché.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import logging
+import urllib.request
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+GB = 1024 ** 3
+DEFAULT_MODEL_GB = 5.0  # hasta medir el tamaño real con /api/ps
+
+
+class OllamaClient:
+    """Cliente mínimo de la API HTTP de Ollama"""
+
+    def __init__(self, host: str = OLLAMA_HOST):
+        self.host = host.rstrip("/")
+
+    def request(self, endpoint: str, payload: Optional[Dict[str, Any]] = None, timeout: float = 300):
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(f"{self.host}{endpoint}", data=data,
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read().decode("utf-8") or "{}")
+
+    def running(self) -> Dict[str, Tuple[int, int]]:
+        """Modelos cargados: nombre -> (bytes totales, bytes en VRAM)"""
+        return {model["name"]: (model.get("size", 0), model.get("size_vram", 0))
+                for model in self.request("/api/ps", timeout=5).get("models", [])}
+
+    def load(self, model: str, keep_alive: Any = -1):
+        """Carga un modelo sin generar nada; keep_alive=-1 lo deja residente hasta que se descargue"""
+        self.request("/api/generate", {"model": model, "keep_alive": keep_alive})
+
+    def unload(self, model: str):
+        self.request("/api/generate", {"model": model, "keep_alive": 0}, timeout=30)
+
+
+@dataclass
+class ResidentModel:
+    """Estado y métricas de un modelo"""
+    name: str
+    ram_bytes: int
+    vram_bytes: int = 0
+    priority: int = 5  # como agent_priorities: menor = más importante
+    pinned: bool = False
+    resident: bool = False
+    users: Set[str] = field(default_factory=set)
+    last_used: float = 0.0
+    hits: int = 0
+    misses: int = 0
+    prewarms: int = 0
+    evictions: int = 0
+    load_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=20))
+    loading: Optional[threading.Event] = None  # se está cargando (fuera del lock); se activa al terminar
+    unloading: Optional[threading.Event] = None  # desalojado, descargándose (fuera del lock)
+
+
+class ModelResidencyManager:
+    """Decide qué modelos quedan cargados dentro del presupuesto de RAM/VRAM.
+
+    Un modelo en uso (con usuarios) o fijado no se desaloja nunca; entre los
+    demás se desaloja primero el de menor prioridad y, a igual prioridad, el
+    usado hace más tiempo. Al liberar un modelo se queda caliente hasta que
+    haga falta su espacio, así que cambiar entre agentes que comparten modelo
+    no lo recarga. La carga (una llamada HTTP de hasta minutos) se hace fuera
+    del lock: su espacio queda reservado mientras tanto y quien pida el mismo
+    modelo espera a esa carga en lugar de lanzar otra. La descarga también:
+    el desalojo se decide y se anota bajo el lock (su espacio pasa a quien lo
+    pidió) y la llamada a Ollama se hace después, sin bloquear a los demás.
+    """
+
+    def __init__(self, ram_budget_gb: float, vram_budget_gb: float = 0.0,
+                 client: Optional[OllamaClient] = None, size_hints_gb: Optional[Dict[str, float]] = None):
+        self.ram_budget = ram_budget_gb * GB
+        self.vram_budget = vram_budget_gb * GB
+        self.client = client or OllamaClient()
+        self.size_hints_gb = size_hints_gb or {}
+        self.models: Dict[str, ResidentModel] = {}
+        self.lock = threading.RLock()
+
+    def _model(self, name: str) -> ResidentModel:
+        model = self.models.get(name)
+        if model is None:
+            model = self.models[name] = ResidentModel(name, int(self.size_hints_gb.get(name, DEFAULT_MODEL_GB) * GB))
+        return model
+
+    def configure(self, name: str, priority: Optional[int] = None, pinned: Optional[bool] = None):
+        with self.lock:
+            model = self._model(name)
+            if priority is not None:
+                model.priority = priority
+            if pinned is not None:
+                model.pinned = pinned
+
+    def sync(self) -> bool:
+        """Ajusta el estado a lo que Ollama tiene cargado de verdad (tamaños reales incluidos)"""
+        try:
+            running = self.client.running()
+        except Exception as e:
+            logger.warning(f"No se pudo consultar Ollama: {e}")
+            return False
+        with self.lock:
+            for name, (size, size_vram) in running.items():
+                model = self._model(name)
+                model.resident = model.unloading is None
+                model.ram_bytes, model.vram_bytes = self._split(size, size_vram)
+            for name, model in self.models.items():
+                if name not in running:
+                    model.resident = False
+        return True
+
+    def _split(self, size: int, size_vram: int) -> Tuple[int, int]:
+        # Sin presupuesto de VRAM todo cuenta como RAM
+        if self.vram_budget <= 0:
+            return size, 0
+        return size - size_vram, size_vram
+
+    def usage(self) -> Tuple[int, int]:
+        """(bytes de RAM, bytes de VRAM) ocupados por modelos residentes o cargándose"""
+        resident = [model for model in self.models.values() if model.resident or model.loading is not None]
+        return sum(model.ram_bytes for model in resident), sum(model.vram_bytes for model in resident)
+
+    def _fits(self, model: ResidentModel) -> bool:
+        ram, vram = self.usage()
+        return ram + model.ram_bytes <= self.ram_budget and vram + model.vram_bytes <= self.vram_budget
+
+    def _make_room(self, model: ResidentModel, max_priority: Optional[int] = None) -> Optional[List[ResidentModel]]:
+        """Elige y marca (con el lock) los modelos libres a desalojar para que `model` quepa.
+
+        Con `max_priority` sólo se desalojan los menos importantes. Devuelve los desalojados,
+        que quien llama descarga con _unload ya sin el lock, o None si no hay espacio suficiente.
+        """
+        ram, vram = self.usage()
+        candidates = sorted((other for other in self.models.values()
+                             if other.resident and not other.pinned and not other.users and other is not model
+                             and (max_priority is None or other.priority > max_priority)),
+                            key=lambda other: (other.priority, -other.last_used), reverse=True)
+        victims = []
+        while ram + model.ram_bytes > self.ram_budget or vram + model.vram_bytes > self.vram_budget:
+            if not candidates:
+                return None
+            victim = candidates.pop(0)
+            victims.append(victim)
+            ram, vram = ram - victim.ram_bytes, vram - victim.vram_bytes
+        for victim in victims:
+            self._evict(victim)
+        return victims
+
+    def _evict(self, model: ResidentModel):
+        """Anota el desalojo (con el lock): su espacio queda libre en la cuenta desde ya"""
+        model.resident = False
+        model.unloading = threading.Event()
+        model.evictions += 1
+
+    def _load(self, name: str) -> Optional[Tuple[float, Tuple[int, int]]]:
+        """Pide a Ollama que cargue el modelo (sin lock); (ms de carga, tamaños medidos) o None"""
+        start = time.perf_counter()
+        try:
+            self.client.load(name)
+        except Exception as e:
+            logger.error(f"Error cargando modelo {name}: {e}")
+            return None
+        load_ms = (time.perf_counter() - start) * 1000
+        try:
+            sizes = self.client.running().get(name, (0, 0))
+        except Exception:
+            sizes = (0, 0)
+        logger.info(f"🧠 Modelo {name} cargado en {load_ms:.0f} ms")
+        return load_ms, sizes
+
+    def _ensure_loaded(self, model: ResidentModel, max_priority: Optional[int] = None) -> bool:
+        """Carga `model` fuera del lock o, si otro hilo ya lo está cargando, espera a esa carga"""
+        while True:
+            with self.lock:
+                if model.resident:
+                    return True
+                unloading = model.unloading
+                if unloading is None:
+                    loading = model.loading
+                    owner = loading is None
+                    if owner:
+                        victims = self._make_room(model, max_priority)
+                        if victims is None:
+                            return False
+                        loading = model.loading = threading.Event()
+                    break
+            # Se está descargando: la carga tiene que ir después
+            unloading.wait()
+        if not owner:
+            loading.wait()
+            return model.resident
+
+        for victim in victims:
+            self._unload(victim)
+        loaded = self._load(model.name)
+        with self.lock:
+            model.loading = None
+            if loaded is not None:
+                load_ms, (size, size_vram) = loaded
+                model.load_ms.append(load_ms)
+                model.resident = True
+                if size:
+                    model.ram_bytes, model.vram_bytes = self._split(size, size_vram)
+        loading.set()
+        return loaded is not None
+
+    def _unload(self, model: ResidentModel):
+        """Pide a Ollama que descargue un modelo ya marcado con _evict (sin lock)"""
+        try:
+            self.client.unload(model.name)
+        except Exception as e:
+            logger.warning(f"No se pudo descargar el modelo {model.name}: {e}")
+        with self.lock:
+            unloading, model.unloading = model.unloading, None
+        if unloading is not None:
+            unloading.set()
+        logger.info(f"📤 Modelo {model.name} desalojado")
+
+    def acquire(self, name: str, user: str) -> bool:
+        """Asegura que el modelo está cargado para `user` (acierto si ya lo estaba)"""
+        with self.lock:
+            model = self._model(name)
+            model.users.add(user)
+            model.last_used = time.time()
+            if model.resident:
+                model.hits += 1
+                return True
+            model.misses += 1
+        if self._ensure_loaded(model):
+            return True
+        with self.lock:
+            model.users.discard(user)
+        logger.error(f"No se pudo cargar {name}: sin presupuesto (modelos residentes en uso) o Ollama no responde")
+        return False
+
+    def release(self, name: str, user: str, evict: bool = False) -> int:
+        """`user` deja de usar el modelo; queda caliente salvo `evict` y sin otros usuarios.
+
+        Devuelve los bytes liberados (0 si el modelo sigue cargado).
+        """
+        with self.lock:
+            model = self.models.get(name)
+            if model is None:
+                return 0
+            model.users.discard(user)
+            model.last_used = time.time()
+            if not (evict and model.resident and not model.users and not model.pinned):
+                return 0
+            self._evict(model)
+        self._unload(model)
+        return model.ram_bytes + model.vram_bytes
+
+    def prewarm(self, name: str, priority: Optional[int] = None) -> bool:
+        """Precarga un modelo sin usuario, desalojando sólo modelos libres menos importantes"""
+        with self.lock:
+            model = self._model(name)
+            if model.resident:
+                return True
+        if not self._ensure_loaded(model, max_priority=model.priority if priority is None else priority):
+            return False
+        with self.lock:
+            model.prewarms += 1
+            model.last_used = time.time()
+        return True
+
+    def is_resident(self, name: str) -> bool:
+        model = self.models.get(name)
+        return bool(model and model.resident)
+
+    def expected_load_seconds(self, name: str, default: float = 30.0) -> float:
+        """Tiempo de carga medido (media de las últimas cargas) o `default` si nunca se cargó"""
+        model = self.models.get(name)
+        if model is None or not model.load_ms:
+            return default
+        return sum(model.load_ms) / len(model.load_ms) / 1000
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            hits = sum(model.hits for model in self.models.values())
+            misses = sum(model.misses for model in self.models.values())
+            ram, vram = self.usage()
+            return {
+                "ram_used_gb": ram / GB,
+                "vram_used_gb": vram / GB,
+                "ram_budget_gb": self.ram_budget / GB,
+                "vram_budget_gb": self.vram_budget / GB,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "evictions": sum(model.evictions for model in self.models.values()),
+                "models": {
+                    name: {
+                        "resident": model.resident,
+                        "loading": model.loading is not None,
+                        "unloading": model.unloading is not None,
+                        "users": sorted(model.users),
+                        "priority": model.priority,
+                        "pinned": model.pinned,
+                        "hits": model.hits,
+                        "misses": model.misses,
+                        "prewarms": model.prewarms,
+                        "evictions": model.evictions,
+                        "mean_load_ms": sum(model.load_ms) / len(model.load_ms) if model.load_ms else None,
+                    }
+                    for name, model in self.models.items()
+                }
+            }
+
+
+def main():
+    """Muestra los modelos residentes según Ollama"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    ram_gb = float(sys.argv[1]) if len(sys.argv) > 1 else 12
+    manager = ModelResidencyManager(ram_gb)
+    if not manager.sync():
+        print("Ollama no responde")
+        return
+    print(json.dumps(manager.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,16 +4,22 @@
 Monitorea recursos del sistema y gestiona activación/desactivación de agentes
 """
 
+import math
 import psutil
 import time
 import json
 import logging
 import subprocess
+from collections import deque
 from datetime import datetime, timedelta
 from pathlib import Path
 import matplotlib.pyplot as plt
 import numpy as np
 
+from resource_sampler import get_shared_sampler
+from control_loop import AdaptiveControlLoop
+from metrics_store import MetricsStore
+
 # Configuración de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -27,10 +33,13 @@ logger = logging.getLogger(__name__)
 
 class ResourceMonitor:
     def __init__(self):
-        self.metrics_file = Path("metrics_history.json")
+        self.metrics_file = Path("metrics_history.json")  # formato antiguo, se migra al arrancar
+        self.store = MetricsStore(Path("metrics_history.db"))
         self.alerts_file = Path("resource_alerts.json")
-        self.history = []
+        self.history = deque(maxlen=1000)  # métricas completas recientes (procesos, red, GPU)
+        self.samples = 0
         self.alerts = []
+        self.sampler = get_shared_sampler()
         self.thresholds = {
             "cpu_critical": 90,
             "cpu_warning": 75,
@@ -43,54 +52,45 @@ class ResourceMonitor:
         }
         self.load_history()
         
+        # Serie temporal de 1 s: cada snapshot del sampler compartido va al almacén
+        self.sampler.subscribe(self.store.append_snapshot)
+        
     def load_history(self):
-        """Carga el historial de métricas"""
-        if self.metrics_file.exists():
-            try:
-                with open(self.metrics_file, 'r') as f:
-                    self.history = json.load(f)
-                logger.info(f"Historial cargado: {len(self.history)} registros")
-            except Exception as e:
-                logger.error(f"Error cargando historial: {e}")
-                self.history = []
-        else:
-            self.history = []
+        """Prepara el historial: migra el JSON antiguo si existe y muestra lo almacenado"""
+        self.store.import_json_history(self.metrics_file)
+        logger.info(f"Historial: {self.store.count('raw')} puntos de 1s, {self.store.count('1m')} de 1min, "
+                    f"{self.store.count('1h')} de 1h")
             
     def save_history(self):
-        """Guarda el historial de métricas"""
-        # Mantener solo los últimos 1000 registros
-        if len(self.history) > 1000:
-            self.history = self.history[-1000:]
-            
+        """Escribe los puntos pendientes (el almacén sólo añade, nunca reescribe)"""
         try:
-            with open(self.metrics_file, 'w') as f:
-                json.dump(self.history, f, indent=2)
+            self.store.flush()
         except Exception as e:
             logger.error(f"Error guardando historial: {e}")
+
+    def close(self):
+        """Deja de recibir snapshots y cierra el almacén (agrega también el minuto en curso)"""
+        self.sampler.unsubscribe(self.store.append_snapshot)
+        try:
+            self.store.close()
+        except Exception as e:
+            logger.error(f"Error cerrando historial: {e}")
             
     def get_cpu_metrics(self):
         """Obtiene métricas de CPU"""
-        cpu_percent = psutil.cpu_percent(interval=1)
+        snapshot = self.sampler.latest(wait=self.sampler.interval * 2)
         cpu_freq = psutil.cpu_freq()
         cpu_count = psutil.cpu_count()
         
         # Temperatura CPU (si está disponible)
-        temps = {}
-        try:
-            temperatures = psutil.sensors_temperatures()
-            if 'coretemp' in temperatures:
-                temps = {
-                    'cpu_temp': max([t.current for t in temperatures['coretemp']])
-                }
-        except:
-            temps = {'cpu_temp': 0}
+        cpu_temp = snapshot.cpu_temp if snapshot else math.nan
             
         return {
-            'cpu_percent': cpu_percent,
+            'cpu_percent': snapshot.cpu_percent if snapshot else 0,
             'cpu_freq_current': cpu_freq.current if cpu_freq else 0,
             'cpu_freq_max': cpu_freq.max if cpu_freq else 0,
             'cpu_count': cpu_count,
-            **temps
+            'cpu_temp': 0 if math.isnan(cpu_temp) else cpu_temp
         }
         
     def get_memory_metrics(self):
@@ -196,6 +196,7 @@ class ResourceMonitor:
         }
         
         self.history.append(metrics)
+        self.samples += 1
         return metrics
         
     def check_alerts(self, metrics):
@@ -362,44 +363,42 @@ class ResourceMonitor:
         
         print()
         
-    def generate_report(self):
-        """Genera un reporte de las últimas 24 horas"""
-        if len(self.history) < 10:
-            logger.warning("Historial insuficiente para generar reporte")
-            return
-            
-        # Filtrar últimas 24 horas
+    def generate_report(self, hours=24):
+        """Genera un reporte de las últimas `hours` horas con percentiles vectorizados"""
         now = datetime.now()
-        yesterday = now - timedelta(days=1)
+        since = now - timedelta(hours=hours)
         
-        recent_metrics = [
-            m for m in self.history 
-            if datetime.fromisoformat(m['timestamp']) > yesterday
-        ]
+        # 1 s de resolución dentro del último día; para periodos más largos, medias por minuto u hora
+        resolution = self.store.resolution_for(since.timestamp(), now.timestamp())
+        report_metrics = ('cpu_percent', 'ram_percent', 'swap_percent', 'gpu_percent', 'temperature')
+        data = self.store.query(report_metrics, since.timestamp(), now.timestamp(), resolution=resolution)
         
-        if not recent_metrics:
-            logger.warning("No hay métricas de las últimas 24 horas")
+        if len(data['timestamp']) < 10:
+            logger.warning("Historial insuficiente para generar reporte")
             return
             
-        # Calcular estadísticas
-        cpu_values = [m['cpu']['cpu_percent'] for m in recent_metrics]
-        ram_values = [m['memory']['ram_percent'] for m in recent_metrics]
+        # Una fila por métrica; NaN donde no hubo lectura (sin GPU, sin sensor)
+        values = np.array([data[metric] for metric in report_metrics], dtype=float)
+        present = ~np.all(np.isnan(values), axis=1)
+        values = values[present]
+        percentiles = np.nanpercentile(values, [50, 95, 99], axis=1)
+        averages, maxima, minima = np.nanmean(values, axis=1), np.nanmax(values, axis=1), np.nanmin(values, axis=1)
         
         report = {
-            'period': '24 horas',
-            'total_samples': len(recent_metrics),
-            'cpu_stats': {
-                'average': np.mean(cpu_values),
-                'max': np.max(cpu_values),
-                'min': np.min(cpu_values)
-            },
-            'ram_stats': {
-                'average': np.mean(ram_values),
-                'max': np.max(ram_values),
-                'min': np.min(ram_values)
-            },
-            'alerts_count': len([a for a in self.alerts if datetime.fromisoformat(a['timestamp']) > yesterday])
+            'period': f'{hours} horas',
+            'resolution': resolution,
+            'total_samples': len(data['timestamp']),
+            'alerts_count': len([a for a in self.alerts if datetime.fromisoformat(a['timestamp']) > since])
         }
+        for row, metric in enumerate(np.array(report_metrics)[present]):
+            report[f"{metric.split('_')[0]}_stats"] = {
+                'average': float(averages[row]),
+                'max': float(maxima[row]),
+                'min': float(minima[row]),
+                'p50': float(percentiles[0, row]),
+                'p95': float(percentiles[1, row]),
+                'p99': float(percentiles[2, row])
+            }
         
         # Guardar reporte
         report_file = Path(f"resource_report_{now.strftime('%Y%m%d_%H%M%S')}.json")
@@ -409,50 +408,72 @@ class ResourceMonitor:
         logger.info(f"Reporte generado: {report_file}")
         
         # Imprimir resumen
-        print("\n📈 REPORTE DE RECURSOS (24 HORAS)")
+        print(f"\n📈 REPORTE DE RECURSOS ({hours} HORAS)")
         print("="*50)
-        print(f"Muestras analizadas: {report['total_samples']}")
-        print(f"CPU promedio: {report['cpu_stats']['average']:.1f}% (max: {report['cpu_stats']['max']:.1f}%)")
-        print(f"RAM promedio: {report['ram_stats']['average']:.1f}% (max: {report['ram_stats']['max']:.1f}%)")
+        print(f"Muestras analizadas: {report['total_samples']} (resolución {resolution})")
+        for name, key in (('CPU', 'cpu_stats'), ('RAM', 'ram_stats'), ('Swap', 'swap_stats'),
+                          ('GPU', 'gpu_stats'), ('Temperatura', 'temperature_stats')):
+            if key in report:
+                stats = report[key]
+                print(f"{name} promedio: {stats['average']:.1f} (p95: {stats['p95']:.1f}, p99: {stats['p99']:.1f}, "
+                      f"max: {stats['max']:.1f})")
         print(f"Alertas generadas: {report['alerts_count']}")
         print("="*50)
         
+    def pressure(self, snapshot):
+        """0 … 1 según lo cerca que está el recurso más apretado de su umbral crítico"""
+        levels = [
+            snapshot.cpu_percent / self.thresholds['cpu_critical'],
+            snapshot.ram_percent / self.thresholds['ram_critical']
+        ]
+        for value, threshold in ((snapshot.gpu_percent, 'gpu_critical'), (snapshot.temperature, 'temp_critical'),
+                                 (snapshot.gpu_temp, 'temp_critical')):
+            if not math.isnan(value):
+                levels.append(value / self.thresholds[threshold])
+        return max(levels)
+        
+    def monitor_step(self):
+        """Un paso del monitoreo: métricas, alertas, estado e historial"""
+        # Recolectar métricas
+        metrics = self.collect_metrics()
+        
+        # Verificar alertas
+        alerts = self.check_alerts(metrics)
+        if alerts:
+            self.process_alerts(alerts)
+            
+        # Mostrar estado cada 10 iteraciones (5 minutos si interval=30 y todo en calma)
+        if self.samples % 10 == 0:
+            self.print_status(metrics)
+            
+        # Guardar historial cada 100 iteraciones
+        if self.samples % 100 == 0:
+            self.save_history()
+            
+        # Generar reporte diario (una vez, aunque haya varios pasos en el minuto 00:00)
+        current_time = datetime.now()
+        if current_time.hour == 0 and current_time.minute == 0 and self._last_report != current_time.date():
+            self._last_report = current_time.date()
+            self.generate_report()
+            
     def monitor_loop(self, interval=30):
-        """Loop principal de monitoreo"""
-        logger.info(f"🔄 Iniciando monitoreo cada {interval} segundos")
+        """Loop principal de monitoreo: periodo adaptativo entre 1 s y `interval` s según los umbrales"""
+        logger.info(f"🔄 Iniciando monitoreo adaptativo (cada {interval}s en calma, 1s cerca de los umbrales)")
+        self._last_report = None
+        control = AdaptiveControlLoop(self.monitor_step, self.pressure, min_interval=1,
+                                      max_interval=interval, sampler=self.sampler)
         
         try:
-            while True:
-                # Recolectar métricas
-                metrics = self.collect_metrics()
-                
-                # Verificar alertas
-                alerts = self.check_alerts(metrics)
-                if alerts:
-                    self.process_alerts(alerts)
-                    
-                # Mostrar estado cada 10 iteraciones (5 minutos si interval=30)
-                if len(self.history) % 10 == 0:
-                    self.print_status(metrics)
-                    
-                # Guardar historial cada 100 iteraciones
-                if len(self.history) % 100 == 0:
-                    self.save_history()
-                    
-                # Generar reporte diario
-                current_time = datetime.now()
-                if current_time.hour == 0 and current_time.minute == 0:
-                    self.generate_report()
-                    
-                time.sleep(interval)
+            control.run()
                 
         except KeyboardInterrupt:
             logger.info("🛑 Monitoreo detenido por el usuario")
-            self.save_history()
             
         except Exception as e:
             logger.error(f"Error en el monitoreo: {e}")
-            self.save_history()
+
+        finally:
+            self.close()
 
 def main():
     """Función principal"""
@@ -470,9 +491,9 @@ def main():
             metrics = monitor.collect_metrics()
             monitor.print_status(metrics)
         elif command == "report":
-            monitor.generate_report()
+            monitor.generate_report(int(sys.argv[2]) if len(sys.argv) > 2 else 24)
         else:
-            print("Comandos: start [intervalo], status, report")
+            print("Comandos: start [intervalo], status, report [horas]")
     else:
         print("Uso: python resource_monitor.py [start|status|report]")
 
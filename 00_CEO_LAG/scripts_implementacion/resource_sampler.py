@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+📡 RESOURCE SAMPLER VHQ_LAG - MUESTREO ÚNICO COMPARTIDO
+Un solo muestreador de recursos por máquina: mide una vez por intervalo y
+publica snapshots en un ring buffer en proceso y en un archivo mmap para el
+resto de procesos (UltraSystemManager, ResourceMonitor, CEO, IT_LAG).
+Las lecturas nunca bloquean. Sólo un proceso publica a la vez: el publicador
+tiene un cerrojo exclusivo sobre un fichero .lock junto al snapshot.
+"""
+
+import math
+import mmap
+import os
+import shutil
+import struct
+import subprocess
+import threading
+import time
+import logging
+from collections import deque
+from dataclasses import dataclass, fields, asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import psutil
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+logger = logging.getLogger(__name__)
+
+AGENTS_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_SNAPSHOT_PATH = Path(os.environ.get(
+    "VHQ_RESOURCE_SNAPSHOT", AGENTS_ROOT / "00_CEO_LAG" / "shared_resources" / "state" / "resource_snapshot.bin"))
+
+
+@dataclass
+class ResourceSnapshot:
+    """Lectura puntual de recursos del sistema"""
+    timestamp: float
+    cpu_percent: float
+    ram_percent: float
+    ram_total_gb: float
+    ram_available_gb: float
+    swap_percent: float
+    disk_free_gb: float
+    temperature: float
+    cpu_temp: float
+    gpu_percent: float
+    gpu_temp: float
+    gpu_vram_total_gb: float
+    gpu_vram_free_gb: float
+    gpu_power_w: float
+    sample_cost_ms: float
+
+    @property
+    def age_seconds(self) -> float:
+        return time.time() - self.timestamp
+
+    def to_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+
+# Layout mmap: magic, versión, secuencia (seqlock) y un double por campo
+_MAGIC = b"VHQS"
+_VERSION = 1
+_HEADER = struct.Struct("<4sIQ")
+_PAYLOAD = struct.Struct("<" + "d" * len(fields(ResourceSnapshot)))
+_FILE_SIZE = _HEADER.size + _PAYLOAD.size
+
+
+def _lock_exclusive(lock_file) -> bool:
+    """Cerrojo exclusivo no bloqueante sobre `lock_file`; False si lo tiene otro proceso"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        elif msvcrt is not None:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+class SnapshotPublisher:
+    """Escribe snapshots en un archivo mmap con protocolo seqlock.
+
+    Lanza BlockingIOError si otro proceso ya es el publicador.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock_file = open(self.path.with_name(self.path.name + ".lock"), "a+b")
+        if not _lock_exclusive(self._lock_file):
+            self._lock_file.close()
+            raise BlockingIOError(f"Otro proceso publica snapshots en {self.path}")
+        with open(self.path, "a+b") as f:
+            if os.path.getsize(self.path) < _FILE_SIZE:
+                f.truncate(_FILE_SIZE)
+        self._file = open(self.path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), _FILE_SIZE)
+        self._seq = _HEADER.unpack_from(self._map, 0)[2] & ~1
+
+    def publish(self, snapshot: ResourceSnapshot):
+        # Secuencia impar = escritura en curso; los lectores reintentan
+        self._seq += 1
+        _HEADER.pack_into(self._map, 0, _MAGIC, _VERSION, self._seq)
+        _PAYLOAD.pack_into(self._map, _HEADER.size, *(_encode(v) for v in asdict(snapshot).values()))
+        self._seq += 1
+        _HEADER.pack_into(self._map, 0, _MAGIC, _VERSION, self._seq)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+        # Cerrar el fichero libera el cerrojo y otro proceso puede tomar el relevo
+        self._lock_file.close()
+
+
+class SnapshotReader:
+    """Lee el último snapshot publicado por otro proceso sin bloquear"""
+
+    def __init__(self, path: Path = DEFAULT_SNAPSHOT_PATH):
+        self.path = Path(path)
+        self._file = None
+        self._map = None
+
+    def read(self) -> Optional[ResourceSnapshot]:
+        if self._map is None and not self._open():
+            return None
+        for _ in range(10):
+            magic, version, seq_before = _HEADER.unpack_from(self._map, 0)
+            if magic != _MAGIC or version != _VERSION or seq_before == 0:
+                return None
+            if seq_before & 1:
+                continue
+            values = _PAYLOAD.unpack_from(self._map, _HEADER.size)
+            if _HEADER.unpack_from(self._map, 0)[2] == seq_before:
+                return ResourceSnapshot(*values)
+        return None
+
+    def _open(self) -> bool:
+        try:
+            if not self.path.exists() or os.path.getsize(self.path) < _FILE_SIZE:
+                return False
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), _FILE_SIZE, access=mmap.ACCESS_READ)
+            return True
+        except (OSError, ValueError) as e:
+            logger.debug(f"Snapshot compartido no disponible: {e}")
+            return False
+
+
+class ResourceSampler:
+    """Muestreador en segundo plano con ring buffer en proceso.
+
+    Si otro proceso ya publica snapshots frescos en `publish_path`, este
+    sampler actúa como seguidor y sólo lee el mmap; si el publicador
+    desaparece, toma el relevo y empieza a medir y publicar él mismo.
+    """
+
+    def __init__(self, interval: float = 1.0, history_size: int = 300,
+                 publish_path: Optional[Path] = DEFAULT_SNAPSHOT_PATH, gpu_every: int = 5):
+        self.interval = interval
+        self.gpu_every = max(1, gpu_every)
+        self.publish_path = Path(publish_path) if publish_path else None
+        self.history = deque(maxlen=history_size)
+        self.role = "idle"
+        self._latest: Optional[ResourceSnapshot] = None
+        self._first_sample = threading.Event()
+        self._subscribers: List[Callable[[ResourceSnapshot], None]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._publisher: Optional[SnapshotPublisher] = None
+        self._reader = SnapshotReader(self.publish_path) if self.publish_path else None
+        self._gpu_cache = (math.nan,) * 5
+        self._has_nvidia_smi = shutil.which("nvidia-smi") is not None
+        self._samples = 0
+        self._reads = 0
+        self._cost_total_ms = 0.0
+        self._cost_max_ms = 0.0
+        self._cpu_seconds = 0.0
+        self._started_at = None
+
+    def start(self):
+        """Arranca el hilo de muestreo (idempotente)"""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._started_at = time.monotonic()
+        psutil.cpu_percent(interval=None)  # Cebar el contador: las lecturas siguientes son no bloqueantes
+        self._thread = threading.Thread(target=self._run, name="ResourceSampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(self.interval * 2)
+        if self._publisher:
+            self._publisher.close()
+            self._publisher = None
+
+    def subscribe(self, callback: Callable[[ResourceSnapshot], None]):
+        """Registra un callback invocado con cada nuevo snapshot"""
+        self._subscribers.append(callback)
+        if self._latest:
+            callback(self._latest)
+
+    def unsubscribe(self, callback: Callable[[ResourceSnapshot], None]):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def latest(self, wait: Optional[float] = None) -> Optional[ResourceSnapshot]:
+        """Último snapshot; sólo espera (hasta `wait` s) si todavía no hay ninguno"""
+        self._reads += 1
+        if self._latest is None and wait:
+            self._first_sample.wait(wait)
+        return self._latest
+
+    def recent(self, count: int = 60) -> List[ResourceSnapshot]:
+        """Últimos `count` snapshots del ring buffer, del más antiguo al más nuevo"""
+        return list(self.history)[-count:]
+
+    def stats(self) -> Dict[str, Any]:
+        """Coste del muestreo: tiempo por muestra y CPU consumida"""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            "role": self.role,
+            "interval_seconds": self.interval,
+            "samples": self._samples,
+            "reads": self._reads,
+            "mean_sample_ms": self._cost_total_ms / self._samples if self._samples else 0.0,
+            "max_sample_ms": self._cost_max_ms,
+            "cpu_seconds": self._cpu_seconds,
+            "cpu_overhead_percent": (self._cpu_seconds / elapsed * 100) if elapsed else 0.0
+        }
+
+    def _run(self):
+        # La primera espera da al contador de CPU un intervalo completo de referencia
+        while not self._stop.wait(self.interval):
+            try:
+                snapshot = self._follow() or self._sample()
+                self._store(snapshot)
+            except Exception as e:
+                logger.error(f"Error muestreando recursos: {e}")
+
+    def _follow(self) -> Optional[ResourceSnapshot]:
+        """Usa el snapshot de otro proceso si es fresco y no lo publicamos nosotros"""
+        if self._publisher or not self._reader:
+            return None
+        snapshot = self._reader.read()
+        if snapshot and snapshot.age_seconds < self.interval * 3:
+            self.role = "follower"
+            return snapshot
+        return None
+
+    def _sample(self) -> ResourceSnapshot:
+        started, cpu_started = time.perf_counter(), time.thread_time()
+        memory = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+        try:
+            disk_free_gb = psutil.disk_usage(os.path.abspath(os.sep)).free / (1024 ** 3)
+        except OSError:
+            disk_free_gb = math.nan
+
+        temperature = cpu_temp = math.nan
+        try:
+            temperatures = psutil.sensors_temperatures() if hasattr(psutil, "sensors_temperatures") else {}
+            readings = [t.current for sensors in temperatures.values() for t in sensors]
+            if readings:
+                temperature = max(readings)
+            if "coretemp" in temperatures:
+                cpu_temp = max(t.current for t in temperatures["coretemp"])
+        except Exception:
+            pass
+
+        if self._samples % self.gpu_every == 0:
+            self._gpu_cache = self._sample_gpu()
+
+        snapshot = ResourceSnapshot(
+            timestamp=time.time(),
+            cpu_percent=psutil.cpu_percent(interval=None),
+            ram_percent=memory.percent,
+            ram_total_gb=memory.total / (1024 ** 3),
+            ram_available_gb=memory.available / (1024 ** 3),
+            swap_percent=swap.percent,
+            disk_free_gb=disk_free_gb,
+            temperature=temperature,
+            cpu_temp=cpu_temp,
+            gpu_percent=self._gpu_cache[0],
+            gpu_temp=self._gpu_cache[1],
+            gpu_vram_total_gb=self._gpu_cache[2],
+            gpu_vram_free_gb=self._gpu_cache[3],
+            gpu_power_w=self._gpu_cache[4],
+            sample_cost_ms=0.0
+        )
+        cost_ms = (time.perf_counter() - started) * 1000
+        snapshot.sample_cost_ms = cost_ms
+        self._cost_total_ms += cost_ms
+        self._cost_max_ms = max(self._cost_max_ms, cost_ms)
+        self._cpu_seconds += time.thread_time() - cpu_started
+
+        if self.publish_path:
+            try:
+                if not self._publisher:
+                    self._publisher = SnapshotPublisher(self.publish_path)
+                self._publisher.publish(snapshot)
+                self.role = "publisher"
+            except BlockingIOError:
+                # Hay publicador pero su snapshot no es fresco: medimos en local sin pisarlo
+                self.role = "local"
+            except OSError as e:
+                logger.warning(f"No se pudo publicar snapshot compartido: {e}")
+                self.role = "local"
+        else:
+            self.role = "local"
+        return snapshot
+
+    def _sample_gpu(self):
+        if not self._has_nvidia_smi:
+            return (math.nan,) * 5
+        try:
+            result = subprocess.run([
+                'nvidia-smi', '--query-gpu=utilization.gpu,temperature.gpu,memory.total,memory.free,power.draw',
+                '--format=csv,noheader,nounits'
+            ], capture_output=True, text=True, timeout=5)
+            values = [float(v) for v in result.stdout.strip().split('\n')[0].split(', ')]
+            return (values[0], values[1], values[2] / 1024, values[3] / 1024, values[4])
+        except Exception:
+            return (math.nan,) * 5
+
+    def _store(self, snapshot: ResourceSnapshot):
+        self._samples += 1
+        self._latest = snapshot
+        self.history.append(snapshot)
+        self._first_sample.set()
+        for callback in list(self._subscribers):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logger.error(f"Error en suscriptor de recursos: {e}")
+
+
+def _encode(value) -> float:
+    return math.nan if value is None else float(value)
+
+
+_shared_sampler: Optional[ResourceSampler] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_sampler(interval: float = 1.0, publish_path: Optional[Path] = DEFAULT_SNAPSHOT_PATH) -> ResourceSampler:
+    """Sampler único del proceso, arrancado en la primera llamada"""
+    global _shared_sampler
+    with _shared_lock:
+        if _shared_sampler is None:
+            _shared_sampler = ResourceSampler(interval=interval, publish_path=publish_path).start()
+        return _shared_sampler
+
+
+def main():
+    """Ejecuta el sampler como servicio publicador"""
+    import sys
+    interval = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ("start", "read"):
+        print("Uso: python resource_sampler.py [start [intervalo] | read]")
+        return
+
+    if sys.argv[1] == "read":
+        snapshot = SnapshotReader().read()
+        print(snapshot.to_dict() if snapshot else "Sin snapshot publicado")
+        return
+
+    sampler = get_shared_sampler(interval)
+    try:
+        while True:
+            time.sleep(60)
+            logger.info(f"Coste del sampler: {sampler.stats()}")
+    except KeyboardInterrupt:
+        sampler.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+🗓️ SCHEDULE INDEX VHQ_LAG - HORARIOS COMPILADOS
+Compila una sola vez los horarios de `agent_priorities` ("12:00-14:00,18:00-20:00")
+en intervalos en minutos del día, ordenados, para consultar con bisect qué
+agentes están en horario y cuándo empieza la próxima ventana de cada uno.
+"""
+
+import bisect
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def parse_windows(schedule: str) -> List[Tuple[int, int]]:
+    """"HH:MM-HH:MM,..." -> [(inicio, fin)] en minutos del día (fin inclusivo); las que cruzan medianoche se parten"""
+    windows = []
+    for window in schedule.split(','):
+        if '-' not in window:
+            continue
+        start_str, end_str = window.strip().split('-')
+        start = datetime.strptime(start_str, "%H:%M")
+        end = datetime.strptime(end_str, "%H:%M")
+        start_minute, end_minute = start.hour * 60 + start.minute, end.hour * 60 + end.minute
+        if end_minute >= start_minute:
+            windows.append((start_minute, end_minute))
+        else:
+            windows.append((start_minute, MINUTES_PER_DAY - 1))
+            windows.append((0, end_minute))
+    return sorted(windows)
+
+
+def _minute_of_day(at: datetime) -> float:
+    return at.hour * 60 + at.minute + at.second / 60 + at.microsecond / 60e6
+
+
+class ScheduleIndex:
+    """Ventanas de todos los agentes con horario, compiladas al construirse"""
+
+    def __init__(self, agent_priorities: Dict[str, Dict[str, Any]]):
+        self.windows: Dict[str, List[Tuple[int, int]]] = {}
+        self.starts: Dict[str, List[int]] = {}
+        self.openings: Dict[str, List[int]] = {}
+        for agent_name, config in agent_priorities.items():
+            if config.get("schedule"):
+                windows = parse_windows(config["schedule"])
+                self.windows[agent_name] = windows
+                self.starts[agent_name] = [start for start, _ in windows]
+                # Una ventana que sigue desde el día anterior no "abre" a las 00:00
+                self.openings[agent_name] = [start for start, _ in windows
+                                             if not (start == 0 and windows[-1][1] == MINUTES_PER_DAY - 1)]
+        # Aperturas de todas las ventanas (minuto, agente) para buscar la próxima de cualquier agente
+        self.all_openings: List[Tuple[int, str]] = sorted(
+            (start, agent_name) for agent_name, openings in self.openings.items() for start in openings)
+
+    def _current(self, agent_name: str, minute: float) -> Optional[Tuple[int, int]]:
+        windows = self.windows.get(agent_name)
+        if not windows:
+            return None
+        position = bisect.bisect_right(self.starts[agent_name], minute) - 1
+        # Fin inclusivo ("start <= hora <= end"): 14:00:00 está dentro de 12:00-14:00, 14:00:01 no
+        if position >= 0 and minute <= windows[position][1]:
+            return windows[position]
+        return None
+
+    def is_active(self, agent_name: str, at: Optional[datetime] = None) -> bool:
+        return self._current(agent_name, _minute_of_day(at or datetime.now())) is not None
+
+    def active_agents(self, at: Optional[datetime] = None) -> List[str]:
+        return [agent_name for agent_name in self.windows if self.is_active(agent_name, at)]
+
+    def window_start(self, agent_name: str, at: Optional[datetime] = None) -> Optional[datetime]:
+        """Apertura de la ventana en curso del agente (None si está fuera de horario)"""
+        at = at or datetime.now()
+        window = self._current(agent_name, _minute_of_day(at))
+        if window is None:
+            return None
+        midnight = at.replace(hour=0, minute=0, second=0, microsecond=0)
+        windows = self.windows[agent_name]
+        if window[0] == 0 and windows[-1][1] == MINUTES_PER_DAY - 1:
+            return midnight - timedelta(days=1) + timedelta(minutes=windows[-1][0])
+        return midnight + timedelta(minutes=window[0])
+
+    def window_end(self, agent_name: str, start: datetime) -> Optional[datetime]:
+        """Cierre de la ventana que abre en `start` (al día siguiente si cruza la medianoche)"""
+        windows = self.windows.get(agent_name)
+        if not windows:
+            return None
+        minute = start.hour * 60 + start.minute
+        midnight = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        for window_start, end in windows:
+            if window_start == minute:
+                if end == MINUTES_PER_DAY - 1 and windows[0][0] == 0 and windows[0][1] != end:
+                    return midnight + timedelta(days=1, minutes=windows[0][1])
+                return midnight + timedelta(minutes=end)
+        return None
+
+    def next_start(self, agent_name: str, at: Optional[datetime] = None) -> Optional[datetime]:
+        """Próxima apertura de ventana del agente estrictamente posterior a `at`"""
+        openings = self.openings.get(agent_name)
+        if not openings:
+            return None
+        at = at or datetime.now()
+        midnight = at.replace(hour=0, minute=0, second=0, microsecond=0)
+        position = bisect.bisect_right(openings, _minute_of_day(at))
+        if position < len(openings):
+            return midnight + timedelta(minutes=openings[position])
+        return midnight + timedelta(days=1, minutes=openings[0])
+
+    def upcoming(self, at: Optional[datetime] = None, horizon: timedelta = timedelta(hours=1)) -> List[Tuple[datetime, str]]:
+        """Aperturas de ventana (fecha, agente) en (at, at + horizon], en orden"""
+        at = at or datetime.now()
+        midnight = at.replace(hour=0, minute=0, second=0, microsecond=0)
+        minute = _minute_of_day(at)
+        result = []
+        for day in range(horizon.days + 2):
+            position = bisect.bisect_right(self.all_openings, (minute, chr(0x10FFFF))) if day == 0 else 0
+            for start, agent_name in self.all_openings[position:]:
+                start_at = midnight + timedelta(days=day, minutes=start)
+                if start_at > at + horizon:
+                    return result
+                if start_at > at:
+                    result.append((start_at, agent_name))
+        return result
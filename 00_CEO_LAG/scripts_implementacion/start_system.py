@@ -14,6 +14,8 @@ import subprocess
 from datetime import datetime, time as dt_time
 from pathlib import Path
 
+from model_residency import ModelResidencyManager
+
 # Configuración de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -33,9 +35,15 @@ class VHQSystemManager:
         self.resource_limits = {
             "max_ram_gb": 28,  # Dejar 4GB para el sistema
             "max_gpu_vram_gb": 10,  # Dejar 2GB buffer
+            "max_model_ram_gb": 12,  # Modelos de Ollama residentes a la vez
             "max_cpu_percent": 85
         }
         self.load_config()
+        self.models = ModelResidencyManager(
+            ram_budget_gb=self.resource_limits["max_model_ram_gb"],
+            vram_budget_gb=self.resource_limits["max_gpu_vram_gb"],
+            size_hints_gb={name: info["ram_gb"] for name, info in self.config.get("ollama_models", {}).items()}
+        )
         
     def load_config(self):
         """Carga configuración del sistema"""
@@ -124,16 +132,16 @@ class VHQSystemManager:
             return False
             
     def start_ollama_model(self, model_name):
-        """Inicia un modelo específico en Ollama"""
-        try:
-            logger.info(f"Iniciando modelo Ollama: {model_name}")
-            subprocess.run(['ollama', 'run', model_name, '--keep-alive', '10m'], 
-                         timeout=60, check=True)
-            logger.info(f"Modelo {model_name} iniciado correctamente")
-            return True
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Error iniciando modelo {model_name}: {e}")
+        """Asegura que un modelo está cargado en Ollama (no lo recarga si ya está residente)"""
+        logger.info(f"Iniciando modelo Ollama: {model_name}")
+        self.models.sync()
+        if not self.models.acquire(model_name, "system"):
+            logger.error(f"Error iniciando modelo {model_name}")
             return False
+        # Queda caliente sin usuario: los agentes lo adquieren y se puede desalojar si hace falta su espacio
+        self.models.release(model_name, "system")
+        logger.info(f"Modelo {model_name} iniciado correctamente")
+        return True
             
     def is_in_schedule(self, agent_name, schedule_str):
         """Verifica si un agente debe estar activo según su horario"""
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+💾 STATE STORE VHQ_LAG - ESTADO TRANSACCIONAL
+Almacén SQLite (WAL) para el estado del sistema y de los agentes: una fila
+por campo, actualizaciones a nivel de fila y commits seguros ante caídas.
+Sustituye la reescritura completa de agent_state_buffer.json.
+También hace de buzón de órdenes: los comandos de la CLI se encolan aquí y
+los ejecuta el monitor en marcha, que es el dueño de los procesos de los agentes.
+"""
+
+import json
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS system (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS agent_fields (
+    agent_name TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (agent_name, field)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS agent_checkpoints (
+    agent_name TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    saved_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS commands (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    command TEXT NOT NULL,
+    args TEXT NOT NULL,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    result TEXT
+);
+"""
+
+
+class TrackedState(dict):
+    """Dict de estado de un agente que anota qué campos cambian.
+
+    Las asignaciones directas (`state["status"] = ...`) se registran en
+    `pending`, así que guardar sólo escribe los campos modificados. Las
+    mutaciones in situ de valores anidados (p.ej. `.append`) requieren
+    reasignar el campo para persistirse.
+    """
+
+    def __init__(self, agent_name: str, data: Dict[str, Any], pending: Dict[str, Set[str]]):
+        super().__init__(data)
+        self.agent_name = agent_name
+        self._pending = pending
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._pending.setdefault(self.agent_name, set()).add(key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+
+class StateStore:
+    """Estado del sistema en SQLite WAL con actualizaciones por campo"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self.pending: Dict[str, Set[str]] = {}
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    @contextmanager
+    def transaction(self):
+        """Agrupa varias escrituras en un único commit atómico (anidable)"""
+        with self._lock:
+            if self._depth == 0:
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield
+            except Exception:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                self._conn.execute("COMMIT")
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM agent_fields LIMIT 1").fetchone() is None
+
+    def get_system(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM system WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_system(self, **values):
+        """Actualiza claves del estado global (modo, agente activo...)"""
+        with self.transaction():
+            self._conn.executemany(
+                "INSERT INTO system (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                [(key, json.dumps(value)) for key, value in values.items()])
+
+    def update_agent(self, agent_name: str, **fields):
+        """Upsert de los campos indicados de un agente; coste independiente del resto del estado"""
+        with self.transaction():
+            self._conn.executemany(
+                "INSERT INTO agent_fields (agent_name, field, value) VALUES (?, ?, ?) "
+                "ON CONFLICT(agent_name, field) DO UPDATE SET value = excluded.value",
+                [(agent_name, field, json.dumps(value)) for field, value in fields.items()])
+
+    def load_agents(self) -> Dict[str, TrackedState]:
+        """Estado de todos los agentes como dicts con seguimiento de cambios"""
+        agents: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for agent_name, field, value in self._conn.execute(
+                    "SELECT agent_name, field, value FROM agent_fields ORDER BY agent_name"):
+                agents.setdefault(agent_name, {})[field] = json.loads(value)
+        return {name: self.track(name, data) for name, data in agents.items()}
+
+    def track(self, agent_name: str, data: Dict[str, Any], dirty: bool = False) -> TrackedState:
+        """Envuelve el estado de un agente; con `dirty` todos sus campos quedan pendientes de guardar"""
+        if dirty:
+            self.pending.setdefault(agent_name, set()).update(data)
+        return TrackedState(agent_name, data, self.pending)
+
+    def flush(self, agents_state: Dict[str, Dict[str, Any]], **system):
+        """Escribe sólo los campos modificados desde el último flush, en una transacción"""
+        with self.transaction():
+            if system:
+                self.set_system(**system)
+            pending, self.pending = self.pending, {}
+            for agent_name, fields in pending.items():
+                state = agents_state.get(agent_name)
+                if state is not None:
+                    self.update_agent(agent_name, **{field: state[field] for field in fields if field in state})
+            for state in agents_state.values():
+                if isinstance(state, TrackedState):
+                    state._pending = self.pending
+
+    def save_checkpoint(self, agent_name: str, checkpoint: Dict[str, Any]):
+        with self.transaction():
+            self._conn.execute(
+                "INSERT INTO agent_checkpoints (agent_name, data) VALUES (?, ?) "
+                "ON CONFLICT(agent_name) DO UPDATE SET data = excluded.data, saved_at = CURRENT_TIMESTAMP",
+                (agent_name, json.dumps(checkpoint)))
+
+    def load_checkpoint(self, agent_name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM agent_checkpoints WHERE agent_name = ?", (agent_name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def enqueue_command(self, command: str, *args) -> int:
+        """Encola una orden para el monitor en marcha; devuelve su id"""
+        with self.transaction():
+            return self._conn.execute("INSERT INTO commands (command, args) VALUES (?, ?)",
+                                      (command, json.dumps(args))).lastrowid
+
+    def has_pending_commands(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM commands WHERE result IS NULL LIMIT 1").fetchone() is not None
+
+    def pending_commands(self) -> List[Tuple[int, str, List[Any]]]:
+        """Órdenes sin resultado, en orden de llegada: (id, comando, argumentos)"""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, command, args FROM commands WHERE result IS NULL ORDER BY id").fetchall()
+        return [(command_id, command, json.loads(args)) for command_id, command, args in rows]
+
+    def finish_command(self, command_id: int, result: Dict[str, Any]):
+        with self.transaction():
+            self._conn.execute("UPDATE commands SET result = ? WHERE id = ?", (json.dumps(result), command_id))
+            # La CLI lee el resultado al momento; pasado un día ya nadie lo espera
+            self._conn.execute("DELETE FROM commands WHERE result IS NOT NULL AND created_at < datetime('now', '-1 day')")
+
+    def command_result(self, command_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM commands WHERE id = ?", (command_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    def import_json_buffer(self, json_path: Path) -> bool:
+        """Migra un agent_state_buffer.json antiguo (y sus checkpoint_*.json) al almacén"""
+        json_path = Path(json_path)
+        if not json_path.exists() or not self.is_empty():
+            return False
+        try:
+            with open(json_path, 'r') as f:
+                data = json.load(f)
+            with self.transaction():
+                self.set_system(system_mode=data.get('system_mode', 'normal'),
+                                active_agent=data.get('active_agent'))
+                for agent_name, fields in data.get('agents_state', {}).items():
+                    self.update_agent(agent_name, **fields)
+                    checkpoint_file = json_path.parent / f"checkpoint_{agent_name}.json"
+                    if checkpoint_file.exists():
+                        with open(checkpoint_file, 'r') as f:
+                            self.save_checkpoint(agent_name, json.load(f))
+            logger.info(f"📦 Estado migrado desde {json_path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error migrando {json_path}: {e}")
+            return False
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -7,16 +7,25 @@ Fecha: 27 de Junio 2025
 
 import os
 import sys
+import math
 import time
-import json
 import psutil
 import logging
 import subprocess
+from collections import deque
 from datetime import datetime, timedelta
 from pathlib import Path
 from threading import Lock
 from enum import Enum
 
+from resource_sampler import get_shared_sampler
+from state_store import StateStore
+from agent_supervisor import AgentSupervisor
+from model_residency import ModelResidencyManager
+from schedule_index import ScheduleIndex
+from control_loop import AdaptiveControlLoop, read_psi
+from admission_control import AdmissionController, CgroupManager, GB
+
 # Configuración de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -28,6 +37,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+STATE_FILE = Path("shared_resources/state/agent_state.db")
+
+# Órdenes que cambian procesos de agentes: sólo las ejecuta el monitor en marcha (`start`),
+# que es quien los supervisa; la CLI las encola en el almacén de estado
+FORWARDED_COMMANDS = ("critical", "manual", "emergency", "exit_critical", "shutdown")
+COMMAND_TIMEOUT_SECONDS = 600
+
 class SystemMode(Enum):
     NORMAL = "normal"
     CRITICAL = "critical"
@@ -43,8 +59,10 @@ class AgentStatus(Enum):
 
 class UltraSystemManager:
     def __init__(self):
-        self.state_file = Path("shared_resources/state/agent_state_buffer.json")
+        self.state_file = STATE_FILE
+        self.legacy_state_file = Path("shared_resources/state/agent_state_buffer.json")
         self.state_lock = Lock()
+        self.sampler = get_shared_sampler()
         self.system_mode = SystemMode.NORMAL
         self.active_agent = None
         self.agents_state = {}
@@ -54,7 +72,30 @@ class UltraSystemManager:
             "max_cpu_percent": 60,
             "critical_cpu_percent": 85,
             "max_temp": 80,
-            "min_disk_gb": 10
+            "min_disk_gb": 10,
+            "critical_memory_stall_percent": 10,  # PSI "full avg10": % del tiempo con todo parado esperando memoria
+            "max_memory_stall_percent": 5,  # PSI "some avg10" por encima del cual no se admiten activaciones
+            "ram_reserve_gb": 1  # RAM que ninguna activación puede consumir (margen antes de swap)
+        }
+        self.control = None
+        
+        # Presupuesto para modelos de Ollama residentes (tamaños estimados hasta medirlos)
+        self.model_budget = {
+            "ram_gb": 12,
+            "vram_gb": 10,
+            "size_hints_gb": {
+                "llama3.1:8b": 6,
+                "llama3.1:7b-instruct-q4_0": 5,
+                "codellama:7b-instruct-q4_0": 5
+            }
+        }
+        
+        # Precalentamiento antes de cada ventana: la antelación es la carga medida del
+        # modelo + el arranque del proceso + un margen, con un máximo
+        self.prewarm_policy = {
+            "margin_seconds": 60,
+            "process_warmup_seconds": 20,
+            "max_lead_minutes": 15
         }
         
         # Configuración de agentes y prioridades
@@ -139,22 +180,56 @@ class UltraSystemManager:
             }
         }
         
+        # Horarios compilados una sola vez en intervalos consultables con bisect
+        self.schedule = ScheduleIndex(self.agent_priorities)
+        self.prewarmed_windows = {}  # agente -> apertura de la ventana ya precalentada
+        self.prewarmed_processes = {}  # agente -> cierre de la ventana para la que se arrancó congelado
+        self.window_starts = deque(maxlen=50)  # tiempo hasta la primera tarea de cada ventana
+        
         self.ensure_state_directory()
+        self.store = StateStore(self.state_file)
         self.load_state()
         
+        # Modelos de Ollama residentes: el más importante de sus agentes fija la prioridad,
+        # y el del CEO (siempre activo) no se desaloja nunca
+        self.models = ModelResidencyManager(
+            ram_budget_gb=self.model_budget["ram_gb"],
+            vram_budget_gb=self.model_budget["vram_gb"],
+            size_hints_gb=self.model_budget["size_hints_gb"]
+        )
+        for model in {config["model"] for config in self.agent_priorities.values()}:
+            users = [config for config in self.agent_priorities.values() if config["model"] == model]
+            self.models.configure(model, priority=min(config["priority"] for config in users),
+                                  pinned=any(config.get("always_active") for config in users))
+        
+        # Admisión por memoria: con cgroups v2 cada agente tiene memory.max = ram_gb y sin swap
+        self.cgroups = CgroupManager()
+        self.admission = AdmissionController(
+            self.cgroups,
+            reserve_gb=self.resource_limits["ram_reserve_gb"],
+            max_stall_percent=self.resource_limits["max_memory_stall_percent"]
+        )
+        
+        # Cada agente (salvo el CEO, que es este proceso) corre como proceso hijo supervisado
+        self.supervisor = AgentSupervisor(models=self.models, cgroups=self.cgroups)
+        for agent_name, agent_config in self.agent_priorities.items():
+            if agent_name != "00_CEO_LAG":
+                self.supervisor.register(agent_name, model=agent_config.get("model"))
+                self.cgroups.configure(agent_name, agent_config["ram_gb"])
+        
     def ensure_state_directory(self):
         """Asegura que existe el directorio de estado"""
         self.state_file.parent.mkdir(parents=True, exist_ok=True)
         
     def load_state(self):
-        """Carga el estado del sistema desde archivo"""
-        if self.state_file.exists():
+        """Carga el estado del sistema desde el almacén transaccional"""
+        self.store.import_json_buffer(self.legacy_state_file)
+        if not self.store.is_empty():
             try:
-                with open(self.state_file, 'r') as f:
-                    data = json.load(f)
-                    self.system_mode = SystemMode(data.get('system_mode', 'normal'))
-                    self.active_agent = data.get('active_agent')
-                    self.agents_state = data.get('agents_state', {})
+                self.system_mode = SystemMode(self.store.get_system('system_mode', 'normal'))
+                self.active_agent = self.store.get_system('active_agent')
+                self.agents_state = self.store.load_agents()
+                self._saved_system = (self.system_mode, self.active_agent)
                     
                 logger.info(f"Estado cargado: modo {self.system_mode.value}, agente activo: {self.active_agent}")
             except Exception as e:
@@ -169,8 +244,10 @@ class UltraSystemManager:
         self.active_agent = "00_CEO_LAG"  # CEO siempre activo por defecto
         self.agents_state = {}
         
+        self._saved_system = None
+        
         for agent_name in self.agent_priorities.keys():
-            self.agents_state[agent_name] = {
+            self.agents_state[agent_name] = self.store.track(agent_name, {
                 "status": AgentStatus.HIBERNATED.value,
                 "current_task": None,
                 "progress": "0%",
@@ -180,7 +257,7 @@ class UltraSystemManager:
                 "priority_queue": [],
                 "start_time": None,
                 "last_activity": None
-            }
+            }, dirty=True)
             
         # CEO siempre activo en modo minimal
         self.agents_state["00_CEO_LAG"]["status"] = AgentStatus.ACTIVE.value
@@ -189,50 +266,65 @@ class UltraSystemManager:
         self.save_state()
         
     def save_state(self):
-        """Guarda el estado actual del sistema"""
+        """Guarda sólo los campos modificados desde el último guardado, en una transacción"""
         with self.state_lock:
             try:
-                state_data = {
-                    "timestamp": datetime.now().isoformat(),
-                    "system_mode": self.system_mode.value,
-                    "active_agent": self.active_agent,
-                    "agents_state": self.agents_state
-                }
-                
-                with open(self.state_file, 'w') as f:
-                    json.dump(state_data, f, indent=2)
+                system = {}
+                if self._saved_system != (self.system_mode, self.active_agent):
+                    system = {"system_mode": self.system_mode.value, "active_agent": self.active_agent}
+                if system or self.store.pending:
+                    self.store.flush(self.agents_state, **system)
+                    self._saved_system = (self.system_mode, self.active_agent)
                     
             except Exception as e:
                 logger.error(f"Error guardando estado: {e}")
                 
     def get_system_resources(self):
-        """Obtiene recursos actuales del sistema"""
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
-        
-        # Temperatura (si está disponible)
-        temp = 0
-        try:
-            temperatures = psutil.sensors_temperatures()
-            if temperatures:
-                temp = max([t.current for sensors in temperatures.values() for t in sensors])
-        except:
-            pass
+        """Obtiene recursos actuales del sistema (último snapshot del sampler compartido)"""
+        snapshot = self.sampler.latest(wait=self.sampler.interval * 2)
+        if snapshot is None:
+            logger.warning("⚠️ Sampler sin datos todavía, usando valores neutros")
+            return {"cpu_percent": 0, "ram_percent": 0, "ram_available_gb": 0, "disk_free_gb": 0, "temperature": 0}
             
         return {
-            "cpu_percent": cpu_percent,
-            "ram_percent": memory.percent,
-            "ram_available_gb": memory.available / (1024**3),
-            "disk_free_gb": disk.free / (1024**3),
-            "temperature": temp
+            "cpu_percent": snapshot.cpu_percent,
+            "ram_percent": snapshot.ram_percent,
+            "ram_available_gb": snapshot.ram_available_gb,
+            "disk_free_gb": snapshot.disk_free_gb,
+            "temperature": 0 if math.isnan(snapshot.temperature) else snapshot.temperature
         }
         
+    def memory_stall_percent(self):
+        """% del tiempo (últimos 10 s) con todas las tareas paradas esperando memoria; 0 sin PSI"""
+        pressure = read_psi("memory")
+        return pressure["full"]["avg10"] if pressure and "full" in pressure else 0.0
+        
+    def resource_pressure(self, snapshot):
+        """0 … 1 según lo cerca que está el recurso más apretado de su límite crítico"""
+        recent = self.sampler.recent(10)
+        cpu_percent = sum(s.cpu_percent for s in recent) / len(recent) if recent else snapshot.cpu_percent
+        levels = [
+            snapshot.ram_percent / self.resource_limits["critical_ram_percent"],
+            cpu_percent / self.resource_limits["critical_cpu_percent"],
+            self.memory_stall_percent() / self.resource_limits["critical_memory_stall_percent"]
+        ]
+        if not math.isnan(snapshot.temperature):
+            levels.append(snapshot.temperature / self.resource_limits["max_temp"])
+        if snapshot.disk_free_gb > 0:
+            levels.append(self.resource_limits["min_disk_gb"] / snapshot.disk_free_gb)
+        return max(levels)
+        
     def check_emergency_conditions(self):
         """Verifica condiciones de emergencia"""
         resources = self.get_system_resources()
         emergency_reasons = []
         
+        # La CPU se promedia sobre los últimos 10 s: ahora se evalúa cada segundo cerca
+        # del límite y un pico aislado no debe vaciar el sistema
+        recent = self.sampler.recent(10)
+        if recent:
+            resources["cpu_percent"] = sum(s.cpu_percent for s in recent) / len(recent)
+        
         if resources["ram_percent"] > self.resource_limits["critical_ram_percent"]:
             emergency_reasons.append(f"RAM crítica: {resources['ram_percent']:.1f}%")
             
@@ -245,6 +337,10 @@ class UltraSystemManager:
         if resources["disk_free_gb"] < self.resource_limits["min_disk_gb"]:
             emergency_reasons.append(f"Disco crítico: {resources['disk_free_gb']:.1f}GB libres")
             
+        memory_stall = self.memory_stall_percent()
+        if memory_stall > self.resource_limits["critical_memory_stall_percent"]:
+            emergency_reasons.append(f"Presión de memoria crítica: {memory_stall:.1f}% del tiempo bloqueado")
+            
         return emergency_reasons
         
     def enter_emergency_mode(self, reasons):
@@ -286,6 +382,10 @@ class UltraSystemManager:
         self.agents_state[agent_name]["status"] = AgentStatus.CRITICAL_ACTIVE.value
         self.agents_state[agent_name]["current_task"] = task_name
         self.agents_state[agent_name]["start_time"] = datetime.now().isoformat()
+        if agent_name != "00_CEO_LAG":
+            # Si aún no cabe (la memoria de los pausados tarda en liberarse) queda en cola
+            if self.admit_agent(agent_name):
+                self.supervisor.resume(agent_name, self.store.load_checkpoint(agent_name))
         
         self.save_state()
         logger.warning(f"Sistema en MODO CRÍTICO - solo {agent_name} activo")
@@ -296,6 +396,8 @@ class UltraSystemManager:
         
         if self.active_agent:
             self.agents_state[self.active_agent]["status"] = AgentStatus.HIBERNATED.value
+            if self.active_agent != "00_CEO_LAG":
+                self.supervisor.hibernate(self.active_agent, mode="exit")
             
         self.system_mode = SystemMode.NORMAL
         self.active_agent = "00_CEO_LAG"  # Volver al CEO
@@ -328,20 +430,27 @@ class UltraSystemManager:
             "pause_reason": "emergency" if emergency else "critical_mode" if critical_mode else "scheduled"
         }
         
-        # Guardar checkpoint
-        checkpoint_file = Path(f"shared_resources/state/checkpoint_{agent_name}.json")
-        try:
-            with open(checkpoint_file, 'w') as f:
-                json.dump(checkpoint, f, indent=2)
-        except Exception as e:
-            logger.error(f"Error guardando checkpoint para {agent_name}: {e}")
-            
-        # Actualizar estado
+        # Guardar checkpoint y estado en la misma transacción: tras una caída
+        # nunca queda un agente pausado sin checkpoint (ni al revés)
         agent_state["status"] = AgentStatus.PAUSED.value
-        agent_state["last_checkpoint"] = checkpoint_file.name
+        agent_state["last_checkpoint"] = checkpoint["pause_time"]
         agent_state["last_activity"] = datetime.now().isoformat()
-        
-        # Simular liberación de recursos (aquí iría la lógica real)
+        with self.state_lock:
+            try:
+                with self.store.transaction():
+                    self.store.save_checkpoint(agent_name, checkpoint)
+                    self.store.update_agent(agent_name, status=agent_state["status"],
+                                            last_checkpoint=agent_state["last_checkpoint"],
+                                            last_activity=agent_state["last_activity"])
+            except Exception as e:
+                logger.error(f"Error guardando checkpoint para {agent_name}: {e}")
+        
+        # Liberar recursos de verdad: en emergencia o modo crítico el proceso termina
+        # (libera toda su RAM); en una pausa programada se congela para reanudar rápido
+        hibernation = self.supervisor.hibernate(
+            agent_name, mode="exit" if emergency or critical_mode else "suspend")
+        if hibernation:
+            agent_state["last_hibernation"] = hibernation
         logger.info(f"✅ Agente {agent_name} pausado y recursos liberados")
         
         return True
@@ -357,44 +466,76 @@ class UltraSystemManager:
             logger.warning(f"Agente {agent_name} no está pausado/hibernado")
             return False
             
-        # Verificar recursos disponibles
-        resources = self.get_system_resources()
-        agent_config = self.agent_priorities[agent_name]
-        
-        if resources["ram_available_gb"] < agent_config["ram_gb"]:
-            logger.error(f"RAM insuficiente para reanudar {agent_name}")
+        # Verificar que cabe sin empujar el sistema a swap; si no, queda en cola
+        if agent_name != "00_CEO_LAG" and not self.admit_agent(agent_name):
             return False
             
         logger.info(f"▶️  Reanudando agente {agent_name}")
         
         # Cargar checkpoint si existe
-        checkpoint_file = Path(f"shared_resources/state/checkpoint_{agent_name}.json")
-        if checkpoint_file.exists():
-            try:
-                with open(checkpoint_file, 'r') as f:
-                    checkpoint = json.load(f)
-                    
-                agent_state["current_task"] = checkpoint.get("current_task")
-                agent_state["progress"] = checkpoint.get("progress", "0%")
-                agent_state["next_action"] = checkpoint.get("next_action")
-                agent_state["priority_queue"] = checkpoint.get("priority_queue", [])
-                
-                logger.info(f"Checkpoint cargado para {agent_name}: {agent_state['progress']} completado")
-                
-            except Exception as e:
-                logger.error(f"Error cargando checkpoint para {agent_name}: {e}")
+        try:
+            checkpoint = self.store.load_checkpoint(agent_name)
+        except Exception as e:
+            checkpoint = None
+            logger.error(f"Error cargando checkpoint para {agent_name}: {e}")
+        if checkpoint:
+            agent_state["current_task"] = checkpoint.get("current_task")
+            agent_state["progress"] = checkpoint.get("progress", "0%")
+            agent_state["next_action"] = checkpoint.get("next_action")
+            agent_state["priority_queue"] = checkpoint.get("priority_queue", [])
+            
+            logger.info(f"Checkpoint cargado para {agent_name}: {agent_state['progress']} completado")
                 
+        # Descongelar o relanzar el proceso del agente desde su checkpoint
+        if agent_name != "00_CEO_LAG":
+            resumed = self.supervisor.resume(agent_name, checkpoint)
+            if resumed is None:
+                logger.error(f"No se pudo arrancar el proceso de {agent_name}")
+                return False
+            agent_state["last_resume"] = resumed
+            self.prewarmed_processes.pop(agent_name, None)
+            
         # Activar agente
         agent_state["status"] = AgentStatus.ACTIVE.value
         agent_state["start_time"] = datetime.now().isoformat()
         
-        # Simular inicio del agente (aquí iría la lógica real)
         logger.info(f"✅ Agente {agent_name} reanudado correctamente")
         
         return True
         
-    def is_agent_in_schedule(self, agent_name):
-        """Verifica si un agente debe estar activo según su horario"""
+    def admit_agent(self, agent_name):
+        """Pide admisión para activar el agente (la memoria de su proceso congelado ya cuenta)"""
+        queued = agent_name in self.admission.queue
+        decision = self.admission.request(agent_name, self.agent_priorities[agent_name]["ram_gb"],
+                                          charged_gb=self.supervisor.memory_bytes(agent_name) / GB)
+        if not decision.admitted and not queued:
+            logger.warning(f"⏳ Activación de {agent_name} en cola: {decision.reason}")
+        elif decision.admitted and queued:
+            logger.info(f"🚦 {agent_name} sale de la cola de admisión")
+        return decision.admitted
+        
+    def retry_admissions(self):
+        """Reintenta las activaciones en cola que siguen haciendo falta"""
+        for agent_name in self.admission.pending():
+            status = self.agents_state[agent_name]["status"]
+            agent_config = self.agent_priorities[agent_name]
+            if status == AgentStatus.CRITICAL_ACTIVE.value:
+                if self.supervisor.is_running(agent_name) and not self.supervisor.is_suspended(agent_name):
+                    self.admission.drop(agent_name)
+                elif self.admit_agent(agent_name):
+                    self.supervisor.resume(agent_name, self.store.load_checkpoint(agent_name))
+            elif status not in [AgentStatus.PAUSED.value, AgentStatus.HIBERNATED.value] or \
+                    self.system_mode == SystemMode.CRITICAL or \
+                    (agent_config.get("schedule") and not self.is_agent_in_schedule(agent_name)):
+                self.admission.drop(agent_name)  # Ya activo, desplazado por una tarea crítica o fuera de horario
+            elif len(self.active_agent_names()) >= 2:
+                # Solo CEO + 1 agente: el hueco ya es de otro; el horario lo volverá a pedir cuando quede libre
+                self.admission.drop(agent_name)
+            else:
+                self.activate_scheduled_agent(agent_name)
+                
+    def is_agent_in_schedule(self, agent_name, at=None):
+        """Verifica si un agente debe estar activo según su horario (ahora o en `at`)"""
         agent_config = self.agent_priorities.get(agent_name, {})
         
         if agent_config.get("always_active"):
@@ -403,51 +544,127 @@ class UltraSystemManager:
         if agent_config.get("manual_only"):
             return False
             
-        schedule = agent_config.get("schedule")
-        if not schedule:
-            return False
-            
-        current_time = datetime.now().time()
-        schedules = schedule.split(',')
-        
-        for sched in schedules:
-            if '-' in sched:
-                start_str, end_str = sched.split('-')
-                start_time = datetime.strptime(start_str, "%H:%M").time()
-                end_time = datetime.strptime(end_str, "%H:%M").time()
+        return self.schedule.is_active(agent_name, at)
+        
+    def prewarm_lead_seconds(self, agent_name):
+        """Antelación con la que precalentar un agente según lo que tardó en cargar su modelo"""
+        lead = self.prewarm_policy["margin_seconds"]
+        model = self.agent_priorities[agent_name].get("model")
+        if model and not self.models.is_resident(model):
+            lead += self.models.expected_load_seconds(model)
+        if not self.supervisor.is_running(agent_name):
+            lead += self.prewarm_policy["process_warmup_seconds"]
+        return min(lead, self.prewarm_policy["max_lead_minutes"] * 60)
+        
+    def prewarm_scheduled_agents(self, now=None):
+        """Carga el modelo y arranca (congelado) el proceso de los agentes cuya ventana está por abrir"""
+        now = now or datetime.now()
+        horizon = timedelta(minutes=self.prewarm_policy["max_lead_minutes"])
+        for window_start, agent_name in self.schedule.upcoming(now, horizon):
+            if self.prewarmed_windows.get(agent_name) == window_start:
+                continue
+            if (window_start - now).total_seconds() > self.prewarm_lead_seconds(agent_name):
+                continue
+            agent_config = self.agent_priorities[agent_name]
+            self.prewarmed_windows[agent_name] = window_start
+            logger.info(f"🌡️  Precalentando {agent_name} para su ventana de las {window_start.strftime('%H:%M')}")
+            
+            if agent_config.get("model"):
+                self.models.prewarm(agent_config["model"])
                 
-                if start_time <= current_time <= end_time:
-                    return True
+            # El proceso sólo se adelanta si cabe junto al agente que sigue activo
+            if (self.agents_state[agent_name]["status"] != AgentStatus.ACTIVE.value and
+                    self.admission.evaluate(agent_name, agent_config["ram_gb"]).admitted):
+                try:
+                    checkpoint = self.store.load_checkpoint(agent_name)
+                except Exception as e:
+                    checkpoint = None
+                    logger.error(f"Error cargando checkpoint para {agent_name}: {e}")
+                launched = not self.supervisor.is_running(agent_name)
+                if self.supervisor.prewarm(agent_name, checkpoint,
+                                           warmup_seconds=self.prewarm_policy["process_warmup_seconds"]) and launched:
+                    self.prewarmed_processes[agent_name] = self.schedule.window_end(agent_name, window_start)
                     
-        return False
-        
+    def stop_unused_prewarms(self, now=None):
+        """Para los procesos precalentados cuya ventana se cerró sin que llegaran a activarse"""
+        now = now or datetime.now()
+        for agent_name, window_end in list(self.prewarmed_processes.items()):
+            if window_end is not None and now < window_end:
+                continue
+            del self.prewarmed_processes[agent_name]
+            if self.agents_state[agent_name]["status"] in [AgentStatus.ACTIVE.value, AgentStatus.CRITICAL_ACTIVE.value]:
+                continue
+            if self.supervisor.is_running(agent_name):
+                logger.info(f"🧊 {agent_name} no llegó a activarse en su ventana: se para su proceso precalentado")
+                self.supervisor.stop(agent_name)
+                
+    def seconds_until_next_schedule_event(self, now=None):
+        """Segundos hasta la próxima apertura de ventana, precalentamiento o cierre de una ventana precalentada"""
+        now = now or datetime.now()
+        horizon = timedelta(minutes=self.prewarm_policy["max_lead_minutes"])
+        events = [(window_end - now).total_seconds()
+                  for window_end in self.prewarmed_processes.values() if window_end is not None]
+        # En crítico/emergencia no se precalienta ni se activa nada: esos eventos no se atenderían
+        # y su plazo vencido despertaría el bucle sin parar
+        if self.system_mode not in [SystemMode.CRITICAL, SystemMode.EMERGENCY]:
+            for window_start, agent_name in self.schedule.upcoming(now, horizon):
+                until_start = (window_start - now).total_seconds()
+                events.append(until_start)
+                if self.prewarmed_windows.get(agent_name) != window_start:
+                    events.append(until_start - self.prewarm_lead_seconds(agent_name))
+        return max(min(events), 0) if events else None
+        
+    def record_window_start(self, agent_name, model_warm):
+        """Registra cuánto tardó el agente en estar listo desde que abrió su ventana"""
+        window_start = self.schedule.window_start(agent_name)
+        if window_start is None:
+            return
+        agent_state = self.agents_state[agent_name]
+        report = {
+            "window_start": window_start.isoformat(),
+            "time_to_first_task_s": round((datetime.now() - window_start).total_seconds(), 2),
+            "model_warm": model_warm,
+            "resume_mode": agent_state.get("last_resume", {}).get("mode"),
+            "prewarmed": self.prewarmed_windows.get(agent_name) == window_start
+        }
+        agent_state["last_window_start"] = report
+        self.window_starts.append(dict(report, agent_name=agent_name))
+        logger.info(f"⏱️  {agent_name} listo {report['time_to_first_task_s']:.1f}s después de abrir su ventana "
+                    f"(modelo {'caliente' if model_warm else 'frío'}, reanudado: {report['resume_mode']})")
+                
     def check_and_activate_scheduled_agents(self):
         """Verifica y activa agentes según su horario"""
         if self.system_mode in [SystemMode.CRITICAL, SystemMode.EMERGENCY]:
             return  # No activar nada en modo crítico/emergencia
             
-        current_active = [name for name, state in self.agents_state.items() 
-                         if state["status"] == AgentStatus.ACTIVE.value]
-        
         # Solo CEO + 1 agente máximo en modo normal
-        if len(current_active) >= 2:
+        if len(self.active_agent_names()) >= 2:
             return
             
         for agent_name, agent_config in self.agent_priorities.items():
             if agent_config["priority"] == 3:  # Solo agentes de operación normal
                 if (self.is_agent_in_schedule(agent_name) and 
                     self.agents_state[agent_name]["status"] != AgentStatus.ACTIVE.value):
-                    
-                    # Pausar otros agentes de prioridad 3 primero
-                    for other_name in self.agents_state.keys():
-                        if (other_name != agent_name and other_name != "00_CEO_LAG" and
-                            self.agents_state[other_name]["status"] == AgentStatus.ACTIVE.value):
-                            self.pause_agent(other_name)
-                            
-                    # Activar el agente programado
-                    if self.resume_agent(agent_name):
+                    if self.activate_scheduled_agent(agent_name):
                         break  # Solo uno por vez
                         
+    def active_agent_names(self):
+        return [name for name, state in self.agents_state.items()
+                if state["status"] == AgentStatus.ACTIVE.value]
+        
+    def activate_scheduled_agent(self, agent_name):
+        """Activa un agente como el único junto al CEO: pausa los demás y lo reanuda"""
+        for other_name in self.agents_state.keys():
+            if (other_name != agent_name and other_name != "00_CEO_LAG" and
+                self.agents_state[other_name]["status"] == AgentStatus.ACTIVE.value):
+                self.pause_agent(other_name)
+                
+        model_warm = self.models.is_resident(self.agent_priorities[agent_name].get("model"))
+        if self.resume_agent(agent_name):
+            self.record_window_start(agent_name, model_warm)
+            return True
+        return False
+                        
     def request_critical_task(self, agent_name, task_name):
         """Solicita ejecución de una tarea crítica"""
         if agent_name not in self.agent_priorities:
@@ -512,6 +729,39 @@ class UltraSystemManager:
             print(f"   Temperatura: {resources['temperature']:.1f}°C {'🔴' if resources['temperature'] > 75 else '🟡' if resources['temperature'] > 65 else '🟢'}")
         print()
         
+        # Modelos residentes
+        models = self.models.stats()
+        print(f"🧠 MODELOS: RAM {models['ram_used_gb']:.1f}/{models['ram_budget_gb']:.0f} GB | "
+              f"VRAM {models['vram_used_gb']:.1f}/{models['vram_budget_gb']:.0f} GB | "
+              f"aciertos {models['hit_rate'] * 100:.0f}% | desalojos {models['evictions']}")
+        for name, model in models["models"].items():
+            if model["resident"]:
+                load = f", carga media {model['mean_load_ms'] / 1000:.1f}s" if model["mean_load_ms"] else ""
+                print(f"   • {name}{' 📌' if model['pinned'] else ''} (usuarios: {', '.join(model['users']) or 'ninguno'}{load})")
+        print()
+        
+        # Admisión
+        admission = self.admission.stats()
+        print(f"🚦 ADMISIÓN: cgroups v2 {'activos' if admission['cgroups'] else 'no disponibles'} | "
+              f"admitidas {admission['admitted']} | rechazadas {admission['refused']} | "
+              f"PSI memoria {admission['stall_percent']:.1f}%")
+        for name, queued in admission["queue"].items():
+            print(f"   ⏳ {name}: {queued['reason']} (esperando {queued['waiting_s']:.0f}s)")
+        if admission["cgroups"]:
+            for name, cgroup in self.cgroups.stats().items():
+                if cgroup["current_mb"]:
+                    print(f"   • {name}: {cgroup['current_mb']:.0f} MB / {cgroup['max_gb']:.0f} GB | "
+                          f"recuperaciones {cgroup['high_events']} | OOM {cgroup['oom_kills']}")
+        print()
+        
+        # Bucle de control
+        if self.control:
+            control = self.control.stats()
+            reaction = f" | reacción media {control['mean_reaction_ms']:.0f} ms" if control["mean_reaction_ms"] else ""
+            print(f"🎛️  CONTROL: periodo {control['interval_seconds']:.1f}s | nivel {control['level'] * 100:.0f}% | "
+                  f"PSI {'activo' if control['psi'] else 'no disponible'} ({control['psi_events']} avisos){reaction}")
+            print()
+            
         # Estado de agentes
         print("🤖 ESTADO DE AGENTES:")
         for agent_name, state in self.agents_state.items():
@@ -535,6 +785,11 @@ class UltraSystemManager:
                 uptime = datetime.now() - start_time
                 print(f"      ⏱️  Tiempo activo: {uptime}")
                 
+            if state.get("last_window_start"):
+                window = state["last_window_start"]
+                print(f"      🚦 Primera tarea a los {window['time_to_first_task_s']:.1f}s de abrir la ventana "
+                      f"({'precalentado' if window['prewarmed'] else 'en frío'})")
+                
         print("="*70)
         
         # Alertas
@@ -545,37 +800,95 @@ class UltraSystemManager:
                 print(f"   ❗ {reason}")
             print()
             
+    def run_command(self, command, args):
+        """Ejecuta una orden de la CLI; True si se aplicó"""
+        if command == "critical":
+            return self.request_critical_task(*args)
+        if command == "manual":
+            return self.manual_activate_agent(*args)
+        if command == "emergency":
+            self.enter_emergency_mode(["Activación manual"])
+            return True
+        if command == "exit_critical":
+            self.exit_critical_mode()
+            return True
+        if command == "shutdown":
+            self.shutdown_system()
+            if self.control:
+                self.control.stop()
+            return True
+        raise ValueError(f"Comando '{command}' no reconocido")
+        
+    def run_pending_commands(self):
+        """Atiende las órdenes encoladas por la CLI, en orden de llegada; True si una fue apagar"""
+        for command_id, command, args in self.store.pending_commands():
+            logger.info(f"📨 Orden recibida: {command} {' '.join(map(str, args))}")
+            try:
+                result = {"ok": bool(self.run_command(command, args))}
+            except Exception as e:
+                logger.error(f"Error ejecutando la orden {command}: {e}")
+                result = {"ok": False, "error": str(e)}
+            self.store.finish_command(command_id, result)
+            if command == "shutdown":
+                return True
+        return False
+            
+    def _check_commands(self, snapshot):
+        """Con cada snapshot (1 s): si la CLI dejó órdenes, despierta el bucle de control"""
+        if self.store.has_pending_commands():
+            self.control.wake("command")
+            
+    def monitor_step(self):
+        """Un paso del bucle de control: órdenes de la CLI, emergencias, horarios y guardado de estado"""
+        if self.run_pending_commands():
+            return  # Apagado por orden de la CLI
+        
+        # Verificar condiciones de emergencia
+        emergency_reasons = self.check_emergency_conditions()
+        
+        if emergency_reasons and self.system_mode != SystemMode.EMERGENCY:
+            self.enter_emergency_mode(emergency_reasons)
+        elif not emergency_reasons and self.system_mode == SystemMode.EMERGENCY:
+            self.exit_emergency_mode()
+            
+        # Si no estamos en emergencia, gestionar agentes normalmente
+        if self.system_mode != SystemMode.EMERGENCY:
+            self.retry_admissions()
+        if self.system_mode not in [SystemMode.EMERGENCY, SystemMode.CRITICAL]:
+            self.prewarm_scheduled_agents()
+            self.check_and_activate_scheduled_agents()
+        self.stop_unused_prewarms()
+            
+        # Guardar estado cada paso (sólo escribe lo que cambió)
+        self.save_state()
+        
+        # Mostrar estado cada 10 periodos completos (10 minutos si interval=60)
+        if time.monotonic() >= self._next_status:
+            self._next_status = time.monotonic() + self.control.max_interval * 10
+            self.print_system_status()
+            
     def monitor_loop(self, interval=60):
-        """Loop principal de monitoreo ultra-conservador"""
-        logger.info(f"🔄 Iniciando monitoreo ultra-conservador cada {interval} segundos")
+        """Bucle de control adaptativo: cada `interval` s en calma, hasta cada segundo cerca de los
+        límites, y al instante ante un umbral crítico, un aviso PSI o la apertura de una ventana"""
+        logger.info(f"🔄 Iniciando monitoreo adaptativo (cada {interval}s en calma, 1s cerca de los límites)")
+        
+        # Modelos ya cargados en Ollama y el del CEO, que queda fijado
+        self.models.sync()
+        self.models.acquire(self.agent_priorities["00_CEO_LAG"]["model"], "00_CEO_LAG")
+        
+        self.control = AdaptiveControlLoop(
+            self.monitor_step, self.resource_pressure,
+            min_interval=1, max_interval=interval, sampler=self.sampler,
+            next_deadline=self.seconds_until_next_schedule_event
+        )
+        self._next_status = time.monotonic() + interval * 10
+        
+        # Este proceso es el dueño de los agentes: la CLI le manda las órdenes por el almacén
+        self.store.set_system(manager_pid=os.getpid(), manager_started_at=psutil.Process().create_time())
+        self.sampler.subscribe(self._check_commands)
         
         try:
-            while True:
-                # Verificar condiciones de emergencia
-                emergency_reasons = self.check_emergency_conditions()
-                
-                if emergency_reasons and self.system_mode != SystemMode.EMERGENCY:
-                    self.enter_emergency_mode(emergency_reasons)
-                elif not emergency_reasons and self.system_mode == SystemMode.EMERGENCY:
-                    self.exit_emergency_mode()
-                    
-                # Si no estamos en emergencia, gestionar agentes normalmente
-                if self.system_mode not in [SystemMode.EMERGENCY, SystemMode.CRITICAL]:
-                    self.check_and_activate_scheduled_agents()
-                    
-                # Guardar estado cada ciclo
-                self.save_state()
-                
-                # Mostrar estado cada 10 ciclos (10 minutos si interval=60)
-                if hasattr(self, '_cycle_count'):
-                    self._cycle_count += 1
-                else:
-                    self._cycle_count = 1
-                    
-                if self._cycle_count % 10 == 0:
-                    self.print_system_status()
-                    
-                time.sleep(interval)
+            self.control.run()
                 
         except KeyboardInterrupt:
             logger.info("🛑 Monitoreo detenido por el usuario")
@@ -585,6 +898,10 @@ class UltraSystemManager:
             logger.error(f"Error en monitoreo: {e}")
             self.save_state()
             
+        finally:
+            self.sampler.unsubscribe(self._check_commands)
+            self.store.set_system(manager_pid=None, manager_started_at=None)
+            
     def shutdown_system(self):
         """Apaga el sistema guardando todo el estado"""
         logger.info("🔴 Iniciando apagado del sistema")
@@ -594,9 +911,51 @@ class UltraSystemManager:
             if self.agents_state[agent_name]["status"] == AgentStatus.ACTIVE.value:
                 self.pause_agent(agent_name)
                 
+        self.supervisor.shutdown()
         self.save_state()
         logger.info("✅ Sistema apagado correctamente - estado guardado")
 
+def running_manager_pid(store):
+    """PID del monitor en marcha (`start`) o None; el tiempo de arranque descarta PIDs reutilizados"""
+    pid = store.get_system("manager_pid")
+    if pid is None:
+        return None
+    try:
+        if abs(psutil.Process(pid).create_time() - store.get_system("manager_started_at", 0)) < 1:
+            return pid
+    except psutil.Error:
+        pass
+    return None
+
+def send_command(command, args, timeout=COMMAND_TIMEOUT_SECONDS):
+    """Encola la orden para el monitor en marcha y espera su resultado"""
+    store = StateStore(STATE_FILE)
+    try:
+        pid = running_manager_pid(store)
+        if pid is None:
+            # Un proceso de corta vida no puede supervisar agentes: quedarían huérfanos
+            print("No hay ningún monitor en marcha: arráncalo con 'python ultra_system_manager.py start'")
+            sys.exit(1)
+        command_id = store.enqueue_command(command, *args)
+        print(f"📨 Orden '{command}' enviada al monitor (pid {pid})")
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            result = store.command_result(command_id)
+            if result is not None:
+                if result["ok"]:
+                    print(f"✅ Orden '{command}' aplicada")
+                    return
+                print(f"❌ Orden '{command}' no aplicada{': ' + result['error'] if result.get('error') else ''}")
+                sys.exit(1)
+            if running_manager_pid(store) != pid:
+                print("❌ El monitor terminó sin atender la orden")
+                sys.exit(1)
+            time.sleep(0.2)
+        print(f"⏳ El monitor no respondió en {timeout} s; la orden sigue en cola")
+        sys.exit(1)
+    finally:
+        store.close()
+
 def main():
     """Función principal"""
     if len(sys.argv) < 2:
@@ -611,40 +970,30 @@ def main():
         print("  shutdown                 - Apagar sistema")
         return
         
-    manager = UltraSystemManager()
     command = sys.argv[1].lower()
+    if command in FORWARDED_COMMANDS:
+        if command == "critical" and len(sys.argv) < 4:
+            print("Uso: critical [agente] [tarea]")
+            return
+        if command == "manual" and len(sys.argv) < 3:
+            print("Uso: manual [agente]")
+            return
+        send_command(command, {"critical": sys.argv[2:4], "manual": sys.argv[2:3]}.get(command, []))
+        return
+        
+    manager = UltraSystemManager()
     
     if command == "start":
+        pid = running_manager_pid(manager.store)
+        if pid is not None:
+            print(f"Ya hay un monitor en marcha (pid {pid})")
+            return
         interval = int(sys.argv[2]) if len(sys.argv) > 2 else 60
         manager.monitor_loop(interval)
         
     elif command == "status":
         manager.print_system_status()
         
-    elif command == "critical":
-        if len(sys.argv) < 4:
-            print("Uso: critical [agente] [tarea]")
-            return
-        agent_name = sys.argv[2]
-        task_name = sys.argv[3]
-        manager.request_critical_task(agent_name, task_name)
-        
-    elif command == "manual":
-        if len(sys.argv) < 3:
-            print("Uso: manual [agente]")
-            return
-        agent_name = sys.argv[2]
-        manager.manual_activate_agent(agent_name)
-        
-    elif command == "emergency":
-        manager.enter_emergency_mode(["Activación manual"])
-        
-    elif command == "exit_critical":
-        manager.exit_critical_mode()
-        
-    elif command == "shutdown":
-        manager.shutdown_system()
-        
     else:
         print(f"Comando '{command}' no reconocido")
 
@@ -1,28 +1,17 @@
 import asyncio
 import uvicorn
 from api import app
-from ceo_agent import CEOAgent
-
-async def start_ceo_agent():
-    """Inicia el CEO Agent en segundo plano"""
-    ceo = CEOAgent()
-    await ceo.run_main_loop()
 
 async def start_api_server():
-    """Inicia el servidor FastAPI"""
+    """Inicia el servidor FastAPI (el CEO Agent arranca en segundo plano desde la API)"""
     config = uvicorn.Config(app, host="0.0.0.0", port=8000, log_level="info")
     server = uvicorn.Server(config)
     await server.serve()
 
 async def main():
-    """Función principal que inicia ambos servicios"""
-    # Crear las tareas
-    ceo_task = asyncio.create_task(start_ceo_agent())
-    api_task = asyncio.create_task(start_api_server())
-    
-    # Esperar a que ambas tareas terminen (no deberían terminar en operación normal)
+    """Función principal que inicia la API y, con ella, el CEO Agent"""
     try:
-        await asyncio.gather(ceo_task, api_task)
+        await start_api_server()
     except KeyboardInterrupt:
         print("\nDeteniendo servicios...")
     except Exception as e:
@@ -0,0 +1,137 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from task_metrics import Histogram, RATIO_BUCKETS
+
+
+class TaskBatcher:
+    """Size-or-deadline batching stage for batch-compatible task types.
+
+    A batch is flushed as soon as it reaches `max_batch_size` or when its
+    oldest task has lingered for `max_linger_seconds`, whichever comes first.
+    The batching thread sleeps on a condition variable until the next
+    deadline (or indefinitely when every queue is empty), so it does not
+    wake up while idle.
+    """
+
+    def __init__(self,
+                 task_types: Iterable[str],
+                 max_batch_size: int,
+                 max_linger_seconds: float,
+                 flush: Callable[[List[Any]], None]):
+        self.task_types = list(task_types)
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_linger_seconds = max_linger_seconds
+        self._flush = flush
+        self._cond = threading.Condition()
+        self._queues: Dict[str, List[Tuple[float, Any]]] = {task_type: [] for task_type in self.task_types}
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._flush_pool = ThreadPoolExecutor(max_workers=max(1, len(self.task_types)),
+                                              thread_name_prefix="TaskBatcherFlush")
+        self._fill_ratio = {task_type: Histogram(RATIO_BUCKETS) for task_type in self.task_types}
+        self._linger = {task_type: Histogram() for task_type in self.task_types}
+        self._flush_reasons = {task_type: {"size": 0, "deadline": 0, "shutdown": 0} for task_type in self.task_types}
+
+    def add(self, task: Any) -> bool:
+        """Queue a task for batching; returns False if its type is not batchable"""
+        if task.task_type not in self._queues:
+            return False
+        with self._cond:
+            queue = self._queues[task.task_type]
+            queue.append((time.monotonic(), task))
+            # Wake the thread only when this add changes what it is waiting for
+            if len(queue) == 1 or len(queue) >= self.max_batch_size:
+                self._cond.notify()
+        return True
+
+    def start(self):
+        """Start the batching thread"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="TaskBatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the batching thread and flush whatever is still queued"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        with self._cond:
+            batches = []
+            for task_type in self.task_types:
+                while self._queues[task_type]:
+                    batches.append(self._take_batch(task_type, "shutdown"))
+        for batch in batches:
+            self._flush_pool.submit(self._safe_flush, batch)
+        self._flush_pool.shutdown(wait=True)
+
+    def pending_counts(self) -> Dict[str, int]:
+        """Tasks currently lingering per task type"""
+        with self._cond:
+            return {task_type: len(queue) for task_type, queue in self._queues.items()}
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per task type fill-ratio and linger-time histograms plus flush reasons"""
+        return {
+            task_type: {
+                "fill_ratio": self._fill_ratio[task_type].snapshot(),
+                "linger_seconds": self._linger[task_type].snapshot(),
+                "flush_reasons": dict(self._flush_reasons[task_type])
+            }
+            for task_type in self.task_types
+        }
+
+    def _run(self):
+        while True:
+            with self._cond:
+                batches = []
+                while self._running:
+                    batches = self._collect_due_batches()
+                    if batches:
+                        break
+                    self._cond.wait(timeout=self._seconds_to_next_deadline())
+                if not self._running:
+                    return
+            for batch in batches:
+                self._flush_pool.submit(self._safe_flush, batch)
+
+    def _collect_due_batches(self) -> List[List[Any]]:
+        now = time.monotonic()
+        batches = []
+        for task_type in self.task_types:
+            while len(self._queues[task_type]) >= self.max_batch_size:
+                batches.append(self._take_batch(task_type, "size", now))
+            queue = self._queues[task_type]
+            if queue and now - queue[0][0] >= self.max_linger_seconds:
+                batches.append(self._take_batch(task_type, "deadline", now))
+        return batches
+
+    def _seconds_to_next_deadline(self) -> Optional[float]:
+        oldest = [queue[0][0] for queue in self._queues.values() if queue]
+        if not oldest:
+            return None
+        return max(0.0, min(oldest) + self.max_linger_seconds - time.monotonic())
+
+    def _take_batch(self, task_type: str, reason: str, now: Optional[float] = None) -> List[Any]:
+        now = time.monotonic() if now is None else now
+        queue = self._queues[task_type]
+        entries, self._queues[task_type] = queue[:self.max_batch_size], queue[self.max_batch_size:]
+        self._fill_ratio[task_type].observe(len(entries) / self.max_batch_size)
+        for enqueued_at, _ in entries:
+            self._linger[task_type].observe(now - enqueued_at)
+        self._flush_reasons[task_type][reason] += 1
+        return [task for _, task in entries]
+
+    def _safe_flush(self, batch: List[Any]):
+        try:
+            self._flush(batch)
+        except Exception as e:
+            print(f"Error processing batch: {e}")
@@ -0,0 +1,193 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+
+class TaskDispatcher:
+    """Event-driven dispatcher with one ready queue per target agent.
+
+    Tasks wait in a heap owned by their target agent. Only the head of each
+    agent's heap competes in the global runnable heap, so picking the next
+    task is O(log n). An agent whose head cannot run (agent not activatable,
+    resources not available) is parked and is not looked at again until the
+    matching event arrives: new task, agent activation/deactivation or
+    resource release.
+    """
+
+    def __init__(self,
+                 ensure_agent_ready: Callable[[str], bool],
+                 allocate: Callable[[Any], bool],
+                 execute: Callable[[Any], None],
+                 priority_key: Optional[Callable[[Any], Tuple]] = None,
+                 on_blocked: Optional[Callable[[Any, str], None]] = None):
+        self._ensure_agent_ready = ensure_agent_ready
+        self._allocate = allocate
+        self._execute = execute
+        self._priority_key = priority_key or (lambda task: (-task.priority,))
+        # Called (under the dispatcher lock) with the head task of an agent that gets parked
+        self._on_blocked = on_blocked
+        # RLock: callbacks may emit events (e.g. activate_agent) from the dispatch thread
+        self._cond = threading.Condition(threading.RLock())
+        self._ready: Dict[str, List[Tuple]] = {}
+        self._runnable: List[Tuple] = []
+        self._waiting_agent: Set[str] = set()
+        self._waiting_resources: Set[str] = set()
+        self._seq = itertools.count()
+        self._wakeup = False
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {
+            'submitted': 0,
+            'dispatched': 0,
+            'parked_agent': 0,
+            'parked_resources': 0,
+            'wakeups': 0,
+            'total_wait_seconds': 0.0
+        }
+
+    def start(self):
+        """Start the background dispatch thread"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="TaskDispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the dispatch thread, leaving queued tasks in place"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, task: Any):
+        """Queue a task for its target agent and wake the dispatcher if it can run"""
+        with self._cond:
+            entry = (self._priority_key(task), next(self._seq), time.monotonic(), task)
+            queue = self._ready.setdefault(task.target_agent, [])
+            heapq.heappush(queue, entry)
+            self.stats['submitted'] += 1
+            if queue[0] is entry and not self._is_parked(task.target_agent):
+                self._push_runnable(task.target_agent)
+                self._signal()
+
+    def notify_agent_activated(self, agent_id: str):
+        """An agent became active: its parked queue may run now"""
+        with self._cond:
+            if agent_id in self._waiting_agent:
+                self._waiting_agent.discard(agent_id)
+                self._push_runnable(agent_id)
+                self._signal()
+
+    def notify_agent_deactivated(self, agent_id: str):
+        """An agent went inactive, freeing an activation slot for the parked ones"""
+        with self._cond:
+            self._unpark(self._waiting_agent)
+
+    def notify_resources_released(self):
+        """Resources were returned: retry agents parked on allocation"""
+        with self._cond:
+            self._unpark(self._waiting_resources)
+
+    def dispatch_pending(self) -> int:
+        """Dispatch every task that can run right now; returns how many were dispatched"""
+        dispatched = 0
+        while True:
+            task = self._next_dispatchable()
+            if task is None:
+                return dispatched
+            dispatched += 1
+            try:
+                self._execute(task)
+            except Exception as e:
+                print(f"Error dispatching task {getattr(task, 'task_id', task)}: {e}")
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Pending task count per target agent"""
+        with self._cond:
+            return {agent_id: len(queue) for agent_id, queue in self._ready.items() if queue}
+
+    def pending_tasks(self) -> List[Any]:
+        """Snapshot of all queued tasks in dispatch order per agent"""
+        with self._cond:
+            return [entry[-1] for queue in self._ready.values() for entry in sorted(queue)]
+
+    def parked_agents(self) -> Dict[str, str]:
+        """Agents currently parked and the event they are waiting for"""
+        with self._cond:
+            parked = {agent_id: 'agent_activation' for agent_id in self._waiting_agent}
+            parked.update({agent_id: 'resources' for agent_id in self._waiting_resources})
+            return parked
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._wakeup:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                self._wakeup = False
+                self.stats['wakeups'] += 1
+            self.dispatch_pending()
+
+    def _next_dispatchable(self) -> Optional[Any]:
+        with self._cond:
+            while self._runnable:
+                key, seq, agent_id = heapq.heappop(self._runnable)
+                queue = self._ready.get(agent_id)
+                # Lazy deletion: skip entries that no longer describe the agent's head
+                if not queue or queue[0][0] != key or queue[0][1] != seq or self._is_parked(agent_id):
+                    continue
+
+                task = queue[0][-1]
+                if not self._ensure_agent_ready(agent_id):
+                    self._waiting_agent.add(agent_id)
+                    self.stats['parked_agent'] += 1
+                    self._blocked(task, 'agent_activation')
+                    continue
+                if not self._allocate(task):
+                    self._waiting_resources.add(agent_id)
+                    self.stats['parked_resources'] += 1
+                    self._blocked(task, 'resources')
+                    continue
+
+                _, _, enqueued_at, _ = heapq.heappop(queue)
+                if queue:
+                    self._push_runnable(agent_id)
+                self.stats['dispatched'] += 1
+                self.stats['total_wait_seconds'] += time.monotonic() - enqueued_at
+                return task
+            return None
+
+    def _push_runnable(self, agent_id: str):
+        queue = self._ready.get(agent_id)
+        if queue:
+            key, seq = queue[0][0], queue[0][1]
+            heapq.heappush(self._runnable, (key, seq, agent_id))
+
+    def _unpark(self, parked: Set[str]):
+        if not parked:
+            return
+        for agent_id in list(parked):
+            self._push_runnable(agent_id)
+        parked.clear()
+        self._signal()
+
+    def _blocked(self, task: Any, reason: str):
+        if self._on_blocked:
+            try:
+                self._on_blocked(task, reason)
+            except Exception as e:
+                print(f"Error in blocked-task hook for {getattr(task, 'task_id', task)}: {e}")
+
+    def _is_parked(self, agent_id: str) -> bool:
+        return agent_id in self._waiting_agent or agent_id in self._waiting_resources
+
+    def _signal(self):
+        self._wakeup = True
+        self._cond.notify()
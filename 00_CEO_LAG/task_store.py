@@ -0,0 +1,185 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    lease_expires_at REAL,
+    last_error TEXT,
+    failed_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_lease ON tasks (state, lease_expires_at);
+"""
+
+
+class TaskStore:
+    """Durable task queue on SQLite in WAL mode with at-least-once delivery.
+
+    A task is written before it is scheduled and deleted only when it is
+    acknowledged as successful; a task acknowledged as failed or cancelled
+    stays as 'failed' so a restart can still tell its dependents that it
+    did not complete. Running tasks hold a lease; a lease that is not acked
+    before its visibility timeout expires (hung worker) or that survives a
+    process crash puts the task back in line, so every task is delivered
+    at least once. Tasks that exceed `max_attempts` stay in the table as
+    'dead' for inspection instead of being retried forever. Failed and dead
+    rows are kept `failed_retention_days` after they fail; `prune` drops
+    older ones unless a pending task still depends on them.
+    """
+
+    def __init__(self, path: str, visibility_timeout: float = 600, max_attempts: int = 3,
+                 failed_retention_days: float = 7):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max(1, max_attempts)
+        self.failed_retention_days = failed_retention_days
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL keeps every commit across a process kill (OOM); only a power
+        # loss can drop the last transactions
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+        if "failed_at" not in columns:
+            # Stores created before failed_at: their failures start their retention now
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN failed_at REAL")
+            self._conn.execute("UPDATE tasks SET failed_at = ? WHERE state IN ('dead', 'failed')", (time.time(),))
+
+    def enqueue(self, task_id: str, payload: Dict[str, Any], priority: int = 0):
+        """Persist a task; re-enqueueing a known task id is a no-op"""
+        self.enqueue_many([(task_id, payload, priority)])
+
+    def enqueue_many(self, tasks: Iterable[Tuple[str, Dict[str, Any], int]]):
+        """Persist several tasks in a single transaction"""
+        now = time.time()
+        rows = [(task_id, json.dumps(payload, default=str), priority, now) for task_id, payload, priority in tasks]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO tasks (task_id, payload, priority, enqueued_at) VALUES (?, ?, ?, ?)", rows)
+            self._conn.execute("COMMIT")
+
+    def lease(self, task_id: str, timeout: Optional[float] = None) -> bool:
+        """Mark a task as running until acked or until its visibility timeout expires"""
+        expires = time.time() + (timeout or self.visibility_timeout)
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET state = 'leased', attempts = attempts + 1, lease_expires_at = ? "
+                "WHERE task_id = ? AND state NOT IN ('dead', 'failed')", (expires, task_id))
+            return cursor.rowcount == 1
+
+    def extend(self, task_id: str, timeout: Optional[float] = None):
+        """Push back the lease of a long-running task"""
+        expires = time.time() + (timeout or self.visibility_timeout)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tasks SET lease_expires_at = ? WHERE task_id = ? AND state = 'leased'", (expires, task_id))
+
+    def requeue(self, task_id: str):
+        """Give a leased task back without counting it as a delivery attempt (e.g. preemption)"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tasks SET state = 'queued', lease_expires_at = NULL, attempts = MAX(0, attempts - 1) "
+                "WHERE task_id = ? AND state = 'leased'", (task_id,))
+
+    def ack(self, task_id: str, success: bool = True, error: Optional[str] = None):
+        """Task finished: remove it from the queue, or keep it as 'failed' with its error"""
+        with self._lock:
+            if success:
+                self._conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+            else:
+                self._conn.execute(
+                    "UPDATE tasks SET state = 'failed', lease_expires_at = NULL, last_error = ?, failed_at = ? "
+                    "WHERE task_id = ?", (error, time.time(), task_id))
+
+    def reclaim_expired(self) -> List[Dict[str, Any]]:
+        """Return payloads whose lease expired without an ack and queue them again"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            rows = self._conn.execute(
+                "SELECT task_id, payload, attempts FROM tasks WHERE state = 'leased' AND lease_expires_at < ?",
+                (now,)).fetchall()
+            self._conn.execute(
+                "UPDATE tasks SET state = 'dead', last_error = 'visibility timeout', failed_at = ? "
+                "WHERE state = 'leased' AND lease_expires_at < ? AND attempts >= ?", (now, now, self.max_attempts))
+            self._conn.execute(
+                "UPDATE tasks SET state = 'queued', lease_expires_at = NULL "
+                "WHERE state = 'leased' AND lease_expires_at < ?", (now,))
+            self._conn.execute("COMMIT")
+        return [json.loads(payload) for _, payload, attempts in rows if attempts < self.max_attempts]
+
+    def replay(self) -> List[Dict[str, Any]]:
+        """On startup: every queued or leased task (leases of a dead process are void), oldest first.
+
+        A task that was running when the process died has already used one
+        attempt, so a task that keeps killing the process (e.g. by OOM) ends
+        up dead instead of crashing every restart.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "UPDATE tasks SET state = 'dead', last_error = 'lost by process crash', failed_at = ? "
+                "WHERE state = 'leased' AND attempts >= ?", (time.time(), self.max_attempts))
+            self._conn.execute("UPDATE tasks SET state = 'queued', lease_expires_at = NULL WHERE state = 'leased'")
+            self._conn.execute("COMMIT")
+            rows = self._conn.execute(
+                "SELECT payload FROM tasks WHERE state = 'queued' ORDER BY enqueued_at").fetchall()
+        return [json.loads(payload) for payload, in rows]
+
+    def dead_task_ids(self) -> List[str]:
+        """Tasks that ran out of attempts"""
+        with self._lock:
+            return [task_id for task_id, in self._conn.execute("SELECT task_id FROM tasks WHERE state = 'dead'")]
+
+    def failed_task_ids(self, task_ids: Optional[Iterable[str]] = None) -> List[str]:
+        """Tasks that will never complete: dead, or acked as failed or cancelled; only among `task_ids` if given"""
+        with self._lock:
+            if task_ids is None:
+                return [task_id for task_id, in self._conn.execute(
+                    "SELECT task_id FROM tasks WHERE state IN ('dead', 'failed')")]
+            task_ids, failed = list(task_ids), []
+            # Chunked to stay under SQLite's limit on bound parameters
+            for start in range(0, len(task_ids), 500):
+                chunk = task_ids[start:start + 500]
+                failed.extend(task_id for task_id, in self._conn.execute(
+                    f"SELECT task_id FROM tasks WHERE state IN ('dead', 'failed') "
+                    f"AND task_id IN ({', '.join('?' * len(chunk))})", chunk))
+            return failed
+
+    def prune(self, retention_days: Optional[float] = None, keep: Iterable[str] = ()) -> int:
+        """Delete failed and dead tasks older than `retention_days` except those in `keep`; returns the count"""
+        days = self.failed_retention_days if retention_days is None else retention_days
+        cutoff = time.time() - days * 86400
+        keep = set(keep)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            expired = [task_id for task_id, in self._conn.execute(
+                "SELECT task_id FROM tasks WHERE state IN ('dead', 'failed') AND failed_at < ?", (cutoff,))
+                if task_id not in keep]
+            self._conn.executemany("DELETE FROM tasks WHERE task_id = ?", [(task_id,) for task_id in expired])
+            self._conn.execute("COMMIT")
+        return len(expired)
+
+    def counts(self) -> Dict[str, int]:
+        """Number of tasks per state"""
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
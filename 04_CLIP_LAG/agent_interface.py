@@ -1,19 +1,25 @@
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 import json
+import sys
 from loguru import logger
 
+sys.path.append(str(Path(__file__).resolve().parent.parent / "00_CEO_LAG" / "scripts_implementacion"))
+from media_cache import MediaCache
+
 class ClipLAGInterface:
     """Interface for the CLIP_LAG agent that handles video clip generation."""
     
-    def __init__(self, config_path: str = "config.json"):
+    def __init__(self, config_path: str = "config.json", cache: Optional[MediaCache] = None):
         """Initialize the CLIP_LAG interface.
         
         Args:
             config_path: Path to the configuration file
+            cache: Derived-asset cache shared with MEDIA_LAG and DJ_LAG (created if omitted)
         """
         self.config_path = config_path
         self.load_config()
+        self.cache = cache or MediaCache()
         
         # Setup logging
         logger.add(
@@ -68,9 +74,45 @@ class ClipLAGInterface:
             List of paths to generated preview clips
         """
         logger.info(f"Clip generation requested for {video_path}")
-        # This will be implemented in the main agent
+        key = self._clip_cache_key(video_path, num_clips, reframe_options)
+        previews_dir = Path(self.config.get("output_dirs", {}).get("previews", "output/previews"))
+        cached = self.cache.get(key, previews_dir / Path(video_path).stem)
+        if cached:
+            logger.info(f"Serving {len(cached)} cached previews for {video_path}")
+            return [str(path) for path in cached]
+        # This will be implemented in the main agent, which stores its previews with store_clip_previews
         return []
 
+    def _clip_cache_key(self, video_path: str, num_clips: int, reframe_options: Optional[Dict]) -> str:
+        """Cache key for the previews of a source with the given options and video settings."""
+        return self.cache.key(video_path, "clip_previews", {
+            "num_clips": num_clips,
+            "reframe_options": reframe_options or {},
+            "video_settings": self.config.get("video_settings", {})
+        })
+
+    def store_clip_previews(
+        self,
+        video_path: str,
+        num_clips: int,
+        reframe_options: Optional[Dict],
+        preview_paths: List[str]
+    ) -> List[str]:
+        """Store generated previews in the shared cache so identical requests skip generation.
+        
+        Args:
+            video_path: Path to the source video
+            num_clips: Number of clips that were generated
+            reframe_options: Reframe options used for generation
+            preview_paths: Paths to the generated preview clips
+            
+        Returns:
+            The preview paths, which stay valid if the cache later evicts its copy
+        """
+        key = self._clip_cache_key(video_path, num_clips, reframe_options)
+        self.cache.put(key, preview_paths, "clip_previews")
+        return preview_paths
+
     def approve_previews(self, preview_paths: List[str]) -> List[str]:
         """Approve preview clips for final processing.
         
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks de MEDIA_LAG
+-----------------------
+Comprobaciones de rendimiento y de comportamiento de la ingesta, el workflow,
+las variantes por plataforma y la caché de medios. Las llamadas a otros agentes
+y la transcodificación se simulan, así que no hace falta ffmpeg ni red.
+Uso: python benchmarks.py [ingest|workflow|resume|variants|cache] [args...]
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+import media_agent
+from media_agent import (AgentIntegration, ContentEditor, IngestQueue, MediaCache, WorkflowCheckpointStore,
+                         WorkflowManager)
+
+# Los avisos de reintento y cuarentena son parte de lo que se mide
+logging.getLogger('MEDIA_LAG').setLevel(logging.CRITICAL)
+
+
+class _Gauge:
+    """Cuenta los trabajos en curso y recuerda el máximo"""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+
+    def __enter__(self):
+        self.current += 1
+        self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        self.current -= 1
+
+
+def bench_ingest(files: int = 40, cpu_slots: int = 2, io_slots: int = 4, saturated_checks: int = 5):
+    """Ingesta de `files` ficheros: concurrencia acotada, pausa con CLIP_LAG saturado y cuarentena"""
+    transcoding, in_workflow = _Gauge(), _Gauge()
+    clip_checks = []
+    started_while_saturated = []
+
+    async def optimize_for_platforms(path, platforms):
+        started_while_saturated.append(len(clip_checks) <= saturated_checks)
+        with transcoding:
+            await asyncio.sleep(0.01)
+        return {platform: path for platform in platforms}
+
+    async def process_raw_content(content):
+        with in_workflow:
+            await asyncio.sleep(0.02)
+        return {'status': 'success'}
+
+    async def check_agent_status(agent_id):
+        clip_checks.append(agent_id)
+        depth = 50 if len(clip_checks) <= saturated_checks else 0
+        return {'status': 'active', 'queue_depth': depth}
+
+    editor = SimpleNamespace(optimize_for_platforms=optimize_for_platforms,
+                             target_platforms=lambda platform: [platform])
+    workflow = SimpleNamespace(process_raw_content=process_raw_content)
+    integration = SimpleNamespace(check_agent_status=check_agent_status)
+
+    real_move = shutil.move
+
+    def locked_move(source, target):
+        # Un fichero retenido por otro proceso (antivirus, indexador) no se puede mover
+        if Path(source).name == 'bloqueado.mp4':
+            raise PermissionError("fichero en uso")
+        return real_move(source, target)
+
+    async def run(inbox: Path):
+        queue = IngestQueue({'inbox_path': str(inbox), 'settle_seconds': 0, 'poll_seconds': 0.05,
+                             'rescan_seconds': 0.05, 'min_free_gb': 0, 'clip_check_seconds': 0,
+                             'backoff_seconds': 0.01, 'move_retries': 3, 'cpu_slots': cpu_slots,
+                             'io_slots': io_slots, 'queue_size': 2},
+                            {'youtube': {}}, editor, workflow, integration)
+        await queue.start()
+        start = time.perf_counter()
+        while queue.processed < files:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        # Varias revisiones de la carpeta: el fichero en cuarentena no se vuelve a procesar
+        await asyncio.sleep(0.3)
+        processed_before = queue.processed
+        quarantined = queue.stats()['quarantined']
+        # Si se reemplaza por otro contenido sí se procesa
+        (inbox / 'bloqueado.mp4').write_bytes(b'contenido nuevo')
+        while queue.processed == processed_before:
+            await asyncio.sleep(0.01)
+        reprocessed = queue.processed - processed_before
+        await queue.stop()
+        return elapsed, queue, processed_before, quarantined, reprocessed
+
+    shutil.move = locked_move
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            inbox = Path(directory)
+            (inbox / 'youtube').mkdir()
+            for index in range(files - 1):
+                (inbox / 'youtube' / f"clip_{index:03d}.mp4").write_bytes(b'x' * 1024)
+            (inbox / 'bloqueado.mp4').write_bytes(b'x' * 1024)
+            elapsed, queue, processed, quarantined, reprocessed = asyncio.run(run(inbox))
+            moved = len(list((inbox / '_procesados').rglob('*.mp4')))
+    finally:
+        shutil.move = real_move
+
+    print(f"Ficheros: {files} | cpu_slots {cpu_slots} | io_slots {io_slots} | {elapsed * 1000:.0f} ms "
+          f"(transcodificación 10 ms y workflow 20 ms simulados)")
+    print(f"Concurrencia máxima: transcodificando {transcoding.peak}/{cpu_slots} | "
+          f"en workflow {in_workflow.peak}/{io_slots}")
+    print(f"Pausa por CLIP_LAG saturado: {queue.backpressure_seconds:.2f} s | "
+          f"ficheros empezados durante la pausa: {sum(started_while_saturated)}")
+    print(f"Movidos a _procesados: {moved} | en cuarentena: {quarantined} | "
+          f"procesados de nuevo tras revisiones: {processed - files} | tras reemplazarlo: {reprocessed}")
+    if transcoding.peak > cpu_slots or in_workflow.peak > io_slots:
+        print("FAIL: se superaron los slots de CPU o de E/S")
+        sys.exit(1)
+    if queue.backpressure_seconds <= 0 or any(started_while_saturated):
+        print("FAIL: la ingesta no se detuvo con CLIP_LAG saturado")
+        sys.exit(1)
+    if moved != files - 1 or quarantined != 1 or processed != files or reprocessed != 1:
+        print("FAIL: un fichero que no se pudo mover se volvió a procesar o no quedó en cuarentena")
+        sys.exit(1)
+
+
+# Latencia simulada de cada llamada a otro agente (ms)
+AGENT_LATENCY_MS = {
+    'notify_clip_lag': 40, 'request_seo_optimization': 30, 'get_psico_insights': 30,
+    'request_dj_lag_audio': 20, 'request_donna_audit': 10, 'notify_cm_lag': 10,
+    'request_ceo_approval': 10, 'backup_with_it_lag': 10,
+}
+# Camino crítico del grafo: CLIP -> PSICO -> DJ -> DONNA -> CM -> CEO -> backup (SEO va en paralelo)
+CRITICAL_PATH = ('notify_clip_lag', 'get_psico_insights', 'request_dj_lag_audio', 'request_donna_audit',
+                 'notify_cm_lag', 'request_ceo_approval', 'backup_with_it_lag')
+
+
+class _SimulatedIntegration(AgentIntegration):
+    """AgentIntegration real con latencia simulada por agente; cada método de `fail` falla una vez"""
+
+    def __init__(self, config, fail=()):
+        super().__init__(config)
+        self.calls = Counter()
+        self.fail = set(fail)
+        for name, latency_ms in AGENT_LATENCY_MS.items():
+            setattr(self, name, self._simulated(name, latency_ms))
+
+    def _simulated(self, name, latency_ms):
+        real = getattr(AgentIntegration, name)
+
+        async def call(content):
+            self.calls[name] += 1
+            await asyncio.sleep(latency_ms / 1000)
+            if name in self.fail:
+                self.fail.discard(name)
+                raise ConnectionError(f"{name}: agente no disponible")
+            return await real(self, content)
+        return call
+
+
+def _integration_config():
+    with open(Path(__file__).resolve().parent / 'config.json', 'r', encoding='utf-8') as f:
+        return json.load(f)['agent_integrations']
+
+
+def _raw_content(index: int):
+    return {'path': f"raw/clip_{index:03d}.mp4", 'title': f"Clip {index}", 'type': 'video', 'platform': 'youtube'}
+
+
+def bench_workflow(rounds: int = 5):
+    """Workflow de `rounds` contenidos: duración real frente a la suma de pasos (SEO y PSICO en paralelo)"""
+    integration = _SimulatedIntegration(_integration_config())
+    workflow = WorkflowManager({}, integration)
+
+    async def run():
+        return [await workflow.process_raw_content(_raw_content(index)) for index in range(rounds)]
+
+    results = asyncio.run(run())
+    failed = [result.get('error') for result in results if result['status'] != 'success']
+    if failed:
+        print(f"FAIL: workflow con error: {failed[0]}")
+        sys.exit(1)
+    timings = [result['workflow_status']['timings'] for result in results]
+    total_ms = sum(timing['total_ms'] for timing in timings) / rounds
+    serial_ms = sum(timing['sum_of_steps_ms'] for timing in timings) / rounds
+    steps = {step['step']: step for step in results[-1]['workflow_status']['steps']}
+    seo, psico = steps['seo_optimization'], steps['psychological_analysis']
+
+    print(f"Workflows: {rounds} | llamadas simuladas {sum(AGENT_LATENCY_MS.values())} ms en serie, "
+          f"camino crítico {sum(AGENT_LATENCY_MS[name] for name in CRITICAL_PATH)} ms")
+    print(f"Duración media {total_ms:.0f} ms | suma de pasos {serial_ms:.0f} ms | "
+          f"ahorro por paralelismo {serial_ms - total_ms:.0f} ms")
+    print("Pasos (inicio / duración): " + " | ".join(
+        f"{name} {step['start_offset_ms']:.0f}/{step['duration_ms']:.0f} ms" for name, step in steps.items()))
+    if psico['start_offset_ms'] >= seo['start_offset_ms'] + seo['duration_ms'] or total_ms >= serial_ms:
+        print("FAIL: SEO y PSICO no se ejecutaron en paralelo")
+        sys.exit(1)
+
+
+def bench_resume(rounds: int = 5):
+    """Workflows cuyo backup falla una vez: al reanudar sólo se repite el paso fallido"""
+    with tempfile.TemporaryDirectory() as directory:
+        checkpoints = WorkflowCheckpointStore(Path(directory) / 'media_workflows.db')
+        integration = _SimulatedIntegration(_integration_config())
+        workflow = WorkflowManager({}, integration, checkpoints)
+
+        async def run():
+            first, second, resumed = [], [], []
+            for index in range(rounds):
+                integration.fail.add('backup_with_it_lag')
+                first.append(await workflow.process_raw_content(_raw_content(index)))
+                # Sin workflow_id: se encuentra el intento fallido por la huella del contenido
+                second.append(await workflow.process_raw_content(_raw_content(index)))
+                resumed.append(sum(1 for step in second[-1]['workflow_status']['steps'] if step.get('resumed')))
+            return first, second, resumed
+
+        first, second, resumed = asyncio.run(run())
+        checkpoints.close()
+
+    first_ms = sum(result['workflow_status']['timings']['total_ms'] for result in first) / rounds
+    second_ms = sum(result['workflow_status']['timings']['total_ms'] for result in second) / rounds
+    same_id = all(a['workflow_status']['workflow_id'] == b['workflow_status']['workflow_id']
+                  for a, b in zip(first, second))
+    repeated = {name: count - rounds for name, count in integration.calls.items() if count != rounds}
+    print(f"Workflows: {rounds} | primer intento {first_ms:.0f} ms (falla el backup) | "
+          f"reanudación {second_ms:.0f} ms, {sum(resumed) / rounds:.0f} pasos reutilizados")
+    print(f"Llamadas repetidas a otros agentes: {repeated or 'ninguna'} | mismo workflow_id: {same_id}")
+    if any(result['status'] != 'error' for result in first) or any(result['status'] != 'success' for result in second):
+        print("FAIL: el fallo del backup no se detectó o la reanudación no terminó")
+        sys.exit(1)
+    if not same_id or repeated != {'backup_with_it_lag': rounds}:
+        print("FAIL: la reanudación repitió pasos ya completados")
+        sys.exit(1)
+
+
+def bench_variants(platform_count: int = 4):
+    """Variantes por plataforma: manifiesto de lo ya codificado y reintento por variante si falla la pasada"""
+    platforms = list(media_agent.PLATFORM_VARIANTS)[:platform_count]
+    broken = {platforms[-1]}
+    passes = []
+
+    def render(source, selected, output_dir, encoding, threads):
+        # Sustituye a ffmpeg: una pasada con una variante problemática falla entera
+        passes.append(sorted(selected))
+        if broken & set(selected):
+            raise RuntimeError("códec no soportado")
+        for name in selected:
+            (Path(output_dir) / f"{name}.mp4").write_bytes(name.encode())
+        return {name: str(Path(output_dir) / f"{name}.mp4") for name in selected}
+
+    async def attempt(editor, source):
+        start = len(passes)
+        try:
+            await editor.render_variants(str(source), platforms)
+            ok = True
+        except RuntimeError:
+            ok = False
+        return ok, passes[start:]
+
+    async def run(directory: Path):
+        source = directory / 'fuente.mp4'
+        source.write_bytes(b'x' * 1024)
+        editor = ContentEditor({'output_path': str(directory / 'renders')})
+        editor._pool = ThreadPoolExecutor(max_workers=2)
+        try:
+            attempts = [await attempt(editor, source)]
+            manifest_path = editor._work_dir(source) / 'variants.json'
+            recorded = sorted(json.loads(manifest_path.read_text(encoding='utf-8'))['variants'])
+            broken.clear()
+            attempts.append(await attempt(editor, source))
+            attempts.append(await attempt(editor, source))
+            # Una fuente modificada invalida el manifiesto
+            stat = source.stat()
+            os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            attempts.append(await attempt(editor, source))
+        finally:
+            editor.shutdown()
+        return attempts, recorded
+
+    logging.getLogger('MEDIA_LAG.Editor').setLevel(logging.CRITICAL)
+    real_render = media_agent._render_video_variants
+    media_agent._render_video_variants = render
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            attempts, recorded = asyncio.run(run(Path(directory)))
+    finally:
+        media_agent._render_video_variants = real_render
+
+    labels = (f"{platforms[-1]} rota", "arreglada", "repetida", "fuente modificada")
+    for label, (ok, rendered) in zip(labels, attempts):
+        print(f"{label:18s}: {'ok' if ok else 'error'} | pasadas {len(rendered)} | "
+              f"variantes codificadas {sum(map(len, rendered))} {rendered}")
+    print(f"Manifiesto tras el fallo: {recorded}")
+    expected = [
+        (False, [sorted(platforms)] + [[name] for name in platforms]),
+        (True, [[platforms[-1]]]),
+        (True, []),
+        (True, [sorted(platforms)]),
+    ]
+    if [(ok, sorted(rendered)) for ok, rendered in attempts] != [(ok, sorted(rendered)) for ok, rendered in expected]:
+        print("FAIL: se recodificaron variantes ya hechas o una variante rota tiró las demás")
+        sys.exit(1)
+    if recorded != sorted(platforms[:-1]):
+        print("FAIL: el manifiesto no recoge las variantes que sí se codificaron")
+        sys.exit(1)
+
+
+def bench_cache(entries: int = 200, budget_entries: int = 20, entry_kb: int = 64, seed: int = 5):
+    """Caché de medios con sitio para `budget_entries`: expulsión LRU frente a un modelo de referencia"""
+    rng = random.Random(seed)
+    model = OrderedDict()
+    model_hits = 0
+    put_s = get_s = 0.0
+    gets = 0
+    with tempfile.TemporaryDirectory() as directory:
+        root = Path(directory)
+        (root / 'fuentes').mkdir()
+        cache = MediaCache(root / 'cache', max_bytes=budget_entries * entry_kb * 1024)
+        keys = []
+        for index in range(entries):
+            source = root / 'fuentes' / f"clip_{index:03d}.mp4"
+            source.write_bytes(index.to_bytes(4, 'little') * (entry_kb * 256))
+            thumbnail = root / 'fuentes' / f"clip_{index:03d}.jpg"
+            thumbnail.write_bytes(source.read_bytes())
+            keys.append(cache.key(source, 'thumbnail', {'width': 1280}))
+            start = time.perf_counter()
+            cache.put(keys[-1], [thumbnail], 'thumbnail')
+            put_s += time.perf_counter() - start
+            model[keys[-1]] = True
+            while len(model) > budget_entries:
+                model.popitem(last=False)
+            # Accesos a entradas recientes y antiguas: los aciertos las protegen de la expulsión
+            for key in rng.sample(keys, min(2, len(keys))):
+                start = time.perf_counter()
+                hit = cache.get(key) is not None
+                get_s += time.perf_counter() - start
+                gets += 1
+                if key in model:
+                    model.move_to_end(key)
+                    model_hits += 1
+                if hit != (key in model):
+                    print(f"FAIL: la entrada {keys.index(key)} {'sigue' if hit else 'no está'} en la caché "
+                          f"y el modelo LRU dice lo contrario")
+                    sys.exit(1)
+        stats = cache.stats()
+        on_disk = sum(1 for path in cache.objects.glob('*/*') if path.is_dir())
+        cache.close()
+
+    print(f"Entradas: {entries} de {entry_kb} KB | límite {budget_entries} entradas | "
+          f"put {put_s / entries * 1000:.2f} ms | get {get_s / gets * 1000:.2f} ms")
+    print(f"Aciertos {stats['hits']}/{gets} (modelo LRU {model_hits}) | expulsiones {stats['evictions']} | "
+          f"en el índice {stats['entries']} | en disco {on_disk} | {stats['size_gb'] * 1024 ** 2:.0f} KB")
+    if stats['hits'] != model_hits or stats['evictions'] != entries - budget_entries:
+        print("FAIL: la caché no expulsó las entradas usadas hace más tiempo")
+        sys.exit(1)
+    if stats['entries'] != budget_entries or on_disk != budget_entries:
+        print("FAIL: el índice y los ficheros de la caché no coinciden con el límite")
+        sys.exit(1)
+
+
+BENCHMARKS = {
+    "ingest": bench_ingest,
+    "workflow": bench_workflow,
+    "resume": bench_resume,
+    "variants": bench_variants,
+    "cache": bench_cache,
+}
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(f"Uso: python benchmarks.py [{'|'.join(BENCHMARKS)}] [args...]")
+        return
+    args = [int(arg) for arg in sys.argv[2:]]
+    BENCHMARKS[sys.argv[1]](*args)
+
+
+if __name__ == "__main__":
+    main()
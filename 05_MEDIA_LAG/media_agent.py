@@ -8,23 +8,38 @@ Agente responsable de la producción, edición y distribución de contenido mult
 Versión: 3.7.3
 """
 
+import hashlib
 import json
 import logging
 import os
+import shutil
+import sqlite3
 import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 import uuid
 
 import cv2
 import ffmpeg
 import numpy as np
-from PIL import Image
+from PIL import Image, ImageOps
 from pydantic import BaseModel, Field
 import time
 import asyncio
 
+try:
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "00_CEO_LAG" / "scripts_implementacion"))
+from media_cache import MediaCache
+
 # Configuración de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -48,22 +63,72 @@ class MediaConfig(BaseModel):
     performance_analyzer: Dict
     ethical_filter: Dict
     performance_metrics: Dict
-    integrations: Dict
+    integrations: Dict = Field(alias='agent_integrations')
+    storage: Dict = Field(default_factory=dict)
+    ingest: Dict = Field(default_factory=dict)
     logging: Dict
 
+def _extract_thumbnail(source: str, output: str, width: int, position: float) -> str:
+    """Extrae el fotograma en `position` (fracción de la duración) y lo guarda escalado a `width`."""
+    capture = cv2.VideoCapture(source)
+    try:
+        frames = capture.get(cv2.CAP_PROP_FRAME_COUNT)
+        capture.set(cv2.CAP_PROP_POS_FRAMES, int(frames * position))
+        ok, frame = capture.read()
+        if not ok:
+            raise ValueError(f"No se pudo leer un fotograma de {source}")
+    finally:
+        capture.release()
+    height = int(frame.shape[0] * width / frame.shape[1])
+    # Fichero nuevo y rename: la miniatura anterior puede estar enlazada en la caché
+    part = Path(output).with_suffix('.part' + Path(output).suffix)
+    if not cv2.imwrite(str(part), cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)):
+        raise ValueError(f"No se pudo guardar la miniatura {output}")
+    os.replace(part, output)
+    return output
+
 class MediaProducer:
-    """Módulo de producción de contenido multimedia."""
+    """Módulo de producción de contenido multimedia.
     
-    def __init__(self, config: Dict):
+    Con `cache`, el contenido producido a partir de un fichero fuente (`content['source_path']`)
+    se busca antes en la caché compartida de activos derivados y se guarda en ella al producirlo.
+    """
+    
+    def __init__(self, config: Dict, cache: Optional[MediaCache] = None):
         self.config = config
+        self.cache = cache
         self.logger = logging.getLogger('MEDIA_LAG.Producer')
+        self.thumbnail_path = Path(config.get('thumbnail_path', 'thumbnails'))
+        self.output_path = Path(config.get('output_path', 'produced'))
+    
+    async def _lookup(self, kind: str, content: Dict) -> Tuple[Optional[str], Optional[str]]:
+        """(clave, ruta del acierto enlazado en `output_path`) del contenido; sin fuente o sin caché no hay clave."""
+        source = content.get('source_path')
+        if not self.cache or not source or not os.path.isfile(source):
+            return None, None
+        loop = asyncio.get_running_loop()
+        params = {'quality': self.config.get('quality_settings', {}).get(kind), 'specs': content.get('specs')}
+        key = await loop.run_in_executor(None, self.cache.key, source, f"produce_{kind}", params)
+        files = await loop.run_in_executor(None, self.cache.get, key, self.output_path / Path(source).stem)
+        if files:
+            self.logger.info(f"{kind} de {content['title']} servido desde caché")
+        return key, str(files[0]) if files else None
+    
+    async def _store(self, key: Optional[str], kind: str, path: str):
+        if key and os.path.isfile(path):
+            await asyncio.get_running_loop().run_in_executor(None, self.cache.put, key, [path], f"produce_{kind}")
         
     async def create_video(self, content: Dict) -> str:
         """Crea un video según las especificaciones."""
         try:
+            key, cached = await self._lookup('video', content)
+            if cached:
+                return cached
             # Implementar lógica de creación de video
             self.logger.info(f"Creando video: {content['title']}")
-            return "path/to/video.mp4"
+            path = "path/to/video.mp4"
+            await self._store(key, 'video', path)
+            return path
         except Exception as e:
             self.logger.error(f"Error creando video: {str(e)}")
             raise
@@ -71,9 +136,14 @@ class MediaProducer:
     async def create_audio(self, content: Dict) -> str:
         """Crea un archivo de audio según las especificaciones."""
         try:
+            key, cached = await self._lookup('audio', content)
+            if cached:
+                return cached
             # Implementar lógica de creación de audio
             self.logger.info(f"Creando audio: {content['title']}")
-            return "path/to/audio.mp3"
+            path = "path/to/audio.mp3"
+            await self._store(key, 'audio', path)
+            return path
         except Exception as e:
             self.logger.error(f"Error creando audio: {str(e)}")
             raise
@@ -81,26 +151,296 @@ class MediaProducer:
     async def create_image(self, content: Dict) -> str:
         """Crea una imagen según las especificaciones."""
         try:
+            key, cached = await self._lookup('image', content)
+            if cached:
+                return cached
             # Implementar lógica de creación de imagen
             self.logger.info(f"Creando imagen: {content['title']}")
-            return "path/to/image.png"
+            path = "path/to/image.png"
+            await self._store(key, 'image', path)
+            return path
         except Exception as e:
             self.logger.error(f"Error creando imagen: {str(e)}")
             raise
 
+    async def create_thumbnail(self, video_path: str, width: int = 1280, position: float = 0.1) -> str:
+        """Miniatura de un video (fotograma en `position` de la duración), reutilizada desde la caché."""
+        try:
+            loop = asyncio.get_running_loop()
+            output = self.thumbnail_path / f"{Path(video_path).stem}_{width}.jpg"
+            output.parent.mkdir(parents=True, exist_ok=True)
+            extract = lambda: [_extract_thumbnail(video_path, str(output), width, position)]
+            if not self.cache:
+                return (await loop.run_in_executor(None, extract))[0]
+            key = await loop.run_in_executor(None, self.cache.key, video_path, 'thumbnail',
+                                             {'width': width, 'position': position})
+            files = await loop.run_in_executor(None, self.cache.cached, key, 'thumbnail', extract, output.parent)
+            return str(files[0])
+        except Exception as e:
+            self.logger.error(f"Error creando miniatura: {str(e)}")
+            raise
+
+# Variantes por plataforma: tamaño de salida (ancho, alto) y duración máxima opcional en segundos
+PLATFORM_VARIANTS = {
+    'youtube': {'size': [1920, 1080]},
+    'youtube_shorts': {'size': [1080, 1920], 'max_duration': 60},
+    'instagram': {'size': [1080, 1350]},
+    'tiktok': {'size': [1080, 1920]},
+    'x': {'size': [1280, 720]}
+}
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif')
+
+def _render_video_variants(source: str, variants: Dict[str, Dict], output_dir: str,
+                           encoding: Dict, threads: int) -> Dict[str, str]:
+    """Decodifica `source` una sola vez y codifica todas las variantes (se ejecuta en el pool de procesos).
+    
+    El vídeo se reparte con el filtro `split` a una cadena scale+crop por variante y el audio
+    de la entrada se mapea a cada salida; ffmpeg escribe todas las salidas en la misma pasada.
+    """
+    target = Path(output_dir)
+    target.mkdir(parents=True, exist_ok=True)
+    streams = ffmpeg.probe(source)['streams']
+    has_video = any(stream['codec_type'] == 'video' for stream in streams)
+    has_audio = any(stream['codec_type'] == 'audio' for stream in streams)
+    source_stream = ffmpeg.input(source)
+    audio_args = {'acodec': encoding['acodec'], 'audio_bitrate': encoding['audio_bitrate']}
+    
+    if not has_video:
+        # Sólo audio: todas las plataformas comparten la misma codificación
+        part = target / 'audio.part.m4a'
+        ffmpeg.output(source_stream.audio, str(part), **audio_args).overwrite_output().run(quiet=True)
+        final = target / 'audio.m4a'
+        os.replace(part, final)
+        return {name: str(final) for name in variants}
+    
+    names = list(variants)
+    threads = max(1, threads // len(names))  # los hilos del trabajo se reparten entre las salidas
+    branches = source_stream.video.filter_multi_output('split', len(names)) if len(names) > 1 else None
+    parts, outputs = {}, []
+    for index, name in enumerate(names):
+        width, height = variants[name]['size']
+        video = (branches[index] if branches else source_stream.video)
+        video = (video.filter('scale', width, height, force_original_aspect_ratio='increase')
+                 .filter('crop', width, height).filter('setsar', 1))
+        args = {'vcodec': encoding['vcodec'], 'crf': encoding['crf'], 'preset': encoding['preset'],
+                'pix_fmt': 'yuv420p', 'movflags': '+faststart', 'threads': threads}
+        if variants[name].get('max_duration'):
+            args['t'] = variants[name]['max_duration']
+        if has_audio:
+            args.update(audio_args)
+        parts[name] = target / f"{name}.part.mp4"
+        outputs.append(ffmpeg.output(*([video, source_stream.audio] if has_audio else [video]),
+                                     str(parts[name]), **args))
+    ffmpeg.merge_outputs(*outputs).overwrite_output().run(quiet=True)
+    
+    results = {}
+    for name, part in parts.items():
+        final = target / f"{name}.mp4"
+        os.replace(part, final)
+        results[name] = str(final)
+    return results
+
+def _render_image_variants(source: str, variants: Dict[str, Dict], output_dir: str) -> Dict[str, str]:
+    """Carga la imagen una vez y recorta/escala cada variante (se ejecuta en el pool de procesos)."""
+    target = Path(output_dir)
+    target.mkdir(parents=True, exist_ok=True)
+    results = {}
+    with Image.open(source) as image:
+        image = image.convert('RGB')
+        for name, variant in variants.items():
+            part, final = target / f"{name}.part.jpg", target / f"{name}.jpg"
+            ImageOps.fit(image, tuple(variant['size']), Image.LANCZOS).save(part, quality=92)
+            os.replace(part, final)
+            results[name] = str(final)
+    return results
+
+def _edit_video(source: str, output: str, start: float, duration: Optional[float],
+                encoding: Dict, threads: int) -> str:
+    """Recorta `source` en [start, start + duration) y lo recodifica (se ejecuta en el pool de procesos)."""
+    input_args = {'ss': start} if start else {}
+    output_args = {'vcodec': encoding['vcodec'], 'crf': encoding['crf'], 'preset': encoding['preset'],
+                   'acodec': encoding['acodec'], 'audio_bitrate': encoding['audio_bitrate'],
+                   'pix_fmt': 'yuv420p', 'movflags': '+faststart', 'threads': threads}
+    if duration:
+        output_args['t'] = duration
+    part = Path(output).with_suffix('.part.mp4')
+    part.parent.mkdir(parents=True, exist_ok=True)
+    ffmpeg.input(source, **input_args).output(str(part), **output_args).overwrite_output().run(quiet=True)
+    os.replace(part, output)
+    return output
+
 class ContentEditor:
-    """Módulo de edición de contenido multimedia."""
+    """Módulo de edición de contenido multimedia.
     
-    def __init__(self, config: Dict):
+    Las codificaciones se ejecutan con ffmpeg en un pool de procesos dimensionado a los núcleos.
+    Todas las variantes de plataforma de una fuente salen de una sola decodificación, y cada
+    variante terminada queda anotada en `variants.json` junto a las salidas: si se repite la
+    petición (o una pasada falla a medias) sólo se codifican las que faltan. Con `cache`, antes
+    de codificar se busca cada variante en la caché compartida (misma fuente y parámetros,
+    aunque venga de otra ruta) y lo codificado se guarda en ella.
+    """
+    
+    def __init__(self, config: Dict, platforms: Optional[Dict[str, Dict]] = None,
+                 cache: Optional[MediaCache] = None):
         self.config = config
+        self.platforms = platforms or {}
+        self.cache = cache
         self.logger = logging.getLogger('MEDIA_LAG.Editor')
+        self.output_path = Path(config.get('output_path', 'renders'))
+        compression = config.get('compression_settings', {})
+        video, audio = compression.get('video', {}), compression.get('audio', {})
+        self.encoding = {
+            'vcodec': 'libx264' if video.get('codec', 'h264') == 'h264' else video['codec'],
+            'crf': video.get('crf', 23),
+            'preset': video.get('preset', 'medium'),
+            'acodec': audio.get('codec', 'aac'),
+            'audio_bitrate': audio.get('bitrate', '192k')
+        }
+        cores = os.cpu_count() or 2
+        self.workers = config.get('transcode_workers') or max(1, cores // 2)
+        self.threads = max(1, cores // self.workers)  # hilos de ffmpeg por trabajo, sin sobresuscribir
+        self._pool: Optional[ProcessPoolExecutor] = None
+    
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+    
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+    
+    def _variant(self, platform: str) -> Dict:
+        """Parámetros de la variante: tamaño, duración máxima de la plataforma y codificación."""
+        if platform not in PLATFORM_VARIANTS:
+            raise ValueError(f"Plataforma no soportada: {platform}")
+        variant = dict(PLATFORM_VARIANTS[platform])
+        max_duration = self.platforms.get(platform, {}).get('max_duration')
+        if max_duration and not variant.get('max_duration'):
+            variant['max_duration'] = max_duration
+        return {**variant, **self.encoding}
+    
+    def _work_dir(self, source: Path) -> Path:
+        digest = hashlib.sha1(str(source.resolve()).encode('utf-8')).hexdigest()[:8]
+        return self.output_path / f"{source.stem}-{digest}"
+    
+    def _load_manifest(self, path: Path, signature: List[int]) -> Dict:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('source') == signature:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {'source': signature, 'variants': {}}
+    
+    def _save_manifest(self, path: Path, manifest: Dict):
+        temp = path.with_suffix('.tmp')
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temp, path)
+    
+    async def render_variants(self, media_path: str, platforms: List[str]) -> Dict[str, str]:
+        """Genera las variantes de `platforms` para una fuente en una pasada: {plataforma: ruta}."""
+        source = Path(media_path)
+        stat = source.stat()
+        work_dir = self._work_dir(source)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = work_dir / 'variants.json'
+        manifest = self._load_manifest(manifest_path, [stat.st_size, stat.st_mtime_ns])
+        
+        variants = {platform: self._variant(platform) for platform in platforms}
+        done = {name: entry['path'] for name, entry in manifest['variants'].items()
+                if name in variants and entry['params'] == variants[name] and Path(entry['path']).exists()}
+        missing = {name: variant for name, variant in variants.items() if name not in done}
+        if not missing:
+            return done
+        
+        loop = asyncio.get_running_loop()
+        
+        def job(selected: Dict[str, Dict]):
+            if is_image:
+                return loop.run_in_executor(pool, _render_image_variants, str(source), selected, str(work_dir))
+            return loop.run_in_executor(pool, _render_video_variants, str(source), selected, str(work_dir),
+                                        self.encoding, self.threads)
+        
+        def record(rendered: Dict[str, str]):
+            for name, path in rendered.items():
+                manifest['variants'][name] = {'path': path, 'params': variants[name],
+                                              'completed_at': datetime.now().isoformat()}
+                done[name] = path
+            self._save_manifest(manifest_path, manifest)
+        
+        keys = {}
+        if self.cache:
+            keys = await loop.run_in_executor(None, lambda: {
+                name: self.cache.key(source, 'platform_variant', variant) for name, variant in missing.items()})
+            for name, key in keys.items():
+                files = await loop.run_in_executor(None, self.cache.get, key, work_dir)
+                if files:
+                    record({name: str(files[0])})
+            missing = {name: variant for name, variant in missing.items() if name not in done}
+            if not missing:
+                self.logger.info(f"Variantes de {source.name} servidas desde caché")
+                return done
+        
+        pool = self._executor()
+        is_image = source.suffix.lower() in IMAGE_EXTENSIONS
+        started = time.perf_counter()
+        try:
+            record(await job(missing))
+        except Exception as e:
+            if len(missing) == 1:
+                raise
+            # Una variante problemática no debe tirar las demás: se codifican por separado
+            self.logger.warning(f"Falló la pasada única de {source.name} ({str(e)}), codificando variantes por separado")
+            
+            async def single(name: str):
+                try:
+                    record(await job({name: missing[name]}))
+                except Exception as variant_error:
+                    self.logger.error(f"Error codificando {name} de {source.name}: {str(variant_error)}")
+            
+            await asyncio.gather(*(single(name) for name in missing))
+        
+        if self.cache:
+            await loop.run_in_executor(None, lambda: [
+                self.cache.put(keys[name], [done[name]], 'platform_variant') for name in missing if name in done])
+        failed = [name for name in variants if name not in done]
+        if failed:
+            raise RuntimeError(f"No se pudieron generar las variantes {failed} de {source.name}")
+        self.logger.info(f"{len(missing)} variantes de {source.name} en {time.perf_counter() - started:.1f} s "
+                         f"({len(variants) - len(missing)} ya estaban hechas)")
+        return done
         
     async def edit_video(self, video_path: str, specs: Dict) -> str:
-        """Edita un video según las especificaciones."""
+        """Edita un video según las especificaciones (recorte por 'start' y 'end' o 'duration', en segundos)."""
         try:
-            # Implementar lógica de edición de video
             self.logger.info(f"Editando video: {video_path}")
-            return "path/to/edited_video.mp4"
+            start = float(specs.get('start', 0))
+            duration = specs.get('duration')
+            if duration is None and specs.get('end') is not None:
+                duration = float(specs['end']) - start
+            if not start and not duration:
+                return video_path
+            source = Path(video_path)
+            output = self._work_dir(source) / f"edit_{start:g}_{duration or 0:g}.mp4"
+            if output.exists() and output.stat().st_mtime_ns >= source.stat().st_mtime_ns:
+                return str(output)
+            loop = asyncio.get_running_loop()
+            key = None
+            if self.cache:
+                key = await loop.run_in_executor(None, self.cache.key, source, 'edit',
+                                                 {'start': start, 'duration': duration, **self.encoding})
+                files = await loop.run_in_executor(None, self.cache.get, key, output.parent)
+                if files:
+                    return str(files[0])
+            edited = await loop.run_in_executor(self._executor(), _edit_video, str(source), str(output),
+                                                start, duration, self.encoding, self.threads)
+            if key:
+                await loop.run_in_executor(None, self.cache.put, key, [edited], 'edit')
+            return edited
         except Exception as e:
             self.logger.error(f"Error editando video: {str(e)}")
             raise
@@ -115,16 +455,27 @@ class ContentEditor:
             self.logger.error(f"Error editando audio: {str(e)}")
             raise
 
-    async def optimize_for_platform(self, media_path: str, platform: str) -> str:
-        """Optimiza el contenido para una plataforma específica."""
+    def target_platforms(self, platform: str, requested: Optional[List[str]] = None) -> List[str]:
+        """Plataformas a codificar juntas: las pedidas, las de `target_platforms` o todas las soportadas."""
+        targets = list(requested or self.config.get('target_platforms') or
+                       [name for name in self.platforms if name in PLATFORM_VARIANTS])
+        if platform not in targets:
+            targets.insert(0, platform)
+        return targets
+
+    async def optimize_for_platforms(self, media_path: str, platforms: List[str]) -> Dict[str, str]:
+        """Optimiza el contenido para varias plataformas en una sola pasada: {plataforma: ruta}."""
         try:
-            # Implementar lógica de optimización
-            self.logger.info(f"Optimizando para {platform}: {media_path}")
-            return "path/to/optimized_media"
+            self.logger.info(f"Optimizando para {', '.join(platforms)}: {media_path}")
+            return await self.render_variants(media_path, platforms)
         except Exception as e:
             self.logger.error(f"Error optimizando contenido: {str(e)}")
             raise
 
+    async def optimize_for_platform(self, media_path: str, platform: str) -> str:
+        """Optimiza el contenido para una plataforma específica."""
+        return (await self.optimize_for_platforms(media_path, [platform]))[platform]
+
 class DistributionManager:
     """Módulo de distribución de contenido multimedia."""
     
@@ -229,9 +580,11 @@ class AgentIntegration:
             endpoint = self.config['04_CLIP_LAG']['output_endpoint']
             self.logger.info(f"Notificando a CLIP_LAG: {content['title']}")
             # Implementar llamada API a CLIP_LAG
+            # El resultado conserva título, tipo y plataforma: los pasos siguientes los leen de aquí
             return {
                 'status': 'success',
                 'content': {
+                    **content,
                     'edited_path': 'path/to/edited_video.mp4',
                     'original': content
                 }
@@ -390,137 +743,265 @@ class AgentIntegration:
                 'error': str(e)
             }
 
+@dataclass
+class WorkflowStep:
+    """Paso del workflow: se ejecuta cuando terminan los pasos de `requires`."""
+    name: str
+    description: str
+    requires: Tuple[str, ...]
+    run: Callable[[Dict], Awaitable]
+
+def content_hash(content: Dict) -> str:
+    """Huella del contenido: su descripción y, si apunta a un fichero, tamaño y fecha de modificación."""
+    fingerprint = {'content': content}
+    path = content.get('path')
+    if path and os.path.isfile(path):
+        stat = os.stat(path)
+        fingerprint['file'] = [stat.st_size, stat.st_mtime_ns]
+    encoded = json.dumps(fingerprint, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+class WorkflowCheckpointStore:
+    """Salida de cada paso completado por workflow_id, en SQLite, para reanudar workflows fallidos."""
+    
+    def __init__(self, db_path: Union[str, Path] = 'media_workflows.db', retention_days: int = 30):
+        self.logger = logging.getLogger('MEDIA_LAG.Checkpoints')
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS workflows (
+                workflow_id TEXT PRIMARY KEY, content_hash TEXT NOT NULL, status TEXT NOT NULL,
+                created_at REAL NOT NULL, updated_at REAL NOT NULL)""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS workflows_hash ON workflows (content_hash, status)")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS workflow_steps (
+                workflow_id TEXT NOT NULL, step TEXT NOT NULL, output TEXT NOT NULL,
+                duration_ms REAL, completed_at REAL NOT NULL, PRIMARY KEY (workflow_id, step))""")
+        self.prune(retention_days)
+    
+    def find_resumable(self, digest: str) -> Optional[str]:
+        """Último workflow sin terminar del mismo contenido."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT workflow_id FROM workflows WHERE content_hash = ? AND status != 'success' "
+                "ORDER BY updated_at DESC LIMIT 1", (digest,)).fetchone()
+        return row[0] if row else None
+    
+    def content_hash_of(self, workflow_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT content_hash FROM workflows WHERE workflow_id = ?",
+                                     (workflow_id,)).fetchone()
+        return row[0] if row else None
+    
+    def start(self, workflow_id: str, digest: str):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO workflows VALUES (?, ?, 'running', ?, ?) "
+                "ON CONFLICT(workflow_id) DO UPDATE SET status = 'running', updated_at = excluded.updated_at",
+                (workflow_id, digest, now, now))
+    
+    def completed_steps(self, workflow_id: str) -> Dict[str, Any]:
+        """Salidas de los pasos ya completados: {paso: salida}."""
+        with self._lock:
+            rows = self._conn.execute("SELECT step, output FROM workflow_steps WHERE workflow_id = ?",
+                                      (workflow_id,)).fetchall()
+        return {step: json.loads(output) for step, output in rows}
+    
+    def save_step(self, workflow_id: str, step: str, output: Any, duration_ms: float):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO workflow_steps VALUES (?, ?, ?, ?, ?)",
+                               (workflow_id, step, json.dumps(output, default=str), duration_ms, now))
+            self._conn.execute("UPDATE workflows SET updated_at = ? WHERE workflow_id = ?", (now, workflow_id))
+    
+    def finish(self, workflow_id: str, status: str):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE workflows SET status = ?, updated_at = ? WHERE workflow_id = ?",
+                               (status, time.time(), workflow_id))
+    
+    def prune(self, retention_days: int):
+        """Borra workflows (terminados o abandonados) sin actividad en `retention_days` días."""
+        cutoff = time.time() - retention_days * 86400
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM workflow_steps WHERE workflow_id IN "
+                               "(SELECT workflow_id FROM workflows WHERE updated_at < ?)", (cutoff,))
+            self._conn.execute("DELETE FROM workflows WHERE updated_at < ?", (cutoff,))
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
 class WorkflowManager:
     """Gestor de flujos de trabajo multimedia."""
     
-    def __init__(self, config: Dict, integration: AgentIntegration):
+    def __init__(self, config: Dict, integration: AgentIntegration,
+                 checkpoints: Optional[WorkflowCheckpointStore] = None):
         self.config = config
         self.integration = integration
+        self.checkpoints = checkpoints
         self.logger = logging.getLogger('MEDIA_LAG.Workflow')
         
-    async def process_raw_content(self, content: Dict) -> Dict:
-        """Procesa contenido RAW según el workflow definido."""
-        try:
-            workflow_status = {
-                'workflow_id': str(uuid.uuid4()),
-                'start_time': datetime.now().isoformat(),
-                'steps': []
-            }
+    def _build_workflow_steps(self, content: Dict, workflow_status: Dict) -> List[WorkflowStep]:
+        """Define el workflow como grafo de pasos según sus dependencias de datos."""
+        integration = self.integration
 
-            # 1. Organizar material de filmación
-            self.logger.info("Paso 1: Organizando material de filmación")
-            organized_content = await self._organize_raw_material(content)
-            workflow_status['steps'].append({
-                'step': 'organize_raw',
-                'status': 'completed',
-                'timestamp': datetime.now().isoformat()
+        async def donna_audit(results: Dict) -> Tuple[bool, str]:
+            approved, message = await integration.request_donna_audit({
+                **results['clip_edit']['content'],
+                'seo_data': results['seo_optimization'],
+                'psico_insights': results['psychological_analysis'],
+                'audio_data': results['audio_integration']
             })
+            if not approved:
+                raise ValueError(f"Contenido rechazado por DONNA_LAG: {message}")
+            return approved, message
 
-            # 2. Notificar y esperar edición de CLIP_LAG
-            self.logger.info("Paso 2: Coordinando con CLIP_LAG")
-            clip_result = await self.integration.notify_clip_lag(organized_content)
-            workflow_status['steps'].append({
-                'step': 'clip_edit',
-                'status': 'completed',
-                'timestamp': datetime.now().isoformat()
+        async def ceo_approval(results: Dict) -> Dict:
+            approval = await integration.request_ceo_approval({
+                'workflow_status': workflow_status,
+                'content': results['clip_edit']['content'],
+                'seo_data': results['seo_optimization'],
+                'psico_insights': results['psychological_analysis'],
+                'cm_strategy': results['cm_strategy'],
+                'donna_approval': True
             })
+            if not approval['approved']:
+                raise ValueError(f"Contenido rechazado por CEO: {approval['message']}")
+            return approval
 
-            # 3. Solicitar optimización SEO
-            self.logger.info("Paso 3: Solicitando optimización SEO")
-            seo_result = await self.integration.request_seo_optimization(clip_result['content'])
-            workflow_status['steps'].append({
-                'step': 'seo_optimization',
-                'status': 'completed',
-                'timestamp': datetime.now().isoformat()
-            })
+        return [
+            WorkflowStep('organize_raw', "Organizando material de filmación", (),
+                         lambda results: self._organize_raw_material(content)),
+            WorkflowStep('clip_edit', "Coordinando con CLIP_LAG", ('organize_raw',),
+                         lambda results: integration.notify_clip_lag(results['organize_raw'])),
+            # SEO y PSICO sólo necesitan el resultado de CLIP_LAG: corren en paralelo
+            WorkflowStep('seo_optimization', "Solicitando optimización SEO", ('clip_edit',),
+                         lambda results: integration.request_seo_optimization(results['clip_edit']['content'])),
+            WorkflowStep('psychological_analysis', "Obteniendo análisis psicológico", ('clip_edit',),
+                         lambda results: integration.get_psico_insights(results['clip_edit']['content'])),
+            # El audio de DJ_LAG usa los insights de PSICO, no espera al SEO
+            WorkflowStep('audio_integration', "Coordinando audio con DJ_LAG",
+                         ('clip_edit', 'psychological_analysis'),
+                         lambda results: integration.request_dj_lag_audio({
+                             **results['clip_edit']['content'],
+                             'psychological_insights': results['psychological_analysis']
+                         })),
+            WorkflowStep('donna_audit', "Solicitando auditoría a DONNA_LAG",
+                         ('seo_optimization', 'psychological_analysis', 'audio_integration'), donna_audit),
+            WorkflowStep('cm_strategy', "Coordinando estrategia con CM_LAG",
+                         ('donna_audit', 'seo_optimization', 'psychological_analysis'),
+                         lambda results: integration.notify_cm_lag({
+                             **results['clip_edit']['content'],
+                             'seo_data': results['seo_optimization'],
+                             'psico_insights': results['psychological_analysis'],
+                             'approved_by_donna': True
+                         })),
+            WorkflowStep('ceo_approval', "Solicitando aprobación del CEO", ('cm_strategy',), ceo_approval),
+            # Sólo se respalda contenido aprobado: un rechazo no deja copias en IT_LAG
+            WorkflowStep('backup', "Coordinando backup con IT_LAG", ('ceo_approval',),
+                         lambda results: integration.backup_with_it_lag({
+                             **results['clip_edit']['content'],
+                             'workflow_id': workflow_status['workflow_id']
+                         })),
+        ]
 
-            # 4. Obtener análisis psicológico
-            self.logger.info("Paso 4: Obteniendo análisis psicológico")
-            psico_insights = await self.integration.get_psico_insights(clip_result['content'])
-            workflow_status['steps'].append({
-                'step': 'psychological_analysis',
-                'status': 'completed',
-                'timestamp': datetime.now().isoformat()
-            })
+    async def _run_workflow_steps(self, steps: List[WorkflowStep], workflow_status: Dict,
+                                  completed: Optional[Dict[str, Any]] = None) -> Dict:
+        """Ejecuta cada paso en cuanto terminan sus dependencias; si uno falla se cancelan los demás.
 
-            # 5. Coordinar con DJ_LAG para audio
-            self.logger.info("Paso 5: Coordinando audio con DJ_LAG")
-            audio_result = await self.integration.request_dj_lag_audio({
-                **clip_result['content'],
-                'psychological_insights': psico_insights
-            })
-            workflow_status['steps'].append({
-                'step': 'audio_integration',
-                'status': 'completed',
-                'timestamp': datetime.now().isoformat()
-            })
+        Los pasos de `completed` (reanudación) no se repiten: su salida guardada se usa tal cual.
+        """
+        results: Dict[str, Any] = dict(completed or {})
+        tasks: Dict[str, asyncio.Task] = {}
 
-            # 6. Solicitar auditoría de DONNA_LAG
-            self.logger.info("Paso 6: Solicitando auditoría a DONNA_LAG")
-            approved, message = await self.integration.request_donna_audit({
-                **clip_result['content'],
-                'seo_data': seo_result,
-                'psico_insights': psico_insights,
-                'audio_data': audio_result
-            })
-            
-            if not approved:
-                raise ValueError(f"Contenido rechazado por DONNA_LAG: {message}")
-            
-            workflow_status['steps'].append({
-                'step': 'donna_audit',
-                'status': 'completed',
-                'timestamp': datetime.now().isoformat()
-            })
+        async def run_step(step: WorkflowStep):
+            if step.name in results:
+                workflow_status['steps'].append({'step': step.name, 'status': 'completed', 'resumed': True,
+                                                 'timestamp': datetime.now().isoformat()})
+                return
+            if step.requires:
+                await asyncio.gather(*(tasks[name] for name in step.requires))
+            self.logger.info(f"Paso {step.name}: {step.description}")
+            started = time.perf_counter()
+            record = {'step': step.name, 'start_offset_ms': (started - workflow_start) * 1000}
+            try:
+                results[step.name] = await step.run(results)
+            except Exception:
+                record.update(status='error', timestamp=datetime.now().isoformat(),
+                              duration_ms=(time.perf_counter() - started) * 1000)
+                workflow_status['steps'].append(record)
+                raise
+            record.update(status='completed', timestamp=datetime.now().isoformat(),
+                          duration_ms=(time.perf_counter() - started) * 1000)
+            if self.checkpoints:
+                self.checkpoints.save_step(workflow_status['workflow_id'], step.name,
+                                           results[step.name], record['duration_ms'])
+            workflow_status['steps'].append(record)
 
-            # 7. Preparar estrategia de lanzamiento con CM_LAG
-            self.logger.info("Paso 7: Coordinando estrategia con CM_LAG")
-            cm_strategy = await self.integration.notify_cm_lag({
-                **clip_result['content'],
-                'seo_data': seo_result,
-                'psico_insights': psico_insights,
-                'approved_by_donna': True
-            })
-            workflow_status['steps'].append({
-                'step': 'cm_strategy',
-                'status': 'completed',
-                'timestamp': datetime.now().isoformat()
-            })
+        workflow_start = time.perf_counter()
+        # Los pasos vienen en orden topológico: las dependencias ya tienen su tarea creada
+        for step in steps:
+            tasks[step.name] = asyncio.ensure_future(run_step(step))
+        try:
+            done, pending = await asyncio.wait(tasks.values(), return_when=asyncio.FIRST_EXCEPTION)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            errors = [task.exception() for task in done if not task.cancelled() and task.exception()]
+            if errors:
+                raise errors[0]
+        finally:
+            elapsed_ms = (time.perf_counter() - workflow_start) * 1000
+            step_ms = sum(step.get('duration_ms', 0) for step in workflow_status['steps'])
+            workflow_status['timings'] = {
+                'total_ms': elapsed_ms,
+                'sum_of_steps_ms': step_ms,
+                'parallel_saving_ms': max(step_ms - elapsed_ms, 0)
+            }
+        return results
 
-            # 8. Solicitar aprobación final del CEO
-            self.logger.info("Paso 8: Solicitando aprobación del CEO")
-            ceo_approval = await self.integration.request_ceo_approval({
-                'workflow_status': workflow_status,
-                'content': clip_result['content'],
-                'seo_data': seo_result,
-                'psico_insights': psico_insights,
-                'cm_strategy': cm_strategy,
-                'donna_approval': True
-            })
-            
-            if not ceo_approval['approved']:
-                raise ValueError(f"Contenido rechazado por CEO: {ceo_approval['message']}")
-            
-            workflow_status['steps'].append({
-                'step': 'ceo_approval',
-                'status': 'completed',
-                'timestamp': datetime.now().isoformat()
-            })
+    def _resume_point(self, content: Dict, workflow_id: Optional[str]) -> Tuple[str, Dict[str, Any]]:
+        """workflow_id a usar y pasos ya completados; sin id se reanuda el último intento del mismo contenido."""
+        if not self.checkpoints:
+            return workflow_id or str(uuid.uuid4()), {}
+        digest = content_hash(content)
+        if workflow_id is None:
+            workflow_id = self.checkpoints.find_resumable(digest)
+        elif self.checkpoints.content_hash_of(workflow_id) not in (None, digest):
+            self.logger.warning(f"El contenido del workflow {workflow_id} ha cambiado, se empieza de cero")
+            workflow_id = None
+        workflow_id = workflow_id or str(uuid.uuid4())
+        self.checkpoints.start(workflow_id, digest)
+        completed = self.checkpoints.completed_steps(workflow_id)
+        if completed:
+            self.logger.info(f"Reanudando workflow {workflow_id}: {len(completed)} pasos ya completados")
+        return workflow_id, completed
 
-            # 9. Coordinar backup con IT_LAG
-            self.logger.info("Paso 9: Coordinando backup con IT_LAG")
-            await self.integration.backup_with_it_lag({
-                'workflow_id': workflow_status['workflow_id'],
-                'content': clip_result['content']
-            })
-            workflow_status['steps'].append({
-                'step': 'backup',
-                'status': 'completed',
-                'timestamp': datetime.now().isoformat()
-            })
+    async def process_raw_content(self, content: Dict, workflow_id: Optional[str] = None) -> Dict:
+        """Procesa contenido RAW según el workflow definido.
+
+        Con almacén de checkpoints, un workflow fallido se reanuda desde sus pasos completados
+        (por `workflow_id` o, si no se indica, por la huella del contenido).
+        """
+        workflow_status = {
+            'workflow_id': workflow_id,
+            'start_time': datetime.now().isoformat(),
+            'steps': []
+        }
+        try:
+            workflow_status['workflow_id'], completed = self._resume_point(content, workflow_id)
+            steps = self._build_workflow_steps(content, workflow_status)
+            await self._run_workflow_steps(steps, workflow_status, completed)
 
             workflow_status['end_time'] = datetime.now().isoformat()
             workflow_status['status'] = 'success'
+            if self.checkpoints:
+                self.checkpoints.finish(workflow_status['workflow_id'], 'success')
+            self.logger.info(f"Workflow {workflow_status['workflow_id']} completado en "
+                             f"{workflow_status['timings']['total_ms']:.0f} ms "
+                             f"({workflow_status['timings']['sum_of_steps_ms']:.0f} ms en serie)")
 
             # Notificar completación al CEO
             await self.integration.report_workflow_completion(workflow_status)
@@ -532,12 +1013,17 @@ class WorkflowManager:
             }
             
         except Exception as e:
+            failed = [step['step'] for step in workflow_status['steps'] if step['status'] == 'error']
             error_status = {
                 'error': str(e),
-                'step': workflow_status['steps'][-1]['step'] if workflow_status.get('steps') else 'unknown',
+                'step': failed[0] if failed else (workflow_status['steps'][-1]['step'] if workflow_status['steps'] else 'unknown'),
                 'timestamp': datetime.now().isoformat()
             }
             
+            if self.checkpoints and workflow_status['workflow_id']:
+                self.checkpoints.finish(workflow_status['workflow_id'], 'error')
+                error_status['workflow_id'] = workflow_status['workflow_id']
+
             # Notificar error al CEO
             await self.integration.report_workflow_error(error_status)
             
@@ -561,8 +1047,8 @@ class WorkflowManager:
             self.logger.error(f"Error organizando material: {str(e)}")
             raise
 
-    async def generate_daily_report(self) -> Dict:
-        """Genera reporte diario para CEO_LAG."""
+    async def generate_daily_report(self, ingest: Optional[Dict] = None) -> Dict:
+        """Genera reporte diario para CEO_LAG (con las métricas de la cola de ingesta si se pasan)."""
         try:
             report = {
                 'date': datetime.now().isoformat(),
@@ -571,7 +1057,8 @@ class WorkflowManager:
                     'storage_used': await self._get_storage_usage(),
                     'processing_time_avg': await self._get_processing_time_avg(),
                     'success_rate': await self._get_success_rate(),
-                    'workflow_metrics': await self._get_workflow_metrics()
+                    'workflow_metrics': await self._get_workflow_metrics(),
+                    'ingest': ingest or {}
                 },
                 'agent_status': {
                     'clip_lag': await self.integration.check_agent_status('04_CLIP_LAG'),
@@ -620,6 +1107,289 @@ class WorkflowManager:
             'bottlenecks': []
         }
 
+class _InboxEventHandler:
+    """Traslada los eventos de watchdog (hilo del observador) al bucle asyncio."""
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop, callback: Callable[[Path], None]):
+        self.loop = loop
+        self.callback = callback
+    
+    def dispatch(self, event):
+        if event.is_directory or event.event_type not in ('created', 'modified', 'moved', 'closed'):
+            return
+        path = Path(getattr(event, 'dest_path', None) or event.src_path)
+        self.loop.call_soon_threadsafe(self.callback, path)
+
+class IngestQueue:
+    """Cola de ingesta: vigila la carpeta de entrada y procesa cada fichero con concurrencia acotada.
+    
+    Los ficheros nuevos se detectan con watchdog (inotify en Linux, ReadDirectoryChangesW
+    en Windows) o, si no está instalado, revisando la carpeta cada `poll_seconds`. Pasan a
+    una cola asyncio limitada y cada uno se transcodifica (hasta `cpu_slots` a la vez) y
+    recorre el workflow de integración (hasta `io_slots` a la vez). Si queda poco disco o
+    CLIP_LAG está saturado no se empiezan ficheros nuevos: la cola se llena y los
+    ficheros esperan en la carpeta de entrada.
+    """
+    
+    def __init__(self, config: Dict, platforms: Dict[str, Dict], editor: 'ContentEditor',
+                 workflow: 'WorkflowManager', integration: AgentIntegration):
+        self.config = config
+        self.platforms = platforms
+        self.editor = editor
+        self.workflow = workflow
+        self.integration = integration
+        self.logger = logging.getLogger('MEDIA_LAG.Ingest')
+        
+        self.inbox = Path(config.get('inbox_path', 'inbox'))
+        self.processed_dir = self.inbox / config.get('processed_dir', '_procesados')
+        self.failed_dir = self.inbox / config.get('failed_dir', '_fallidos')
+        self.extensions = {ext.lower() for ext in config.get(
+            'extensions', ['.mp4', '.mov', '.mkv', '.mp3', '.wav', '.png', '.jpg'])}
+        self.default_platform = config.get('default_platform', 'youtube')
+        self.settle_seconds = config.get('settle_seconds', 5)
+        self.poll_seconds = config.get('poll_seconds', 30)
+        self.rescan_seconds = config.get('rescan_seconds', 300)
+        self.min_free_gb = config.get('min_free_gb', 20)
+        self.clip_max_queue = config.get('clip_max_queue', 10)
+        self.clip_check_seconds = config.get('clip_check_seconds', 15)
+        self.backoff_seconds = config.get('backoff_seconds', 10)
+        self.move_retries = config.get('move_retries', 3)
+        self.cpu_slots = config.get('cpu_slots') or max(1, (os.cpu_count() or 2) // 2)
+        self.io_slots = config.get('io_slots', 8)
+        
+        self.queue: Optional[asyncio.Queue] = None
+        self.pending: Dict[Path, None] = {}  # detectados y aún no encolados, en orden de llegada
+        self.known: set = set()  # pendientes, en cola o en curso
+        # Ya procesados que no se pudieron sacar de la entrada: ruta -> (tamaño, mtime_ns) al fallar
+        self.quarantined: Dict[Path, Tuple[int, int]] = {}
+        self.completed_at: deque = deque()
+        self.processed = 0
+        self.failed = 0
+        self.transcoding = 0
+        self.in_workflow = 0
+        self.backpressure: Optional[str] = None
+        self.backpressure_seconds = 0.0
+        self._cpu: Optional[asyncio.Semaphore] = None
+        self._io: Optional[asyncio.Semaphore] = None
+        self._pending_event: Optional[asyncio.Event] = None
+        self._clip_checked = 0.0
+        self._clip_saturated: Optional[str] = None
+        self._observer = None
+        self._tasks: List[asyncio.Task] = []
+    
+    async def start(self):
+        """Crea la carpeta de entrada, registra los ficheros que ya hay y arranca vigilancia y workers."""
+        for directory in (self.inbox, self.processed_dir, self.failed_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+        self.queue = asyncio.Queue(maxsize=self.config.get('queue_size', 2 * (self.cpu_slots + self.io_slots)))
+        self._cpu = asyncio.Semaphore(self.cpu_slots)
+        self._io = asyncio.Semaphore(self.io_slots)
+        self._pending_event = asyncio.Event()
+        self._scan()
+        if Observer is not None:
+            self._observer = Observer()
+            self._observer.schedule(_InboxEventHandler(asyncio.get_running_loop(), self._discovered),
+                                    str(self.inbox), recursive=True)
+            self._observer.start()
+            self.logger.info(f"Vigilando {self.inbox} (watchdog)")
+        else:
+            self.logger.info(f"watchdog no instalado: revisando {self.inbox} cada {self.poll_seconds} s")
+        self._tasks = [asyncio.ensure_future(self._feeder()), asyncio.ensure_future(self._scanner())]
+        self._tasks += [asyncio.ensure_future(self._worker()) for _ in range(self.cpu_slots + self.io_slots)]
+    
+    async def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+    
+    def _accepts(self, path: Path) -> bool:
+        if path.suffix.lower() not in self.extensions or path.name.startswith('.'):
+            return False
+        return self.processed_dir not in path.parents and self.failed_dir not in path.parents
+    
+    def _discovered(self, path: Path):
+        if path in self.known or not self._accepts(path) or self._is_quarantined(path):
+            return
+        self.known.add(path)
+        self.pending[path] = None
+        self._pending_event.set()
+    
+    def _is_quarantined(self, path: Path) -> bool:
+        """Fichero ya procesado que no se pudo mover; si se reemplaza por otro se vuelve a procesar."""
+        signature = self.quarantined.get(path)
+        if signature is None:
+            return False
+        try:
+            stat = path.stat()
+        except OSError:
+            del self.quarantined[path]
+            return True
+        if (stat.st_size, stat.st_mtime_ns) == signature:
+            return True
+        del self.quarantined[path]
+        return False
+    
+    def _scan(self):
+        """Registra los ficheros de la carpeta de entrada (y de sus subcarpetas por plataforma)."""
+        for root, dirs, files in os.walk(self.inbox):
+            dirs[:] = [d for d in dirs if Path(root, d) not in (self.processed_dir, self.failed_dir)]
+            for name in files:
+                self._discovered(Path(root, name))
+    
+    async def _scanner(self):
+        """Sin watchdog es la única detección; con él, una revisión ocasional por si se perdió un evento."""
+        interval = self.rescan_seconds if self._observer is not None else self.poll_seconds
+        while True:
+            await asyncio.sleep(interval)
+            self._scan()
+    
+    async def _feeder(self):
+        """Pasa a la cola los ficheros que ya no se están escribiendo; `put` bloquea si la cola está llena."""
+        while True:
+            await self._pending_event.wait()
+            now = time.time()
+            wait = None
+            for path in list(self.pending):
+                try:
+                    age = now - path.stat().st_mtime
+                except OSError:
+                    del self.pending[path]
+                    self.known.discard(path)
+                    continue
+                if age < self.settle_seconds:
+                    wait = min(wait or self.settle_seconds, self.settle_seconds - age)
+                    continue
+                del self.pending[path]
+                await self.queue.put(path)
+                now = time.time()
+            if not self.pending:
+                self._pending_event.clear()
+            elif wait is not None:
+                await asyncio.sleep(wait)
+    
+    async def _capacity_problem(self) -> Optional[str]:
+        """Motivo para no empezar otro fichero: poco disco o CLIP_LAG saturado."""
+        free_gb = shutil.disk_usage(self.inbox).free / 1024 ** 3
+        if free_gb < self.min_free_gb:
+            return f"disco: quedan {free_gb:.1f} GB (mínimo {self.min_free_gb} GB)"
+        if time.time() - self._clip_checked >= self.clip_check_seconds:
+            self._clip_checked = time.time()
+            status = await self.integration.check_agent_status('04_CLIP_LAG')
+            if status.get('status') != 'active':
+                self._clip_saturated = f"CLIP_LAG {status.get('status')}"
+            elif status.get('queue_depth', 0) >= self.clip_max_queue:
+                self._clip_saturated = f"CLIP_LAG saturado ({status['queue_depth']} en cola)"
+            else:
+                self._clip_saturated = None
+        return self._clip_saturated
+    
+    async def _wait_for_capacity(self):
+        while True:
+            problem = await self._capacity_problem()
+            if problem is None:
+                if self.backpressure:
+                    self.logger.info(f"Ingesta reanudada tras: {self.backpressure}")
+                self.backpressure = None
+                return
+            if problem != self.backpressure:
+                self.logger.warning(f"Ingesta en pausa, {problem}")
+            self.backpressure = problem
+            await asyncio.sleep(self.backoff_seconds)
+            self.backpressure_seconds += self.backoff_seconds
+    
+    def _describe(self, path: Path) -> Dict:
+        platform = path.parent.name if path.parent.name in self.platforms else self.default_platform
+        suffix = path.suffix.lower()
+        media_type = 'audio' if suffix in ('.mp3', '.wav') else 'image' if suffix in ('.png', '.jpg') else 'video'
+        return {'path': str(path), 'title': path.stem, 'type': media_type, 'platform': platform}
+    
+    async def _worker(self):
+        while True:
+            path = await self.queue.get()
+            try:
+                await self._wait_for_capacity()
+                await self._process(path)
+            finally:
+                self.known.discard(path)
+                self.queue.task_done()
+    
+    async def _process(self, path: Path):
+        content = self._describe(path)
+        try:
+            # Transcodificación: CPU, acotada por cpu_slots
+            async with self._cpu:
+                self.transcoding += 1
+                try:
+                    content['variants'] = await self.editor.optimize_for_platforms(
+                        str(path), self.editor.target_platforms(content['platform']))
+                    content['path'] = content['variants'][content['platform']]
+                finally:
+                    self.transcoding -= 1
+            # Workflow con los demás agentes: llamadas de red, acotadas por io_slots
+            async with self._io:
+                self.in_workflow += 1
+                try:
+                    result = await self.workflow.process_raw_content({**content, 'source_path': str(path)})
+                finally:
+                    self.in_workflow -= 1
+            if result['status'] != 'success':
+                raise ValueError(result.get('error'))
+        except Exception as e:
+            self.failed += 1
+            self.logger.error(f"Error ingiriendo {path.name}: {str(e)}")
+            await self._move(path, self.failed_dir)
+            return
+        self.processed += 1
+        self.completed_at.append(time.time())
+        await self._move(path, self.processed_dir)
+    
+    async def _move(self, path: Path, directory: Path):
+        """Saca el fichero de la entrada; si no se puede tras varios intentos queda en cuarentena."""
+        loop = asyncio.get_running_loop()
+        target = directory / path.relative_to(self.inbox)
+        for attempt in range(1, self.move_retries + 1):
+            try:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                await loop.run_in_executor(None, shutil.move, str(path), str(target))
+                return
+            except OSError as e:
+                # En Windows otro proceso (antivirus, indexador) puede tener el fichero abierto un momento
+                self.logger.warning(f"No se pudo mover {path} a {directory} (intento {attempt}): {str(e)}")
+                if attempt < self.move_retries:
+                    await asyncio.sleep(self.backoff_seconds)
+        try:
+            stat = path.stat()
+        except OSError:
+            return  # Ya no está en la entrada
+        # Sin cuarentena el escaneo lo volvería a encontrar y se procesaría una y otra vez
+        self.quarantined[path] = (stat.st_size, stat.st_mtime_ns)
+        self.logger.error(f"{path} queda en cuarentena: procesado pero no se pudo mover a {directory}")
+    
+    def files_per_hour(self) -> int:
+        cutoff = time.time() - 3600
+        while self.completed_at and self.completed_at[0] < cutoff:
+            self.completed_at.popleft()
+        return len(self.completed_at)
+    
+    def stats(self) -> Dict:
+        return {
+            'files_per_hour': self.files_per_hour(),
+            'queue_depth': self.queue.qsize() if self.queue else 0,
+            'waiting_in_inbox': len(self.pending),
+            'transcoding': self.transcoding,
+            'in_workflow': self.in_workflow,
+            'processed': self.processed,
+            'failed': self.failed,
+            'quarantined': len(self.quarantined),
+            'backpressure': self.backpressure,
+            'backpressure_seconds': self.backpressure_seconds
+        }
+
 class MediaAgent:
     """Agente principal MEDIA_LAG."""
     
@@ -627,16 +1397,20 @@ class MediaAgent:
         self.logger = logging.getLogger('MEDIA_LAG.Agent')
         self.config = self._load_config()
         
-        # Inicializar módulos
-        self.producer = MediaProducer(self.config.media_producer)
-        self.editor = ContentEditor(self.config.content_editor)
+        # Inicializar módulos (con la caché de activos derivados compartida con CLIP_LAG y DJ_LAG)
+        self.media_cache = MediaCache()
+        self.producer = MediaProducer(self.config.media_producer, self.media_cache)
+        self.editor = ContentEditor(self.config.content_editor, self.config.supported_platforms, self.media_cache)
         self.distributor = DistributionManager(self.config.distribution_manager)
         self.analyzer = PerformanceAnalyzer(self.config.performance_analyzer)
         self.ethics = EthicalFilter(self.config.ethical_filter)
         
         # Inicializar integración y workflows
         self.integration = AgentIntegration(self.config.integrations)
-        self.workflow = WorkflowManager(self.config, self.integration)
+        self.checkpoints = WorkflowCheckpointStore('media_workflows.db')
+        self.workflow = WorkflowManager(self.config, self.integration, self.checkpoints)
+        self.ingest = IngestQueue(self.config.ingest, self.config.supported_platforms,
+                                  self.editor, self.workflow, self.integration)
         
     def _load_config(self) -> MediaConfig:
         """Carga la configuración del agente."""
@@ -665,11 +1439,13 @@ class MediaAgent:
 
             # Editar y optimizar
             edited_path = await self.editor.edit_video(media_path, content['specs'])
-            optimized_path = await self.editor.optimize_for_platform(edited_path, content['platform'])
+            variants = await self.editor.optimize_for_platforms(
+                edited_path, self.editor.target_platforms(content['platform'], content.get('platforms')))
 
             # Ejecutar workflow completo
             workflow_result = await self.workflow.process_raw_content({
-                'path': optimized_path,
+                'path': variants[content['platform']],
+                'variants': variants,
                 'title': content['title'],
                 'type': content['type'],
                 'platform': content['platform'],
@@ -692,29 +1468,32 @@ class MediaAgent:
         """Inicia el agente MEDIA_LAG."""
         try:
             self.logger.info("Iniciando MEDIA_LAG Agent")
+            await self.ingest.start()
             
             while True:
                 try:
-                    # 1. Verificar estado de agentes relacionados
-                    agent_status = {}
-                    for agent_id in self.config.agent_integrations:
-                        status = await self.integration.check_agent_status(agent_id)
-                        agent_status[agent_id] = status
-                        
+                    # 1. Verificar estado de agentes relacionados (en paralelo)
+                    agent_ids = list(self.config.integrations)
+                    statuses = await asyncio.gather(*(self.integration.check_agent_status(agent_id)
+                                                      for agent_id in agent_ids))
+                    for agent_id, status in zip(agent_ids, statuses):
                         if status['status'] != 'active':
                             self.logger.warning(f"Agente {agent_id} no está activo: {status}")
                     
-                    # 2. Procesar cola de contenido si todos los agentes necesarios están activos
-                    if all(status['status'] == 'active' for status in agent_status.values()):
-                        # Implementar procesamiento de cola
-                        pass
+                    # 2. La cola de ingesta trabaja sola; aquí sólo se informa de su estado
+                    ingest_stats = self.ingest.stats()
+                    self.logger.info(f"Ingesta: {ingest_stats['files_per_hour']} ficheros/h, "
+                                     f"{ingest_stats['queue_depth']} en cola, "
+                                     f"{ingest_stats['waiting_in_inbox']} esperando en entrada"
+                                     + (f", en pausa ({ingest_stats['backpressure']})"
+                                        if ingest_stats['backpressure'] else ""))
                     
                     # 3. Generar reportes diarios
                     current_time = datetime.now().time()
                     report_time = datetime.strptime(self.config.logging['daily_summary_time'], '%H:%M').time()
                     
                     if current_time.hour == report_time.hour and current_time.minute == report_time.minute:
-                        daily_report = await self.workflow.generate_daily_report()
+                        daily_report = await self.workflow.generate_daily_report(ingest_stats)
                         if daily_report.get('status') == 'error':
                             self.logger.warning(f"Error en reporte diario: {daily_report.get('error')}")
                     
@@ -730,6 +1509,9 @@ class MediaAgent:
         except Exception as e:
             self.logger.error(f"Error fatal en MEDIA_LAG Agent: {str(e)}")
             raise
+        finally:
+            await self.ingest.stop()
+            self.editor.shutdown()
 
 if __name__ == "__main__":
     agent = MediaAgent()
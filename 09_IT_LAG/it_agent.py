@@ -41,6 +41,9 @@ import email
 from email.header import decode_header
 import paramiko
 
+sys.path.append(str(Path(__file__).resolve().parent.parent / "00_CEO_LAG" / "scripts_implementacion"))
+from resource_sampler import DEFAULT_SNAPSHOT_PATH, SnapshotReader
+
 class SystemMonitor:
     """Handles system monitoring and metrics collection."""
     
@@ -48,6 +51,13 @@ class SystemMonitor:
         self.config = config
         self.thresholds = config["monitoring"]["alert_thresholds"]
         
+        # Snapshot published by the shared resource sampler (CEO side);
+        # relative paths are resolved against this agent's folder, not the cwd
+        snapshot_path = config["monitoring"].get("resource_snapshot_path")
+        self.snapshot_reader = SnapshotReader(
+            Path(__file__).resolve().parent / snapshot_path if snapshot_path else DEFAULT_SNAPSHOT_PATH)
+        psutil.cpu_percent(interval=None)
+        
         # Initialize Docker client if available
         try:
             self.docker_client = docker.from_env()
@@ -58,12 +68,23 @@ class SystemMonitor:
     async def get_metrics(self) -> SystemMetrics:
         """Collect current system metrics."""
         try:
-            # CPU metrics
-            cpu_percent = psutil.cpu_percent(interval=1)
-            
-            # Memory metrics
-            memory = psutil.virtual_memory()
-            memory_percent = memory.percent
+            # CPU, memory and GPU from the shared sampler; fall back to
+            # non-blocking local reads if no fresh snapshot is published
+            snapshot = self.snapshot_reader.read()
+            if snapshot and snapshot.age_seconds < self.config["monitoring"]["interval"]:
+                cpu_percent = snapshot.cpu_percent
+                memory_percent = snapshot.ram_percent
+                gpu_percent = None if snapshot.gpu_percent != snapshot.gpu_percent else snapshot.gpu_percent
+            else:
+                cpu_percent = psutil.cpu_percent(interval=None)
+                memory_percent = psutil.virtual_memory().percent
+                gpu_percent = None
+                try:
+                    gpus = GPUtil.getGPUs()
+                    if gpus:
+                        gpu_percent = gpus[0].load * 100
+                except:
+                    pass
             
             # Disk metrics
             disk_usage = {}
@@ -81,15 +102,6 @@ class SystemMonitor:
                 "bytes_recv": net_io.bytes_recv
             }
             
-            # GPU metrics if available
-            gpu_percent = None
-            try:
-                gpus = GPUtil.getGPUs()
-                if gpus:
-                    gpu_percent = gpus[0].load * 100
-            except:
-                pass
-                
             # Process count
             process_count = len(psutil.pids())
             
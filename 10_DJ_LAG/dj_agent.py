@@ -1,9 +1,13 @@
 import os
+import sys
 import json
 import logging
 from typing import Dict, List, Optional
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parent.parent / "00_CEO_LAG" / "scripts_implementacion"))
+from media_cache import MediaCache
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -17,6 +21,8 @@ class DJAgent:
         self.config = self._load_config(config_path)
         self.music_library = {}
         self.effects_library = {}
+        # Derived-asset cache shared with MEDIA_LAG and CLIP_LAG
+        self.cache = MediaCache()
         
     def _load_config(self, config_path: str) -> Dict:
         """Load agent configuration from JSON file"""
@@ -40,7 +46,12 @@ class DJAgent:
 
     def sync_music_with_video(self, video_path: str, music_path: str) -> str:
         """Synchronize music track with video timing"""
-        # TODO: Implement audio-video sync
+        key = self.cache.key([video_path, music_path], "music_sync")
+        cached = self.cache.get(key, self.config.get('synced_path', './synced'))
+        if cached:
+            self.logger.info(f"Serving cached sync of {music_path} with {video_path}")
+            return str(cached[0])
+        # TODO: Implement audio-video sync and store the result with self.cache.put(key, [path], "music_sync")
         return ""
 
     def curate_music_library(self) -> None: